@@ -2,61 +2,124 @@
 backtest.py
 -----------
 Simulates the trading strategy on historical data using a trained model.
-Reports trade count, win rate, and total return.
+Reports trade count, win rate, total return, drawdown and exposure.
 """
 
+import argparse
 import logging
 import pandas as pd
+import metrics
 from data_utils import fetch_data
-from features import add_features
+from panel_features import add_panel_features
 from labeling import create_labels
-from trade_utils import simulate_trade
-from model_utils import load_model
-from config import STOCK_LIST, FEATURE_COLS, TARGET_PCT, STOP_PCT, HOLD_DAYS
+from panel_store import open_store
+from model_utils import load_scoring_model
+from scoring import predict_probs
+from backtest_engine import backtest_frames
+from portfolio import simulate_frames
+from config import STOCK_LIST, FEATURE_COLS, SIGNAL_THRESHOLD, USE_PANEL_STORE, PANEL_STORE_DIR
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
-SIGNAL_THRESHOLD = 0.65
 
+def load_predictions(
+    model=None,
+    symbols: list[str] = STOCK_LIST,
+    panel_store: str | None = PANEL_STORE_DIR if USE_PANEL_STORE else None,
+) -> tuple[dict[str, pd.DataFrame], dict]:
+    """Featurise (one panel pass), label and score every symbol, as the backtest sees them.
 
-def backtest() -> None:
-    """Run a historical backtest across all stocks in STOCK_LIST.
+    Args:
+        model:       Already-loaded model; loaded with load_scoring_model when None.
+        symbols:     Tickers to load.
+        panel_store: Read raw bars from this panel store (panel_store.py)
+                     instead of fetching them.
 
-    For each bar where the model predicts probability >= SIGNAL_THRESHOLD,
-    simulates a trade and accumulates P&L. Prints a summary at the end.
+    Returns:
+        (frames, probs) dicts keyed by symbol: each frame truncated by
+        create_labels, with probabilities aligned to its rows.
     """
-    model = load_model()
+    if model is None:
+        model = load_scoring_model()
 
-    total_return = 0.0
-    trades = 0
-    wins = 0
+    if panel_store is not None:
+        raw = open_store(panel_store).frames(symbols)
+    else:
+        raw = {}
+        for stock in symbols:
+            with metrics.symbol_scope(stock):
+                df = fetch_data(stock)
+                if df is None:
+                    logger.warning("Skipping %s — no data.", stock)
+                    continue
+                raw[stock] = df
 
-    for stock in STOCK_LIST:
-        df = fetch_data(stock)
-        if df is None:
-            logger.warning("Skipping %s — no data.", stock)
-            continue
+    frames, probs = {}, {}
+    for stock, df in add_panel_features(raw, FEATURE_COLS).items():
+        with metrics.symbol_scope(stock):
+            df = create_labels(df)
+            frames[stock] = df
+            probs[stock] = predict_probs(model, df[FEATURE_COLS])
+    return frames, probs
 
-        df = add_features(df)
-        df = create_labels(df)
 
-        probs = model.predict_proba(df[FEATURE_COLS])[:, 1]
+def backtest(
+    portfolio: bool = False,
+    equity_out: str | None = None,
+    model=None,
+    panel_store: str | None = PANEL_STORE_DIR if USE_PANEL_STORE else None,
+) -> None:
+    """Run a historical backtest across all stocks in STOCK_LIST.
 
-        for i in range(len(df) - HOLD_DAYS - 1):
-            if probs[i] >= SIGNAL_THRESHOLD:
-                label, pnl = simulate_trade(df, i)
-                trades += 1
-                total_return += pnl
-                if label == 1:
-                    wins += 1
+    For each bar where the model predicts probability >= SIGNAL_THRESHOLD,
+    simulates a trade and accumulates P&L. Prints a summary at the end.
+
+    Args:
+        portfolio:   Also run the capital-constrained portfolio simulation.
+        equity_out:  CSV path for the portfolio equity curve.
+        model:       Already-loaded model; loaded with load_scoring_model when None.
+        panel_store: Read raw bars from this panel store (panel_store.py)
+                     instead of fetching them.
+    """
+    frames, probs = load_predictions(model, panel_store=panel_store)
+    summary = backtest_frames(frames, probs, SIGNAL_THRESHOLD).summary
 
-    win_rate = wins / trades if trades > 0 else 0.0
     logger.info("─── Backtest Results ───────────────────────────")
-    logger.info("Trades      : %d", trades)
-    logger.info("Win Rate    : %.2f%%", win_rate * 100)
-    logger.info("Total Return: %.2f%%", total_return * 100)
+    logger.info("Trades      : %d", summary.trades)
+    logger.info("Win Rate    : %.2f%%", summary.win_rate * 100)
+    logger.info("Total Return: %.2f%%", summary.total_return * 100)
+    logger.info("Max Drawdown: %.2f%%", summary.max_drawdown * 100)
+    logger.info("Exposure    : %.1f%%", summary.exposure * 100)
+
+    if not portfolio:
+        return
+    result = simulate_frames(frames, probs, SIGNAL_THRESHOLD)
+    stats = result.stats
+    logger.info("─── Portfolio Simulation ───────────────────────")
+    logger.info("Final Equity: %.2f", stats["final_equity"])
+    logger.info("Total Return: %.2f%%  (CAGR %.2f%%)", stats["total_return"] * 100, stats["cagr"] * 100)
+    logger.info("Max Drawdown: %.2f%%", stats["max_drawdown"] * 100)
+    logger.info("Sharpe      : %.2f", stats["sharpe"])
+    logger.info("Trades      : %d of %d signals (win rate %.2f%%)",
+                stats["trades"], stats["signals"], stats["win_rate"] * 100)
+    logger.info("Exposure    : %.1f%%", stats["exposure"] * 100)
+    if equity_out:
+        result.equity.to_csv(equity_out, header=["equity"], index_label="date")
+        logger.info("Equity curve saved to %s", equity_out)
 
 
 if __name__ == "__main__":
-    backtest()
+    parser = argparse.ArgumentParser(description="Backtest the trained model on historical data")
+    parser.add_argument("--portfolio", action="store_true",
+                        help="Also simulate a capital-constrained portfolio (see portfolio.py)")
+    parser.add_argument("--equity-out", default=None, help="CSV file for the portfolio equity curve")
+    parser.add_argument("--panel-store", nargs="?", const=PANEL_STORE_DIR,
+                        default=PANEL_STORE_DIR if USE_PANEL_STORE else None,
+                        help="Read raw bars from a panel store (built with panel_store.py) instead of fetching")
+    metrics.add_profile_argument(parser)
+    args = parser.parse_args()
+    backtest(portfolio=args.portfolio or args.equity_out is not None, equity_out=args.equity_out,
+             panel_store=args.panel_store)
+    if args.profile:
+        metrics.dump_profile(args.profile)
@@ -0,0 +1,192 @@
+"""
+backtest_engine.py
+------------------
+Array-based backtest kernel shared by backtest.py and server.py.
+Takes precomputed model probabilities plus OHLC arrays for any number of
+symbols and evaluates every above-threshold signal in one vectorised pass.
+"""
+
+import logging
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+import metrics
+from trade_utils import first_touch
+from config import TARGET_PCT, STOP_PCT, HOLD_DAYS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SymbolStats:
+    """Backtest statistics for one symbol (or the whole universe)."""
+
+    symbol: str
+    trades: int = 0
+    wins: int = 0
+    total_return: float = 0.0
+    max_drawdown: float = 0.0
+    exposure: float = 0.0
+    bars: int = 0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.trades if self.trades else 0.0
+
+    def to_dict(self) -> dict:
+        """JSON-friendly dict with percentages, as served by /api/backtest."""
+        return {
+            "symbol": self.symbol,
+            "trades": self.trades,
+            "wins": self.wins,
+            "win_rate": round(self.win_rate * 100, 1),
+            "total_return": round(self.total_return * 100, 2),
+            "max_drawdown": round(self.max_drawdown * 100, 2),
+            "exposure": round(self.exposure * 100, 1),
+        }
+
+
+@dataclass
+class BacktestResult:
+    """Per-symbol and aggregate results of a backtest run."""
+
+    summary: SymbolStats
+    per_symbol: list[SymbolStats] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return {
+            "summary": {k: v for k, v in self.summary.to_dict().items() if k != "symbol"},
+            "per_stock": [s.to_dict() for s in self.per_symbol],
+        }
+
+
+def _max_drawdown(pnl: np.ndarray) -> float:
+    """Largest peak-to-trough fall of the cumulative P&L curve (starting at 0)."""
+    if len(pnl) == 0:
+        return 0.0
+    curve = np.concatenate(([0.0], np.cumsum(pnl)))
+    return float((np.maximum.accumulate(curve) - curve).max())
+
+
+@metrics.timed("backtest")
+def run_backtest(
+    symbols: list[str],
+    probs: list[np.ndarray],
+    opens: list[np.ndarray],
+    highs: list[np.ndarray],
+    lows: list[np.ndarray],
+    threshold: float,
+    dates: list[np.ndarray] | None = None,
+    target_pct: float = TARGET_PCT,
+    stop_pct: float = STOP_PCT,
+    hold_days: int = HOLD_DAYS,
+) -> BacktestResult:
+    """Backtest many symbols in a single vectorised pass.
+
+    All symbols are concatenated into one array and fed through
+    trade_utils.first_touch once. A bar i of a symbol with L bars is a
+    candidate only if i < L - hold_days - 1, so no trade window ever spans
+    two symbols.
+
+    Args:
+        symbols:   Symbol names, one per input array.
+        probs:     Model probability per bar for each symbol.
+        opens, highs, lows: Price arrays aligned with probs.
+        threshold: Minimum probability to take a trade.
+        dates:     Optional bar dates per symbol; used to order trades
+                   chronologically for the aggregate drawdown.
+        target_pct, stop_pct, hold_days: Trade parameters (default from config).
+
+    Returns:
+        A BacktestResult with one SymbolStats per input symbol plus a summary.
+    """
+    lengths = np.array([len(p) for p in probs], dtype=np.int64)
+    total = int(lengths.sum())
+    if total == 0:
+        return BacktestResult(SymbolStats("ALL"), [SymbolStats(s) for s in symbols])
+
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    sym_id  = np.repeat(np.arange(len(symbols)), lengths)
+    local   = np.arange(total) - offsets[sym_id]
+
+    prob = np.concatenate(probs)
+    labels, pnl, exits = first_touch(
+        np.concatenate(opens), np.concatenate(highs), np.concatenate(lows),
+        target_pct, stop_pct, hold_days,
+    )
+    n = len(labels)
+
+    valid  = local[:n] < (lengths[sym_id[:n]] - hold_days - 1)
+    signal = np.flatnonzero(valid & (prob[:n] >= threshold))
+
+    sig_sym  = sym_id[signal]
+    sig_pnl  = pnl[signal]
+    sig_win  = labels[signal]
+    nsym     = len(symbols)
+    trades   = np.bincount(sig_sym, minlength=nsym)
+    wins     = np.bincount(sig_sym, weights=sig_win, minlength=nsym).astype(np.int64)
+    returns  = np.bincount(sig_sym, weights=sig_pnl, minlength=nsym)
+
+    # Bars with at least one open position: trade from signal i holds i+1 .. i+exit
+    delta = np.zeros(total + 1, dtype=np.int64)
+    np.add.at(delta, signal + 1, 1)
+    np.add.at(delta, signal + 1 + exits[signal], -1)
+    in_market = np.cumsum(delta[:-1]) > 0
+    exposed_bars = np.bincount(sym_id, weights=in_market, minlength=nsym)
+
+    per_symbol = []
+    bounds = np.searchsorted(sig_sym, np.arange(nsym + 1))
+    for k, symbol in enumerate(symbols):
+        per_symbol.append(SymbolStats(
+            symbol=symbol,
+            trades=int(trades[k]),
+            wins=int(wins[k]),
+            total_return=float(returns[k]),
+            max_drawdown=_max_drawdown(sig_pnl[bounds[k]:bounds[k + 1]]),
+            exposure=float(exposed_bars[k] / lengths[k]) if lengths[k] else 0.0,
+            bars=int(lengths[k]),
+        ))
+
+    if dates is not None and len(signal):
+        sig_dates = np.concatenate([np.asarray(d) for d in dates])[signal]
+        ordered = sig_pnl[np.argsort(sig_dates, kind="stable")]
+    else:
+        ordered = sig_pnl
+
+    summary = SymbolStats(
+        symbol="ALL",
+        trades=int(trades.sum()),
+        wins=int(wins.sum()),
+        total_return=float(sig_pnl.sum()),
+        max_drawdown=_max_drawdown(ordered),
+        exposure=float(exposed_bars.sum() / total),
+        bars=total,
+    )
+    return BacktestResult(summary, per_symbol)
+
+
+def backtest_frames(
+    frames: dict[str, pd.DataFrame],
+    probs: dict[str, np.ndarray],
+    threshold: float,
+    **params,
+) -> BacktestResult:
+    """Convenience wrapper over run_backtest for per-symbol OHLC DataFrames.
+
+    Args:
+        frames:    symbol -> DataFrame with Open, High, Low columns.
+        probs:     symbol -> probability array aligned with the frame's rows.
+        threshold: Minimum probability to take a trade.
+        **params:  Forwarded to run_backtest (target_pct, stop_pct, hold_days).
+    """
+    symbols = list(frames)
+    return run_backtest(
+        symbols,
+        [np.asarray(probs[s]) for s in symbols],
+        [frames[s]["Open"].to_numpy() for s in symbols],
+        [frames[s]["High"].to_numpy() for s in symbols],
+        [frames[s]["Low"].to_numpy() for s in symbols],
+        threshold,
+        dates=[frames[s].index.to_numpy() for s in symbols],
+        **params,
+    )
@@ -0,0 +1,400 @@
+"""
+bench.py
+--------
+Benchmark harness for the fetch → features → labels → train → predict →
+backtest pipeline and the server endpoints.
+
+Runs fully offline on synthetic OHLCV panels (symbols × years). Each stage
+is timed (best of --repeat runs) and its peak traced memory measured in a
+separate tracemalloc run, so tracing overhead does not distort the timings.
+Results are saved as JSON named by timestamp and git commit, and compared
+against the previous run (or --baseline) to flag regressions.
+
+The startup stage times `import main` in a fresh interpreter (what every
+scheduled signal run pays before doing any work) and fails the run when
+it exceeds STARTUP_BUDGET.
+
+Usage:
+    python bench.py
+    python bench.py --symbols 200 --years 10 --repeat 5
+    python bench.py --stages features labels backtest
+    python bench.py --baseline bench_results/20240101-120000-abc1234.json
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable
+from unittest.mock import patch
+import joblib
+import numpy as np
+import pandas as pd
+from data_cache import OHLCVCache
+from data_utils import LocalSource, FetchResult, fetch_data
+from features import add_features
+from panel_features import add_panel_features
+from labeling import create_labels
+from training_data import build_panel, fit_classifier
+from backtest_engine import backtest_frames
+from portfolio import simulate_frames
+from config import (
+    FEATURE_COLS, MODEL_PARAMS, SIGNAL_THRESHOLD,
+    BENCH_RESULTS_DIR, BENCH_SYMBOLS, BENCH_YEARS, BENCH_REPEAT, BENCH_TOLERANCE, STARTUP_BUDGET,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+STAGES = [
+    "startup", "fetch_cold", "fetch_cached", "features", "panel_features", "labels",
+    "train", "predict", "backtest", "portfolio", "api_signals", "api_backtest", "api_cached",
+]
+BARS_PER_YEAR = 252
+
+# Entry points kept free of the slow-to-import libraries below
+STARTUP_MODULES = ("main", "backtest", "server")
+HEAVY_MODULES = ("xgboost", "sklearn", "yfinance")
+
+
+# ── Synthetic data ─────────────────────────────────────────────────────────────
+
+def synthetic_ohlcv(n_bars: int, seed: int = 0, start: str = "2010-01-01") -> pd.DataFrame:
+    """Random-walk daily OHLCV bars on business days."""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n_bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, n_bars))
+    return pd.DataFrame({
+        "Open":   open_,
+        "High":   np.maximum(open_, close) * (1 + rng.uniform(0, 0.03, n_bars)),
+        "Low":    np.minimum(open_, close) * (1 - rng.uniform(0, 0.03, n_bars)),
+        "Close":  close,
+        "Volume": rng.integers(100_000, 5_000_000, n_bars).astype(float),
+    }, index=pd.bdate_range(start, periods=n_bars, name="Date"))
+
+
+def synthetic_universe(n_symbols: int, years: float, seed: int = 0) -> dict[str, pd.DataFrame]:
+    """{symbol: OHLCV} for n_symbols independent random walks of `years` length."""
+    n_bars = int(years * BARS_PER_YEAR)
+    return {f"SYN{k:04d}": synthetic_ohlcv(n_bars, seed + k) for k in range(n_symbols)}
+
+
+# ── Measurement ────────────────────────────────────────────────────────────────
+
+@dataclass
+class StageResult:
+    """Timing and memory for one benchmark stage."""
+
+    name: str
+    seconds: float       # best of `repeat` runs
+    mean_seconds: float
+    peak_mb: float       # peak traced allocation during one run
+    rows: int            # rows processed, for throughput
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "rows_per_sec": round(self.rows_per_sec, 1)}
+
+
+def measure(name: str, fn: Callable[[], object], rows: int, repeat: int = BENCH_REPEAT) -> tuple[StageResult, object]:
+    """Time fn() `repeat` times, then run it once more under tracemalloc.
+
+    Returns:
+        (StageResult, return value of the last call).
+    """
+    times = []
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        out = fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result = StageResult(name, min(times), sum(times) / len(times), peak / 1e6, rows)
+    logger.info("%-13s %8.3fs  (mean %.3fs)  peak %7.1f MB  %10.0f rows/s",
+                name, result.seconds, result.mean_seconds, result.peak_mb, result.rows_per_sec)
+    return result, out
+
+
+def import_profile(module: str) -> dict:
+    """Import `module` in a fresh interpreter.
+
+    Returns:
+        {"seconds": wall time of the import, "heavy": HEAVY_MODULES it loaded}.
+    """
+    code = (
+        "import sys, time\n"
+        "t0 = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - t0)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    seconds, heavy = (out.stdout.strip().splitlines() + [""])[-2:]
+    return {"seconds": float(seconds), "heavy": [m for m in heavy.split(",") if m]}
+
+
+# ── Benchmarks ─────────────────────────────────────────────────────────────────
+
+def run_benchmarks(
+    n_symbols: int = BENCH_SYMBOLS,
+    years: float = BENCH_YEARS,
+    repeat: int = BENCH_REPEAT,
+    stages: list[str] | None = None,
+    params: dict = MODEL_PARAMS,
+) -> dict:
+    """Run the selected stages on a synthetic universe.
+
+    Stages run in pipeline order and each feeds the next, so every stage
+    up to the last selected one is executed; only the selected ones are
+    measured and reported.
+
+    Args:
+        n_symbols: Universe size.
+        years:     Years of daily bars per symbol.
+        repeat:    Timed runs per stage.
+        stages:    Subset of STAGES to report (default: all).
+        params:    XGBClassifier parameters for the train stage.
+
+    Returns:
+        JSON-serialisable dict with run metadata and per-stage results.
+    """
+    selected = stages or STAGES
+    unknown = set(selected) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stage(s): {', '.join(sorted(unknown))}")
+    last = max(STAGES.index(s) for s in selected)
+
+    universe = synthetic_universe(n_symbols, years)
+    symbols = list(universe)
+    total_rows = sum(len(df) for df in universe.values())
+    logger.info("Synthetic universe: %d symbols × %d bars (%d rows)",
+                n_symbols, len(universe[symbols[0]]), total_rows)
+
+    results: dict[str, StageResult] = {}
+
+    def needed(name: str) -> bool:
+        return STAGES.index(name) <= last
+
+    if "startup" in selected:
+        results["startup"], _ = measure("startup", lambda: import_profile("main"), rows=1, repeat=repeat)
+    if not needed("fetch_cold"):
+        return _payload(results, n_symbols, years, repeat, total_rows)
+
+    def stage(name: str, fn: Callable[[], object], rows: int = total_rows):
+        if name in selected:
+            results[name], out = measure(name, fn, rows, repeat)
+            return out
+        return fn()
+
+    with tempfile.TemporaryDirectory(prefix="cnc_bench_") as tmp:
+        src_dir = os.path.join(tmp, "source")
+        os.makedirs(src_dir)
+        for sym, df in universe.items():
+            df.to_parquet(os.path.join(src_dir, f"{sym}.parquet"))
+        source = LocalSource(src_dir)
+        start = universe[symbols[0]].index[0]
+        end = universe[symbols[0]].index[-1] + pd.Timedelta(days=1)
+        runs = iter(range(1_000_000))
+
+        def fetch_all(cache: OHLCVCache) -> dict[str, pd.DataFrame]:
+            return {s: fetch_data(s, start, end, source=source, cache=cache) for s in symbols}
+
+        # Cold: a fresh, empty cache every run (source read + cache write)
+        raw = stage("fetch_cold", lambda: fetch_all(OHLCVCache(os.path.join(tmp, f"cache{next(runs)}"))))
+
+        if needed("fetch_cached"):
+            warm = OHLCVCache(os.path.join(tmp, "cache_warm"))
+            fetch_all(warm)
+            raw = stage("fetch_cached", lambda: fetch_all(warm))
+        if needed("features"):
+            featured = stage("features", lambda: {s: add_features(df) for s, df in raw.items()})
+        if "panel_features" in selected:   # nothing downstream consumes it
+            stage("panel_features", lambda: add_panel_features(raw, FEATURE_COLS))
+        if needed("labels"):
+            labeled = stage("labels", lambda: {s: create_labels(df) for s, df in featured.items()})
+            labeled_rows = sum(len(df) for df in labeled.values())
+        if needed("train"):
+            model = stage("train", lambda: fit_classifier(build_panel(labeled.items()).quantile_dmatrix(), params),
+                          rows=labeled_rows)
+        if needed("predict"):
+            probs = stage("predict", lambda: {s: model.predict_proba(df[FEATURE_COLS])[:, 1]
+                                              for s, df in labeled.items()}, rows=labeled_rows)
+        if needed("backtest"):
+            stage("backtest", lambda: backtest_frames(labeled, probs, SIGNAL_THRESHOLD), rows=labeled_rows)
+        if needed("portfolio"):
+            stage("portfolio", lambda: simulate_frames(labeled, probs, SIGNAL_THRESHOLD), rows=labeled_rows)
+        if needed("api_signals"):
+            model_path = os.path.join(tmp, "bench_model.pkl")
+            joblib.dump(model, model_path)
+            _bench_server(stage, needed, universe, model_path, total_rows)
+
+    return _payload(results, n_symbols, years, repeat, total_rows)
+
+
+def _bench_server(stage, needed, universe: dict[str, pd.DataFrame], model_path: str, rows: int) -> None:
+    """Time /api/signals and GET /api/backtest through the Flask test client.
+
+    api_signals/api_backtest clear the response cache first so they measure
+    the full computation; api_cached times a repeated, cached /api/signals.
+    """
+    import server
+    import live_window
+
+    server.models.register("bench", model_path)
+    client = server.app.test_client()
+
+    def call(url: str, cached: bool = False) -> dict:
+        if not cached:
+            server.responses.clear()
+        resp = client.get(url)
+        if resp.status_code != 200:
+            raise RuntimeError(f"{url} returned {resp.status_code}: {resp.get_data(as_text=True)[:200]}")
+        return resp.get_json()
+
+    def fetch(symbol, *args, **kwargs):
+        return universe.get(symbol)
+
+    def fetch_many(symbols, *args, **kwargs):
+        return (FetchResult(s, universe.get(s), None, 0, 0.0) for s in symbols)
+
+    with patch.object(server, "STOCK_LIST", list(universe)), \
+         patch.object(server, "fetch_data", fetch), patch.object(live_window, "fetch_many", fetch_many):
+        stage("api_signals", lambda: call("/api/signals?model=bench"), rows=rows)
+        stage("api_backtest", lambda: call("/api/backtest?model=bench"), rows=rows)
+        if needed("api_cached"):
+            call("/api/signals?model=bench")
+            stage("api_cached", lambda: call("/api/signals?model=bench", cached=True), rows=rows)
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+def _payload(results: dict[str, StageResult], n_symbols: int, years: float, repeat: int, rows: int) -> dict:
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "params": {"symbols": n_symbols, "years": years, "repeat": repeat, "rows": rows},
+        "stages": {name: r.to_dict() for name, r in results.items()},
+    }
+
+
+# ── Storage & comparison ───────────────────────────────────────────────────────
+
+def save_results(results: dict, directory: str = BENCH_RESULTS_DIR) -> str:
+    """Write results to <directory>/<YYYYmmdd-HHMMSS>-<commit>.json and return the path."""
+    os.makedirs(directory, exist_ok=True)
+    stamp = results["timestamp"].replace("-", "").replace(":", "").replace("T", "-")
+    path = os.path.join(directory, f"{stamp}-{results['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def latest_results(directory: str = BENCH_RESULTS_DIR, exclude: str | None = None) -> str | None:
+    """Most recent results file in directory (optionally skipping one path)."""
+    paths = sorted(p for p in glob.glob(os.path.join(directory, "*.json")) if p != exclude)
+    return paths[-1] if paths else None
+
+
+def compare(current: dict, baseline: dict, tolerance: float = BENCH_TOLERANCE) -> pd.DataFrame:
+    """Per-stage time/memory ratios of current vs baseline.
+
+    Runs with different universe sizes are still compared, but the
+    ratios are then only indicative.
+
+    Returns:
+        DataFrame indexed by stage with baseline/current seconds and peak MB,
+        their ratios, and a `regression` flag (time ratio > 1 + tolerance).
+    """
+    if current["params"] != baseline["params"]:
+        logger.warning("Baseline was run with %s, current with %s — ratios are indicative only",
+                       baseline["params"], current["params"])
+    rows = []
+    for name, cur in current["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            continue
+        time_ratio = cur["seconds"] / base["seconds"] if base["seconds"] > 0 else float("nan")
+        mem_ratio = cur["peak_mb"] / base["peak_mb"] if base["peak_mb"] > 0 else float("nan")
+        rows.append({
+            "stage": name,
+            "base_s": base["seconds"], "cur_s": cur["seconds"], "time_ratio": time_ratio,
+            "base_mb": base["peak_mb"], "cur_mb": cur["peak_mb"], "mem_ratio": mem_ratio,
+            "regression": time_ratio > 1 + tolerance,
+        })
+    return pd.DataFrame(rows).set_index("stage") if rows else pd.DataFrame()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the CNC pipeline on synthetic data")
+    parser.add_argument("--symbols", type=int, default=BENCH_SYMBOLS)
+    parser.add_argument("--years", type=float, default=BENCH_YEARS)
+    parser.add_argument("--repeat", type=int, default=BENCH_REPEAT)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=None)
+    parser.add_argument("--out-dir", default=BENCH_RESULTS_DIR)
+    parser.add_argument("--baseline", default=None, help="Results JSON to compare against (default: previous run)")
+    parser.add_argument("--tolerance", type=float, default=BENCH_TOLERANCE)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET,
+                        help="Seconds allowed for the startup stage")
+    args = parser.parse_args()
+
+    # Per-symbol logging would swamp the report
+    for name in ("data_utils", "labeling", "training_data", "model_registry", "response_cache", "portfolio"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    results = run_benchmarks(args.symbols, args.years, args.repeat, args.stages)
+    path = None if args.no_save else save_results(results, args.out_dir)
+    if path:
+        logger.info("Saved results to %s", path)
+
+    startup = results["stages"].get("startup")
+    if startup and startup["seconds"] > args.startup_budget:
+        logger.warning("`import main` took %.3fs, over the %.2fs startup budget",
+                       startup["seconds"], args.startup_budget)
+        raise SystemExit(1)
+
+    baseline_path = args.baseline or latest_results(args.out_dir, exclude=path)
+    if baseline_path is None:
+        logger.info("No baseline to compare against.")
+        return
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    table = compare(results, baseline, args.tolerance)
+    logger.info("─── vs %s (%s) ───", os.path.basename(baseline_path), baseline["commit"])
+    print(table.to_string(float_format=lambda v: f"{v:.3f}"))
+    regressed = table.index[table["regression"]].tolist() if len(table) else []
+    if regressed:
+        logger.warning("Regressions (> %.0f%% slower): %s", args.tolerance * 100, ", ".join(regressed))
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,9 +12,130 @@ TARGET_PCT = 0.03
 STOP_PCT   = 0.02
 HOLD_DAYS  = 5
 
+# Minimum model probability to act on a signal (main, backtest, server)
+SIGNAL_THRESHOLD = 0.65
+
+# ── Portfolio simulation ───────────────────────────────────────────────────────
+INITIAL_CAPITAL = 1_000_000.0
+MAX_POSITIONS   = 10       # concurrent open positions
+POSITION_SIZE   = 0.10     # fraction of equity allocated per new position
+COST_BPS        = 5.0      # commission per side, basis points of traded value
+SLIPPAGE_BPS    = 5.0      # adverse fill per side, basis points of price
+
+# ── Data source & cache ────────────────────────────────────────────────────────
+# DATA_SOURCE is "yahoo" or a path to a directory of <SYMBOL>.csv / .parquet files
+DATA_SOURCE         = os.environ.get("CNC_DATA_SOURCE", "yahoo")
+USE_CACHE           = os.environ.get("CNC_USE_CACHE", "1") != "0"
+CACHE_DIR           = os.environ.get("CNC_CACHE_DIR", "data_cache")
+CACHE_MAX_AGE_HOURS = 12
+
+# Engineered features + labels, keyed on raw data hash and trade parameters
+USE_FEATURE_STORE = os.environ.get("CNC_USE_FEATURE_STORE", "1") != "0"
+FEATURE_STORE_DIR = os.environ.get("CNC_FEATURE_STORE_DIR", "feature_store")
+
+# Packed, memory-mapped OHLCV of the whole universe (panel_store.py). A snapshot:
+# built explicitly, and read by train_model / backtest instead of fetching when enabled
+USE_PANEL_STORE = os.environ.get("CNC_USE_PANEL_STORE", "0") != "0"
+PANEL_STORE_DIR = os.environ.get("CNC_PANEL_STORE_DIR", "panel_store")
+
+# ── Intraday ───────────────────────────────────────────────────────────────────
+# Minute/hourly bars are read from <INTRADAY_DIR>/<SYMBOL>.parquet or .csv
+INTRADAY_DIR         = os.environ.get("CNC_INTRADAY_DIR", "intraday_data")
+INTRADAY_CHUNK_ROWS  = 1_000_000          # raw rows read per chunk
+INTRADAY_BASE        = "5min"             # bar size features and labels are built on
+INTRADAY_TIMEFRAMES  = ["1h", "1D"]       # higher timeframes joined as extra features
+INTRADAY_HOLD        = "1D"               # holding period as a time span, not a bar count
+INTRADAY_BLOCK_CELLS = 16_000_000         # signal bars × window bars evaluated per block
+
+# ── Parallelism ────────────────────────────────────────────────────────────────
+FETCH_WORKERS = 8                      # threads for I/O-bound fetching
+CPU_WORKERS   = os.cpu_count() or 1    # processes for features/labels
+MAX_IN_FLIGHT = 32                     # symbols held in memory at once
+
+# Bulk downloads (data_utils.fetch_many): shared rate limit, retries with exponential backoff
+FETCH_RATE        = float(os.environ.get("CNC_FETCH_RATE", "4"))   # source requests per second (0: unlimited)
+FETCH_BURST       = 8                  # requests allowed back-to-back before the rate applies
+FETCH_RETRIES     = 3                  # extra attempts after a failed request
+FETCH_BACKOFF     = 1.0                # seconds before the first retry, doubled each time
+FETCH_BACKOFF_MAX = 30.0               # cap on a single backoff delay
+
+# ── Server background jobs ─────────────────────────────────────────────────────
+JOB_WORKERS = 2      # concurrent /api/train and /api/backtest jobs
+JOB_HISTORY = 50     # finished jobs kept for polling
+
+# ── Server response cache ──────────────────────────────────────────────────────
+RESPONSE_CACHE_TTL  = 15 * 60   # seconds a cached /api/signals or /api/backtest result is served
+RESPONSE_CACHE_SIZE = 64        # entries kept (least recently used evicted first)
+
+# ── Metrics ────────────────────────────────────────────────────────────────────
+METRICS_ENABLED    = os.environ.get("CNC_METRICS", "1") != "0"
+METRICS_PER_SYMBOL = True    # break stage timings down by symbol (one series per symbol)
+METRICS_BUCKETS    = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# ── Live signals (main.py, /api/signals) ───────────────────────────────────────
+# Score from only the trailing bars the features need instead of the full history
+LIVE_TAIL         = os.environ.get("CNC_LIVE_TAIL", "1") != "0"
+LIVE_TOLERANCE    = 1e-4   # weight an EMA's truncated start may keep on the latest bar
+LIVE_HOLIDAY_RATE = 0.07   # share of weekdays that are exchange holidays (NSE: ~15 of ~250)
+
 # ── Model ──────────────────────────────────────────────────────────────────────
 MODEL_PATH = "xgb_model.pkl"
 
+# Exported by train_model: native booster JSON and flattened trees for fast_model
+BOOSTER_PATH          = os.path.splitext(MODEL_PATH)[0] + ".json"
+FAST_MODEL_PATH       = os.path.splitext(MODEL_PATH)[0] + ".npz"
+FAST_MODEL_ENABLED    = os.environ.get("CNC_FAST_MODEL", "1") != "0"   # main.py scores without xgboost
+FAST_MODEL_BLOCK_ROWS = 512     # rows walked through all trees at once (small blocks stay in cache)
+
+MODEL_PARAMS = {
+    "max_depth": 4,
+    "learning_rate": 0.05,
+    "n_estimators": 300,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "eval_metric": "logloss",
+}
+
+# Extra named models the server keeps resident alongside MODEL_PATH ({name: path})
+MODEL_VERSIONS       = {}
+MODEL_CHECK_INTERVAL = 2.0   # seconds between model file change checks
+
+# ── Hyperparameter tuning (train_model.py --tune) ──────────────────────────────
+# Search space: a list is sampled uniformly; ("uniform"|"log"|"int", lo, hi) from a range
+TUNE_SPACE = {
+    "max_depth":        [3, 4, 5, 6],
+    "learning_rate":    ("log", 0.01, 0.3),
+    "subsample":        ("uniform", 0.6, 1.0),
+    "colsample_bytree": ("uniform", 0.6, 1.0),
+    "min_child_weight": ("log", 1.0, 20.0),
+    "reg_lambda":       ("log", 0.1, 10.0),
+}
+TUNE_METHOD         = "halving"   # "halving" (successive halving) or "random"
+TUNE_TRIALS         = 27          # sampled configurations
+TUNE_SPLITS         = 3           # time-ordered train/validation splits per trial
+TUNE_MIN_ROUNDS     = 30          # boosting rounds in the first halving rung
+TUNE_MAX_ROUNDS     = 800         # round cap of the last rung (and of random search)
+TUNE_ETA            = 3           # halving factor: keep 1/ETA of trials, ETA× the rounds
+TUNE_EARLY_STOPPING = 30          # rounds without validation improvement before stopping
+TUNE_SEED           = 0
+TUNE_TRIALS_PATH    = "tuning_trials.csv"
+
+# ── Walk-forward training ──────────────────────────────────────────────────────
+WF_START            = "2021-01-01"   # first out-of-sample period
+WF_FREQ             = "MS"           # fold step (pandas offset alias, e.g. monthly)
+WF_WINDOW           = "expanding"    # "expanding" or "rolling"
+WF_TRAIN_YEARS      = 2              # rolling window length
+WF_WARM_TREES       = 50             # trees added per warm-started fold
+WF_PREDICTIONS_PATH = "wf_predictions.csv"
+
+# ── Benchmarks ─────────────────────────────────────────────────────────────────
+BENCH_RESULTS_DIR = "bench_results"   # one JSON file per run
+BENCH_SYMBOLS     = 50                # synthetic universe size
+BENCH_YEARS       = 5                 # years of daily bars per symbol
+BENCH_REPEAT      = 3                 # timed runs per stage (best is kept)
+BENCH_TOLERANCE   = 0.25              # slowdown vs baseline reported as a regression
+STARTUP_BUDGET    = 1.0               # max seconds for a fresh interpreter to `import main`
+
 # ── Universe ───────────────────────────────────────────────────────────────────
 STOCK_LIST = [
     "RELIANCE.NS",
@@ -0,0 +1,88 @@
+"""
+data_cache.py
+-------------
+Persistent on-disk OHLCV store sitting in front of data_utils.fetch_data.
+One Parquet file per symbol; each file records the date range it covers
+so fetch_data only has to ask the source for the missing tail.
+"""
+
+import logging
+import os
+import time
+import pandas as pd
+from config import CACHE_DIR, CACHE_MAX_AGE_HOURS
+
+logger = logging.getLogger(__name__)
+
+
+class OHLCVCache:
+    """Per-symbol Parquet store for daily OHLCV frames.
+
+    Each stored frame carries two attrs:
+      - covered_from: earliest date that was requested from the source
+      - covered_to:   latest date the source was asked for (exclusive)
+    These describe what the source was asked for, not the first/last bar,
+    so holidays and late listings do not trigger pointless re-fetches.
+    """
+
+    def __init__(self, root: str = CACHE_DIR, max_age_hours: float = CACHE_MAX_AGE_HOURS):
+        self.root = root
+        self.max_age_hours = max_age_hours
+
+    def path(self, symbol: str) -> str:
+        """Return the Parquet path for a symbol."""
+        safe = symbol.replace("/", "_").replace("\\", "_").replace(":", "_")
+        return os.path.join(self.root, f"{safe}.parquet")
+
+    def read(self, symbol: str) -> pd.DataFrame | None:
+        """Load the cached frame for a symbol, or None if absent/unreadable."""
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_parquet(path)
+        except Exception as e:
+            logger.warning("Ignoring unreadable cache file %s: %s", path, e)
+            return None
+
+    def write(self, symbol: str, df: pd.DataFrame, covered_from, covered_to) -> None:
+        """Atomically persist a symbol's frame together with its covered range."""
+        os.makedirs(self.root, exist_ok=True)
+        df = df.copy()
+        df.attrs["covered_from"] = str(pd.Timestamp(covered_from).date())
+        df.attrs["covered_to"]   = str(pd.Timestamp(covered_to).date())
+        path = self.path(symbol)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        df.to_parquet(tmp)
+        os.replace(tmp, path)
+
+    def age_hours(self, symbol: str) -> float | None:
+        """Hours since the symbol's cache file was last written, or None."""
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return None
+        return (time.time() - os.path.getmtime(path)) / 3600.0
+
+    def is_fresh(self, symbol: str) -> bool:
+        """True if the cache file was written within max_age_hours."""
+        age = self.age_hours(symbol)
+        return age is not None and age < self.max_age_hours
+
+    def last_date(self, symbol: str) -> pd.Timestamp | None:
+        """Date of the last cached bar for a symbol, or None."""
+        df = self.read(symbol)
+        if df is None or df.empty:
+            return None
+        return df.index[-1]
+
+    def clear(self, symbol: str | None = None) -> None:
+        """Delete one symbol's cache file, or every file when symbol is None."""
+        if symbol is not None:
+            path = self.path(symbol)
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                if name.endswith(".parquet"):
+                    os.remove(os.path.join(self.root, name))
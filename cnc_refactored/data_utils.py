@@ -1,42 +1,444 @@
 """
 data_utils.py
 -------------
-Fetches OHLCV price data from Yahoo Finance.
+Fetches OHLCV price data from Yahoo Finance (or a local directory of
+CSV/Parquet files), reading through the on-disk cache in data_cache.py.
+fetch_many downloads a whole universe concurrently under a shared rate
+limit, retrying failed requests and streaming results as they arrive;
+throttled_fetch applies the same limit and retries to a plain per-symbol
+fetch function for callers that run their own threads.
 """
 
+import itertools
 import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator
 import pandas as pd
-import yfinance as yf
-from config import START_DATE, END_DATE
+import metrics
+from config import (
+    START_DATE, END_DATE, DATA_SOURCE, USE_CACHE, FETCH_WORKERS, MAX_IN_FLIGHT,
+    FETCH_RATE, FETCH_BURST, FETCH_RETRIES, FETCH_BACKOFF, FETCH_BACKOFF_MAX,
+)
+from data_cache import OHLCVCache
 
 logger = logging.getLogger(__name__)
 
+OHLCV_COLS = ["Open", "High", "Low", "Close", "Volume"]
 
-def fetch_data(symbol: str) -> pd.DataFrame | None:
-    """Download historical OHLCV data for a symbol via yfinance.
+
+# ── Sources ────────────────────────────────────────────────────────────────────
+
+class DownloadError(RuntimeError):
+    """A source returned nothing for a request that should have had bars."""
+
+
+class YahooSource:
+    """Downloads daily bars from Yahoo Finance via yfinance."""
+
+    name = "yahoo"
+
+    def fetch(self, symbol: str, start, end) -> pd.DataFrame:
+        """Return bars in [start, end).
+
+        Raises:
+            DownloadError: If the download comes back empty. yf.download
+                logs network, rate-limit and unknown-ticker errors and
+                returns an empty frame instead of raising, so an empty
+                result is treated as a (retryable) failure.
+        """
+        import yfinance as yf   # ~0.25s to import; only needed when actually downloading
+        df = yf.download(symbol, start=start, end=end, auto_adjust=True, progress=False)
+        if df is None or df.empty:
+            raise DownloadError(f"Yahoo returned no bars for {symbol} in [{start}, {end})")
+        # Recent yfinance versions return (field, ticker) MultiIndex columns
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        return df
+
+
+class LocalSource:
+    """Reads bars from <directory>/<SYMBOL>.parquet or <SYMBOL>.csv.
+
+    Lets a local snapshot stand in for Yahoo in offline runs and tests.
+    CSV files must have a date column first (used as the index).
+    """
+
+    name = "local"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(self, symbol: str, start, end) -> pd.DataFrame:
+        """Return bars in [start, end). Raises FileNotFoundError if no file exists."""
+        base = os.path.join(self.directory, symbol)
+        if os.path.exists(base + ".parquet"):
+            df = pd.read_parquet(base + ".parquet")
+        elif os.path.exists(base + ".csv"):
+            df = pd.read_csv(base + ".csv", index_col=0, parse_dates=True)
+        else:
+            raise FileNotFoundError(f"No local data file for '{symbol}' in {self.directory}")
+        df = df.sort_index()
+        return df[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))]
+
+
+def get_source(spec: str = DATA_SOURCE):
+    """Build a source from a spec: 'yahoo' or a path to a local data directory."""
+    if spec == "yahoo":
+        return YahooSource()
+    return LocalSource(spec)
+
+
+_default_cache: OHLCVCache | None = None
+
+
+def _get_default_cache() -> OHLCVCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = OHLCVCache()
+    return _default_cache
+
+
+_shared: dict[tuple, pd.DataFrame | None] | None = None
+
+
+@contextmanager
+def shared_fetches():
+    """Memoise default-source fetch_data results for the duration of the block.
+
+    Lets several steps run in one interpreter (run.py --in-process) share
+    each symbol's bars instead of re-reading them from the cache. Frames
+    handed out are shared between callers and must be treated as read-only.
+    """
+    global _shared
+    outer, _shared = _shared, ({} if _shared is None else _shared)
+    try:
+        yield
+    finally:
+        _shared = outer
+
+
+# ── Fetch ──────────────────────────────────────────────────────────────────────
+
+def _clean(df: pd.DataFrame) -> pd.DataFrame:
+    df = df[[c for c in OHLCV_COLS if c in df.columns]]
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df.dropna()
+
+
+def _load_through_cache(symbol: str, start, end, source, cache: OHLCVCache) -> pd.DataFrame:
+    """Serve [start, end) from the cache, fetching only what it is missing.
+
+    Staleness rules:
+      - no cache, or cache starts after `start`  → full download
+      - cache already covers up to `end`         → served as-is
+      - cache written within max_age_hours       → served as-is
+      - otherwise                                → re-fetch from the last
+        cached bar onward (that bar may have been partial) and merge
+    """
+    start_ts, end_ts = pd.Timestamp(start), pd.Timestamp(end)
+    fetched_to = min(end_ts, pd.Timestamp.today().normalize() + pd.Timedelta(days=1))
+
+    cached = cache.read(symbol)
+    if cached is not None:
+        covered_from = pd.Timestamp(cached.attrs.get("covered_from", cached.index.min()))
+        covered_to   = pd.Timestamp(cached.attrs.get("covered_to", cached.index.max()))
+
+    if cached is None or cached.empty or covered_from > start_ts:
+        metrics.inc("cnc_cache_requests_total", help="OHLCV cache lookups by outcome", result="miss")
+        df = _clean(source.fetch(symbol, start_ts, end_ts))
+        if not df.empty:
+            cache.write(symbol, df, start_ts, fetched_to)
+        return df
+
+    if covered_to >= end_ts or cache.is_fresh(symbol):
+        metrics.inc("cnc_cache_requests_total", help="OHLCV cache lookups by outcome", result="hit")
+        logger.debug("Cache hit for %s (%d rows)", symbol, len(cached))
+        return cached
+
+    tail_start = cached.index[-1]
+    try:
+        tail = _clean(source.fetch(symbol, tail_start, end_ts))
+    except Exception as e:
+        logger.warning("Tail fetch failed for %s, serving stale cache: %s", symbol, e)
+        metrics.inc("cnc_cache_requests_total", help="OHLCV cache lookups by outcome", result="stale")
+        return cached
+
+    metrics.inc("cnc_cache_requests_total", help="OHLCV cache lookups by outcome", result="topup")
+    merged = _clean(pd.concat([cached, tail]))
+    cache.write(symbol, merged, covered_from, max(covered_to, fetched_to))
+    logger.debug("Topped up %s with %d bars from %s", symbol, len(tail), tail_start.date())
+    return merged
+
+
+def fetch_data(
+    symbol: str,
+    start=START_DATE,
+    end=END_DATE,
+    source=None,
+    cache: OHLCVCache | None = None,
+    use_cache: bool = USE_CACHE,
+) -> pd.DataFrame | None:
+    """Load historical OHLCV data for a symbol, reading through the local cache.
 
     Args:
-        symbol: Ticker symbol (e.g. 'RELIANCE.NS').
+        symbol:    Ticker symbol (e.g. 'RELIANCE.NS').
+        start:     First date to include. Defaults to START_DATE.
+        end:       End date (exclusive). Defaults to END_DATE.
+        source:    Object with fetch(symbol, start, end). Defaults to DATA_SOURCE.
+        cache:     OHLCVCache to read/write. Defaults to one rooted at CACHE_DIR.
+        use_cache: If False, always fetch from the source and skip the cache.
 
     Returns:
         A cleaned DataFrame indexed by date, or None if the download
         fails or returns no data.
     """
-    try:
-        df = yf.download(symbol, start=START_DATE, end=END_DATE, auto_adjust=True, progress=False)
-    except Exception as e:
-        logger.error("Failed to download data for %s: %s", symbol, e)
-        return None
+    shared = _shared if source is None and cache is None else None
+    key = (symbol, str(start), str(end), use_cache)
+    if shared is not None and key in shared:
+        return shared[key]
+    with metrics.symbol_scope(symbol), metrics.timer("fetch"):
+        df = _fetch(symbol, start, end, source or get_source(), cache, use_cache)
+    if shared is not None:
+        shared[key] = df
+    return df
+
+
+def _download(symbol: str, start, end, source, cache: OHLCVCache | None, use_cache: bool) -> pd.DataFrame:
+    if use_cache:
+        return _load_through_cache(symbol, start, end, source, cache or _get_default_cache())
+    return _clean(source.fetch(symbol, start, end))
+
 
+def _in_range(symbol: str, df: pd.DataFrame, start, end) -> pd.DataFrame | None:
     if df.empty:
         logger.warning("No data returned for symbol '%s'. Skipping.", symbol)
         return None
 
-    df.dropna(inplace=True)
+    df = df[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end))]
 
     if len(df) == 0:
-        logger.warning("All rows dropped after NaN removal for '%s'. Skipping.", symbol)
+        logger.warning("No rows in the requested range for '%s'. Skipping.", symbol)
         return None
 
+    metrics.inc("cnc_fetched_rows_total", len(df), help="OHLCV rows returned by fetch_data")
     logger.info("Fetched %d rows for %s", len(df), symbol)
     return df
+
+
+def _fetch(symbol: str, start, end, source, cache: OHLCVCache | None, use_cache: bool) -> pd.DataFrame | None:
+    try:
+        df = _download(symbol, start, end, source, cache, use_cache)
+    except Exception as e:
+        logger.error("Failed to download data for %s: %s", symbol, e)
+        metrics.inc("cnc_fetch_errors_total", help="fetch_data calls that raised", symbol=symbol)
+        return None
+    return _in_range(symbol, df, start, end)
+
+
+# ── Bulk fetch ─────────────────────────────────────────────────────────────────
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter.
+
+    Tokens refill at `rate` per second up to `burst`; acquire() takes one,
+    sleeping until it is available. Callers reserve tokens in arrival order,
+    so concurrent waiters are spaced 1 / rate apart rather than all waking
+    at once. rate <= 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(self.burst)
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, blocking until it is available. Returns seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            self._sleep(wait)
+        return wait
+
+
+class ThrottledSource:
+    """Source adapter that rate-limits and retries another source's fetch calls.
+
+    Every request (including retries) takes a token from the shared
+    limiter. Failed requests are retried up to `retries` times after
+    backoff × 2^attempt seconds (capped at max_backoff, with jitter so
+    workers failing together do not retry together). Errors in NO_RETRY,
+    such as a missing local file, fail immediately.
+    """
+
+    NO_RETRY = (FileNotFoundError,)
+
+    def __init__(
+        self,
+        source,
+        limiter: TokenBucket,
+        retries: int = FETCH_RETRIES,
+        backoff: float = FETCH_BACKOFF,
+        max_backoff: float = FETCH_BACKOFF_MAX,
+        sleep=time.sleep,
+    ):
+        self.source = source
+        self.name = getattr(source, "name", type(source).__name__)
+        self.limiter = limiter
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+        self._local = threading.local()
+
+    @property
+    def attempts(self) -> int:
+        """Requests made on this thread since the last reset_attempts()."""
+        return getattr(self._local, "attempts", 0)
+
+    def reset_attempts(self) -> None:
+        self._local.attempts = 0
+
+    def fetch(self, symbol: str, start, end) -> pd.DataFrame:
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            self._local.attempts = self.attempts + 1
+            try:
+                return self.source.fetch(symbol, start, end)
+            except self.NO_RETRY:
+                raise
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+                metrics.inc("cnc_fetch_retries_total", help="Source requests retried after an error")
+                logger.warning("Fetch %s failed (attempt %d/%d), retrying in %.1fs: %s",
+                               symbol, attempt + 1, self.retries + 1, delay, e)
+                self._sleep(delay)
+
+
+@dataclass
+class FetchResult:
+    """Outcome of one symbol in fetch_many."""
+
+    symbol: str
+    data: pd.DataFrame | None    # None when the symbol failed or had no rows
+    error: str | None            # why data is None
+    attempts: int                # source requests made (0: served from cache)
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None
+
+
+def fetch_many(
+    symbols: list[str],
+    start=START_DATE,
+    end=END_DATE,
+    source=None,
+    cache: OHLCVCache | None = None,
+    use_cache: bool = USE_CACHE,
+    workers: int = FETCH_WORKERS,
+    rate: float = FETCH_RATE,
+    burst: int = FETCH_BURST,
+    retries: int = FETCH_RETRIES,
+    backoff: float = FETCH_BACKOFF,
+    max_in_flight: int = MAX_IN_FLIGHT,
+) -> Iterator[FetchResult]:
+    """fetch_data for many symbols concurrently, yielding each as it arrives.
+
+    Requests run on `workers` threads and share one TokenBucket, so the
+    source sees at most `rate` requests per second however many threads
+    wait on it; cache hits take no token. Each symbol reads through the
+    cache exactly as fetch_data does. A failing symbol is retried with
+    exponential backoff, then reported in its FetchResult without
+    affecting the others. At most max_in_flight symbols are pending at
+    once, so a consumer that featurises results as they arrive keeps
+    memory bounded.
+
+    Yields:
+        One FetchResult per symbol, in completion order.
+    """
+    throttled = ThrottledSource(source or get_source(), TokenBucket(rate, burst), retries, backoff)
+    if cache is None and use_cache:
+        cache = _get_default_cache()
+
+    def run_one(symbol: str) -> FetchResult:
+        t0 = time.perf_counter()
+        throttled.reset_attempts()     # threads are reused; a cache hit makes no request
+        with metrics.symbol_scope(symbol), metrics.timer("fetch"):
+            try:
+                df = _in_range(symbol, _download(symbol, start, end, throttled, cache, use_cache), start, end)
+                error = None if df is not None else "No data"
+            except Exception as e:
+                logger.error("Failed to download data for %s: %s", symbol, e)
+                metrics.inc("cnc_fetch_errors_total", help="fetch_data calls that raised", symbol=symbol)
+                df, error = None, f"{type(e).__name__}: {e}"
+        return FetchResult(symbol, df, error, throttled.attempts, time.perf_counter() - t0)
+
+    queue = iter(symbols)
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fetch") as pool:
+        pending = {pool.submit(run_one, s) for s in itertools.islice(queue, max(1, max_in_flight))}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                nxt = next(queue, None)
+                if nxt is not None:
+                    pending.add(pool.submit(run_one, nxt))
+                result = future.result()
+                failed += not result.ok
+                yield result
+    if failed:
+        logger.warning("fetch_many: %d symbol(s) failed", failed)
+
+
+def throttled_fetch(
+    start=START_DATE,
+    end=END_DATE,
+    source=None,
+    cache: OHLCVCache | None = None,
+    use_cache: bool = USE_CACHE,
+    rate: float = FETCH_RATE,
+    burst: int = FETCH_BURST,
+    retries: int = FETCH_RETRIES,
+    backoff: float = FETCH_BACKOFF,
+) -> Callable[[str], pd.DataFrame | None]:
+    """fetch_data(symbol) under fetch_many's rate limit and retries, for callers with their own threads.
+
+    Every call of the returned function, from any thread, takes tokens
+    from one shared TokenBucket and is retried like a fetch_many request.
+    Like fetch_data, it returns None when the symbol fails and honours
+    shared_fetches() for the default source and cache.
+    """
+    throttled = ThrottledSource(source or get_source(), TokenBucket(rate, burst), retries, backoff)
+    memoise = source is None and cache is None
+
+    def fetch(symbol: str) -> pd.DataFrame | None:
+        shared = _shared if memoise else None
+        key = (symbol, str(start), str(end), use_cache)
+        if shared is not None and key in shared:
+            return shared[key]
+        with metrics.symbol_scope(symbol), metrics.timer("fetch"):
+            df = _fetch(symbol, start, end, throttled, cache, use_cache)
+        if shared is not None:
+            shared[key] = df
+        return df
+
+    return fetch
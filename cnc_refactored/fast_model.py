@@ -0,0 +1,200 @@
+"""
+fast_model.py
+-------------
+Lightweight inference format for the trained booster.
+
+train_model exports the model twice next to MODEL_PATH: the booster in
+XGBoost's native JSON format (BOOSTER_PATH, loadable by any XGBoost
+version) and the trees flattened into plain arrays (FAST_MODEL_PATH, an
+.npz). FastModel scores from the .npz with NumPy alone, so the signal job
+never imports xgboost or scikit-learn and holds a few hundred KB instead
+of a full estimator.
+
+Every node of every tree is one entry in the flat arrays. Leaves point to
+themselves, so all trees are walked in lock-step for a block of rows:
+max_depth rounds of gather + compare move each (row, tree) cursor one
+level down, then the leaf values are summed. Splits follow XGBoost's
+rule (go left when x < threshold, compared in float32; NaN takes the
+node's default direction), so probabilities match predict_proba.
+
+Only this module's export side needs xgboost, and only when called.
+"""
+
+import json
+import logging
+import os
+import numpy as np
+from config import FAST_MODEL_PATH, BOOSTER_PATH, FAST_MODEL_BLOCK_ROWS
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_OBJECTIVES = ("binary:logistic", "reg:logistic")
+
+
+# ── Export ─────────────────────────────────────────────────────────────────────
+
+def flatten_booster(booster_json: dict) -> dict[str, np.ndarray]:
+    """Flatten a booster's JSON dump (Booster.save_raw("json")) into node arrays.
+
+    Returns:
+        Arrays for np.savez: left, right, feature, threshold, default_left,
+        value (leaf value, 0 for split nodes), roots (first node of each
+        tree), plus meta (a JSON string with feature names, objective,
+        base margin and max depth).
+
+    Raises:
+        ValueError: For objectives or split types FastModel cannot evaluate.
+    """
+    learner = booster_json["learner"]
+    objective = learner["objective"]["name"]
+    if objective not in SUPPORTED_OBJECTIVES:
+        raise ValueError(f"Cannot export objective '{objective}' (supported: {SUPPORTED_OBJECTIVES})")
+    model = learner["gradient_booster"]["model"]
+    if any(info != 0 for info in model.get("tree_info", [])):
+        raise ValueError("Cannot export multi-class boosters")
+
+    left, right, feature, threshold, default_left, value, roots = [], [], [], [], [], [], []
+    max_depth, offset = 0, 0
+    for tree in model["trees"]:
+        if any(tree.get("split_type", [])):
+            raise ValueError("Cannot export boosters with categorical splits")
+        lc = np.asarray(tree["left_children"], dtype=np.int64)
+        rc = np.asarray(tree["right_children"], dtype=np.int64)
+        cond = np.asarray(tree["split_conditions"], dtype=np.float32)
+        n = len(lc)
+        leaf = lc == -1
+        ids = np.arange(n)
+
+        # Node ids are breadth-first, so a parent always precedes its children
+        depth = np.zeros(n, dtype=np.int64)
+        for i in np.flatnonzero(~leaf):
+            depth[lc[i]] = depth[rc[i]] = depth[i] + 1
+        max_depth = max(max_depth, int(depth.max()))
+
+        left.append(np.where(leaf, ids, lc) + offset)
+        right.append(np.where(leaf, ids, rc) + offset)
+        feature.append(np.where(leaf, 0, np.asarray(tree["split_indices"], dtype=np.int64)))
+        threshold.append(np.where(leaf, np.float32(0), cond))
+        default_left.append(np.asarray(tree["default_left"], dtype=bool))
+        value.append(np.where(leaf, cond, np.float32(0)))
+        roots.append(offset)
+        offset += n
+
+    base_score = learner["learner_model_param"]["base_score"]
+    p = float(json.loads(base_score)[0] if base_score.startswith("[") else base_score)
+    meta = {
+        "objective": objective,
+        "feature_names": learner.get("feature_names", []),
+        "num_feature": int(learner["learner_model_param"]["num_feature"]),
+        "base_margin": float(np.log(p / (1 - p))),
+        "max_depth": max_depth,
+    }
+    return {
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float32),
+        "default_left": np.concatenate(default_left),
+        "value": np.concatenate(value).astype(np.float32),
+        "roots": np.asarray(roots, dtype=np.int32),
+        "meta": np.array(json.dumps(meta)),
+    }
+
+
+def export_model(model, fast_path: str = FAST_MODEL_PATH, booster_path: str | None = BOOSTER_PATH) -> None:
+    """Write model's booster as native JSON and as flattened arrays.
+
+    Both files are written then renamed, so readers never see a partial file.
+
+    Args:
+        model:        Trained XGBClassifier (or xgboost.Booster).
+        fast_path:    Destination .npz for FastModel.
+        booster_path: Destination for Booster.save_model (.json or .ubj);
+                      None skips it.
+    """
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    if booster_path:
+        # Keep the extension: save_model picks JSON or UBJ from it
+        root, ext = os.path.splitext(booster_path)
+        tmp = f"{root}.tmp{ext}"
+        booster.save_model(tmp)
+        os.replace(tmp, booster_path)
+    arrays = flatten_booster(json.loads(bytes(booster.save_raw("json"))))
+    tmp = f"{fast_path}.tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, fast_path)
+    logger.info("Exported %d trees (%d nodes) to %s", len(arrays["roots"]), len(arrays["left"]), fast_path)
+
+
+# ── Inference ──────────────────────────────────────────────────────────────────
+
+class FastModel:
+    """NumPy-only evaluator for an exported booster.
+
+    Exposes predict_proba / predict like the sklearn wrapper, so it can be
+    passed anywhere the pipeline takes a model (e.g. scoring.predict_probs).
+    """
+
+    def __init__(self, arrays: dict[str, np.ndarray], block_rows: int = FAST_MODEL_BLOCK_ROWS):
+        meta = json.loads(str(arrays["meta"]))
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.default_left = arrays["default_left"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.objective = meta["objective"]
+        self.feature_names = meta["feature_names"]
+        self.num_feature = meta["num_feature"]
+        self.base_margin = meta["base_margin"]
+        self.max_depth = meta["max_depth"]
+        self.block_rows = block_rows
+        # children[2 * node + go_left] is the next node; leaves map to themselves
+        self._children = np.stack([self.right, self.left], axis=1).ravel()
+        self._feature = self.feature.astype(np.intp)
+
+    @classmethod
+    def load(cls, path: str = FAST_MODEL_PATH, **kwargs) -> "FastModel":
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {k: data[k] for k in data.files}
+        return cls(arrays, **kwargs)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def _matrix(self, X) -> np.ndarray:
+        if hasattr(X, "columns") and self.feature_names:
+            X = X[self.feature_names]
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.num_feature:
+            raise ValueError(f"Expected {self.num_feature} feature columns, got shape {X.shape}")
+        return X
+
+    def predict_margin(self, X) -> np.ndarray:
+        """Raw margin (sum of leaf values + base margin) per row."""
+        X = self._matrix(X)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.block_rows):
+            block = X[start:start + self.block_rows]
+            node = np.broadcast_to(self.roots, (len(block), self.n_trees)).copy()
+            cells = block.ravel()
+            row_base = (np.arange(len(block), dtype=np.intp) * block.shape[1])[:, None]
+            has_nan = np.isnan(block).any()
+            for _ in range(self.max_depth):
+                x = cells[row_base + self._feature[node]]
+                go_left = x < self.threshold[node]
+                if has_nan:
+                    go_left = np.where(np.isnan(x), self.default_left[node], go_left)
+                node = self._children[2 * node + go_left]
+            out[start:start + len(block)] = self.value[node].sum(axis=1, dtype=np.float64)
+        return out + self.base_margin
+
+    def predict_proba(self, X) -> np.ndarray:
+        """(n, 2) class probabilities, like XGBClassifier.predict_proba."""
+        p = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X, threshold: float = 0.5) -> np.ndarray:
+        return (self.predict_proba(X)[:, 1] >= threshold).astype(np.int64)
@@ -0,0 +1,165 @@
+"""
+feature_registry.py
+-------------------
+Declarative registry of every feature the engine in panel_features.py can
+compute. FEATURE_COLS (config.py) selects model columns from it.
+
+Each feature names its inputs (raw OHLCV columns or other registered
+features) and a NumPy function over 2-D (dates × symbols) arrays:
+
+  - "series" features are per-symbol time series. They receive each
+    symbol's bars packed into one contiguous run per column (leading NaN,
+    no gaps), so windows and recursions never straddle a missing day.
+  - "cross" features compare symbols on the same date. They receive the
+    arrays aligned on the shared date index (NaN where a symbol has no bar).
+
+Each feature also declares its warm-up: how many leading rows of its
+(fully defined) inputs pass before its own first value. Requested columns
+are resolved to the minimal set of features they depend on, each
+computed once however many features share it (e.g. ema20 feeds two
+columns), and warmup_rows() gives the exact history a column set needs.
+
+Recursive features (EMA, Wilder smoothing) also declare their decay, the
+weight kept on the previous value each bar. Their value depends on every
+earlier bar, but the starting point's weight shrinks as decay ** n, so
+history_rows() gives the bars after which a value computed from a
+truncated history matches the full-history one to a tolerance.
+
+Intermediates (public=False) such as ema50 can be shared by several
+features but are not offered as model columns.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Callable
+import numpy as np
+
+RAW_INPUTS = ("Open", "High", "Low", "Close", "Volume")
+KINDS = ("series", "cross")
+
+
+@dataclass(frozen=True)
+class Feature:
+    """One registered feature: fn(*inputs) -> array shaped like the inputs."""
+
+    name: str
+    inputs: tuple[str, ...]
+    fn: Callable[..., np.ndarray]
+    warmup: int = 0          # leading rows undefined even when every input is defined
+    decay: float = 0.0       # weight a recursive feature keeps on its previous value (0: finite window)
+    kind: str = "series"
+    public: bool = True
+
+
+REGISTRY: dict[str, Feature] = {}
+
+
+def register(
+    name: str,
+    inputs: tuple[str, ...],
+    warmup: int = 0,
+    decay: float = 0.0,
+    kind: str = "series",
+    public: bool = True,
+):
+    """Decorator adding fn to REGISTRY as feature `name`.
+
+    Inputs must be raw columns or already-registered features, so
+    registration order is always a valid computation order.
+
+    Raises:
+        ValueError: On duplicate names, unknown inputs or kinds, or a
+                    series feature depending on a cross-sectional one.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {KINDS}, got '{kind}'")
+    if not 0 <= decay < 1:
+        raise ValueError(f"decay must be in [0, 1), got {decay}")
+    if name in REGISTRY or name in RAW_INPUTS:
+        raise ValueError(f"Feature '{name}' is already registered")
+    for dep in inputs:
+        if dep not in RAW_INPUTS and dep not in REGISTRY:
+            raise ValueError(f"Feature '{name}' depends on unknown input '{dep}'")
+        if kind == "series" and dep in REGISTRY and REGISTRY[dep].kind == "cross":
+            raise ValueError(f"Series feature '{name}' cannot depend on cross-sectional '{dep}'")
+
+    def wrap(fn):
+        REGISTRY[name] = Feature(name, tuple(inputs), fn, warmup, decay, kind, public)
+        return fn
+    return wrap
+
+
+def public_features(kind: str | None = None) -> list[str]:
+    """Names selectable as model columns, in registration order."""
+    return [f.name for f in REGISTRY.values() if f.public and (kind is None or f.kind == kind)]
+
+
+def check_columns(columns: list[str]) -> None:
+    """Raise ValueError if any column is not a registered public feature."""
+    unknown = [c for c in columns if c not in REGISTRY or not REGISTRY[c].public]
+    if unknown:
+        raise ValueError(f"Unknown feature column(s): {', '.join(unknown)}. "
+                         f"Registered: {', '.join(public_features())}")
+
+
+def resolve(columns: list[str]) -> list[Feature]:
+    """Every feature the columns depend on (themselves included), each once, in computation order."""
+    needed: set[str] = set()
+    stack = list(columns)
+    while stack:
+        name = stack.pop()
+        if name in needed or name in RAW_INPUTS:
+            continue
+        if name not in REGISTRY:
+            raise ValueError(f"Unknown feature '{name}'")
+        needed.add(name)
+        stack.extend(REGISTRY[name].inputs)
+    return [f for f in REGISTRY.values() if f.name in needed]
+
+
+def split_columns(columns: list[str]) -> tuple[list[str], list[str]]:
+    """(per-symbol columns, cross-sectional columns) needed for `columns`.
+
+    The per-symbol list holds the series columns of `columns` plus every
+    series feature a cross-sectional one reads, so frames featurised one
+    symbol at a time carry all the inputs panel_features.add_cross_features
+    needs afterwards.
+    """
+    features = resolve(columns)
+    cross = [f for f in features if f.kind == "cross"]
+    reads = {dep for f in cross for dep in f.inputs}
+    series = [f.name for f in features if f.kind == "series" and (f.name in columns or f.name in reads)]
+    return series, [f.name for f in cross if f.name in columns]
+
+
+def warmup_rows(columns: list[str]) -> int:
+    """Leading bars of a symbol before every one of `columns` is defined.
+
+    Warm-ups add up along a dependency chain (ema20_ema50_diff needs ema50's
+    49 rows); the result is the longest chain over all columns.
+    """
+    total: dict[str, int] = {}
+    for f in resolve(columns):
+        total[f.name] = f.warmup + max((total.get(dep, 0) for dep in f.inputs), default=0)
+    return max((total[c] for c in columns), default=0)
+
+
+def convergence_rows(decay: float, tolerance: float) -> int:
+    """Bars until a recursion's starting value keeps less than `tolerance` weight."""
+    if decay == 0:
+        return 0
+    return int(math.ceil(math.log(tolerance) / math.log(decay)))
+
+
+def history_rows(columns: list[str], tolerance: float) -> int:
+    """Trailing bars needed for the last row of `columns` to match full history.
+
+    Like warmup_rows, plus convergence_rows for every recursion along the
+    chain, so the last value computed from this many bars is within
+    `tolerance` (relative to the starting error) of the full-history value.
+    """
+    total: dict[str, int] = {}
+    for f in resolve(columns):
+        own = f.warmup + convergence_rows(f.decay, tolerance)
+        total[f.name] = own + max((total.get(dep, 0) for dep in f.inputs), default=0)
+    return max((total[c] for c in columns), default=0) + 1
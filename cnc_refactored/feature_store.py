@@ -0,0 +1,126 @@
+"""
+feature_store.py
+----------------
+Persistent store of engineered features + labels per symbol.
+Entries are keyed on a hash of the raw OHLCV slice, FEATURE_COLS and the
+TARGET_PCT / STOP_PCT / HOLD_DAYS trade parameters, so any change to the
+inputs produces a new key and the stale entry is replaced. Arrays are
+saved as .npy files and read back memory-mapped.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from feature_registry import split_columns
+from config import FEATURE_COLS, TARGET_PCT, STOP_PCT, HOLD_DAYS, FEATURE_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Bump when add_features / create_labels change in a way the key can't see
+STORE_VERSION = 1
+
+RAW_COLS = ["Open", "High", "Low", "Close", "Volume"]
+# Per-symbol features only: cross-sectional ones depend on the universe, not on this entry's raw data
+STORED_COLS = RAW_COLS + [c for c in split_columns(FEATURE_COLS)[0] if c not in RAW_COLS]
+
+
+def store_key(
+    raw: pd.DataFrame,
+    feature_cols: list[str] = FEATURE_COLS,
+    target_pct: float = TARGET_PCT,
+    stop_pct: float = STOP_PCT,
+    hold_days: int = HOLD_DAYS,
+) -> str:
+    """Hash of the raw OHLCV data plus every setting the engineered frame depends on."""
+    h = hashlib.sha256()
+    h.update(json.dumps({
+        "version": STORE_VERSION,
+        "features": list(feature_cols),
+        "target_pct": target_pct,
+        "stop_pct": stop_pct,
+        "hold_days": hold_days,
+    }, sort_keys=True).encode())
+    h.update(raw.index.to_numpy(dtype="datetime64[ns]").view(np.int64).tobytes())
+    h.update(np.ascontiguousarray(raw[RAW_COLS].to_numpy(dtype=np.float64)).tobytes())
+    return h.hexdigest()[:16]
+
+
+class FeatureStore:
+    """One directory per symbol holding a single <key>/ entry.
+
+    Each entry contains:
+      - values.npy: float64 matrix of STORED_COLS (rows × cols)
+      - label.npy:  int8 labels
+      - dates.npy:  int64 nanosecond timestamps
+      - meta.json:  column names
+    """
+
+    def __init__(self, root: str = FEATURE_STORE_DIR):
+        self.root = root
+
+    def _symbol_dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol.replace("/", "_").replace(":", "_"))
+
+    def load(self, symbol: str, key: str) -> pd.DataFrame | None:
+        """Return the stored frame for (symbol, key), memory-mapped, or None on a miss."""
+        entry = os.path.join(self._symbol_dir(symbol), key)
+        if not os.path.exists(os.path.join(entry, "meta.json")):
+            return None
+        with open(os.path.join(entry, "meta.json")) as f:
+            meta = json.load(f)
+        values = np.load(os.path.join(entry, "values.npy"), mmap_mode="r")
+        label  = np.load(os.path.join(entry, "label.npy"), mmap_mode="r")
+        dates  = np.load(os.path.join(entry, "dates.npy"))
+
+        df = pd.DataFrame(values, index=pd.DatetimeIndex(dates.view("datetime64[ns]")),
+                          columns=meta["columns"], copy=False)
+        df["label"] = label
+        return df
+
+    def save(self, symbol: str, key: str, df: pd.DataFrame) -> None:
+        """Persist an engineered frame under key, replacing any older entry."""
+        sym_dir = self._symbol_dir(symbol)
+        tmp = os.path.join(sym_dir, f".{key}.{os.getpid()}.tmp")
+        os.makedirs(tmp, exist_ok=True)
+
+        np.save(os.path.join(tmp, "values.npy"),
+                np.ascontiguousarray(df[STORED_COLS].to_numpy(dtype=np.float64)))
+        np.save(os.path.join(tmp, "label.npy"), df["label"].to_numpy(dtype=np.int8))
+        np.save(os.path.join(tmp, "dates.npy"),
+                df.index.to_numpy(dtype="datetime64[ns]").view(np.int64))
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump({"columns": STORED_COLS}, f)
+
+        # Drop stale entries, then move the new one into place
+        for name in os.listdir(sym_dir):
+            path = os.path.join(sym_dir, name)
+            if path != tmp and not name.startswith("."):
+                shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, os.path.join(sym_dir, key))
+
+    def load_or_build(self, symbol: str, raw: pd.DataFrame, build) -> pd.DataFrame:
+        """Return the stored frame for raw data, building and saving it on a miss.
+
+        Args:
+            symbol: Ticker symbol.
+            raw:    Raw OHLCV DataFrame the entry is keyed on.
+            build:  Callable(raw) -> engineered DataFrame with FEATURE_COLS and 'label'.
+
+        Returns:
+            DataFrame of STORED_COLS + 'label', the same shape on hit or miss.
+        """
+        key = store_key(raw)
+        df = self.load(symbol, key)
+        if df is not None:
+            logger.debug("Feature store hit for %s (%s)", symbol, key)
+            return df
+        df = build(raw)
+        try:
+            self.save(symbol, key, df)
+        except OSError as e:
+            logger.warning("Could not write feature store entry for %s: %s", symbol, e)
+        return df[STORED_COLS + ["label"]]
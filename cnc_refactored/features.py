@@ -2,48 +2,60 @@
 features.py
 -----------
 Technical indicator feature engineering for the CNC AI trading system.
+Features are declared in feature_registry.py and computed by the
+vectorised engine in panel_features.py.
 """
 
 import logging
 import pandas as pd
-import ta
+import metrics
+from panel_features import featurise
+from feature_registry import split_columns
+from config import FEATURE_COLS
 
 logger = logging.getLogger(__name__)
 
 
-def add_features(df: pd.DataFrame) -> pd.DataFrame:
+@metrics.timed("add_features")
+def add_features(df: pd.DataFrame, columns: list[str] | None = None) -> pd.DataFrame:
     """Compute technical indicator features and append them to the DataFrame.
 
     Works on a copy of the input — does NOT mutate the original.
 
     Args:
-        df: OHLCV DataFrame with columns: Open, High, Low, Close, Volume.
+        df:      OHLCV DataFrame with columns: Open, High, Low, Close, Volume.
+        columns: Feature columns to compute (default FEATURE_COLS). Only
+                 these and the intermediates they depend on are computed.
 
     Returns:
-        A new DataFrame with additional feature columns:
+        A new DataFrame with the requested columns plus their intermediates.
+        For FEATURE_COLS:
           - ema20, ema50: exponential moving averages
           - atr: average true range
+          - vol_ma10: 10-day mean volume
           - rsi: relative strength index
           - close_ema20_ratio: Close / EMA20 (trend proximity)
           - ema20_ema50_diff: (EMA20 - EMA50) / EMA50 (trend direction)
           - atr_pct: ATR / Close (normalised volatility)
           - vol_ratio: Volume / 10-day rolling mean volume (volume surge)
-        Rows with NaN values (from indicator warm-up) are dropped.
+        The first feature_registry.warmup_rows(columns) rows (indicator
+        warm-up) are dropped.
+
+    Raises:
+        ValueError: If columns include cross-sectional features, which are
+                    only meaningful over a universe: use
+                    panel_features.add_panel_features, or add_features with
+                    the per-symbol columns of split_columns() followed by
+                    panel_features.add_cross_features.
     """
-    df = df.copy()
-
-    df["ema20"] = ta.trend.ema_indicator(df["Close"], window=20)
-    df["ema50"] = ta.trend.ema_indicator(df["Close"], window=50)
-    df["atr"]   = ta.volatility.average_true_range(df["High"], df["Low"], df["Close"], window=14)
-    df["rsi"]   = ta.momentum.rsi(df["Close"], window=14)
-
-    df["close_ema20_ratio"] = df["Close"] / df["ema20"]
-    df["ema20_ema50_diff"]  = (df["ema20"] - df["ema50"]) / df["ema50"]
-    df["atr_pct"]           = df["atr"] / df["Close"]
-    df["vol_ratio"]         = df["Volume"] / df["Volume"].rolling(10).mean()
-
-    before = len(df)
-    df.dropna(inplace=True)
-    logger.debug("add_features: dropped %d warm-up rows, %d remaining", before - len(df), len(df))
-
-    return df
+    columns = FEATURE_COLS if columns is None else columns
+    _, cross = split_columns(columns)
+    if cross:
+        raise ValueError(f"Cross-sectional feature(s) {', '.join(cross)} need the whole universe; "
+                         f"use panel_features.add_panel_features or add_cross_features")
+    out = featurise({"": df}, columns).get("")
+    if out is None:
+        # Empty input: keep the column layout
+        out = df.copy().reindex(columns=[*df.columns, *(c for c in columns if c not in df.columns)])
+    logger.debug("add_features: dropped %d warm-up rows, %d remaining", len(df) - len(out), len(out))
+    return out
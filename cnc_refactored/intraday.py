@@ -0,0 +1,252 @@
+"""
+intraday.py
+-----------
+Minute/hourly bar support: chunked loading from local files, a streaming
+OHLCV resampler, multi-timeframe features and time-based trade labels.
+
+Raw intraday files are 100-400× larger than daily history, so they are
+never loaded whole: files are read in INTRADAY_CHUNK_ROWS chunks and
+resampled to the INTRADAY_BASE bar size on the fly, carrying only the
+still-open bucket between chunks. Features and labels are then built on
+the (much smaller) base bars. Higher-timeframe features are joined as-of
+the time each higher bar closed, so no bar sees data from its future.
+
+Usage:
+    python intraday.py RELIANCE.NS
+    python intraday.py RELIANCE.NS --base 15min --timeframes 1h 1D --hold 2D
+"""
+
+import argparse
+import logging
+import os
+from typing import Iterable, Iterator
+import numpy as np
+import pandas as pd
+from features import add_features
+from trade_utils import first_touch_time
+from data_utils import OHLCV_COLS
+from config import (
+    TARGET_PCT, STOP_PCT, FEATURE_COLS,
+    INTRADAY_DIR, INTRADAY_CHUNK_ROWS, INTRADAY_BASE, INTRADAY_TIMEFRAMES, INTRADAY_HOLD,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+OHLCV_AGG = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+
+# ── Loading ────────────────────────────────────────────────────────────────────
+
+def _intraday_path(symbol: str, directory: str) -> str:
+    base = os.path.join(directory, symbol)
+    for ext in (".parquet", ".csv"):
+        if os.path.exists(base + ext):
+            return base + ext
+    raise FileNotFoundError(f"No intraday data file for '{symbol}' in {directory}")
+
+
+def _tidy(df: pd.DataFrame) -> pd.DataFrame:
+    if not isinstance(df.index, pd.DatetimeIndex):
+        # Timestamp stored as the first column rather than the index
+        df = df.set_index(df.columns[0])
+        df.index = pd.to_datetime(df.index)
+    return df[[c for c in OHLCV_COLS if c in df.columns]].dropna()
+
+
+def read_chunks(
+    symbol: str,
+    directory: str = INTRADAY_DIR,
+    start=None,
+    end=None,
+    chunk_rows: int = INTRADAY_CHUNK_ROWS,
+) -> Iterator[pd.DataFrame]:
+    """Yield a symbol's raw bars in time order, at most chunk_rows at a time.
+
+    Files must be sorted by time, with the timestamp as the index or the
+    first column. Parquet is read by record batch, CSV by row chunk.
+
+    Args:
+        symbol:     Ticker symbol (file stem).
+        directory:  Directory holding <symbol>.parquet or <symbol>.csv.
+        start, end: Optional [start, end) time filter.
+        chunk_rows: Rows per chunk.
+    """
+    path = _intraday_path(symbol, directory)
+    start = pd.Timestamp(start) if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        chunks = (b.to_pandas() for b in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows))
+    else:
+        chunks = pd.read_csv(path, index_col=0, parse_dates=True, chunksize=chunk_rows)
+
+    for chunk in chunks:
+        chunk = _tidy(chunk)
+        if start is not None:
+            chunk = chunk[chunk.index >= start]
+        if end is not None:
+            if len(chunk) and chunk.index[0] >= end:
+                return
+            chunk = chunk[chunk.index < end]
+        if len(chunk):
+            yield chunk
+
+
+# ── Resampling ─────────────────────────────────────────────────────────────────
+
+def resample_ohlcv(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """Aggregate OHLCV bars to a coarser fixed bar size (labelled by bucket start).
+
+    Buckets are the epoch-anchored floor of each timestamp, exactly as in
+    resample_chunks. (DataFrame.resample ignores origin="epoch" for
+    non-Tick rules such as "1D" in pandas 3, so its edges could differ.)
+    """
+    out = df.groupby(df.index.floor(pd.Timedelta(rule))).agg(OHLCV_AGG)
+    return out.dropna(subset=["Open"])
+
+
+def resample_chunks(chunks: Iterable[pd.DataFrame], rule: str) -> Iterator[pd.DataFrame]:
+    """Streaming resample_ohlcv over time-ordered chunks.
+
+    Each chunk's completed buckets are emitted immediately; the rows of the
+    last (possibly still open) bucket are carried into the next chunk, so
+    the output equals resample_ohlcv on the concatenated input.
+
+    Args:
+        chunks: Time-ordered OHLCV chunks (e.g. from read_chunks).
+        rule:   Fixed bar size such as "5min", "1h" or "1D".
+    """
+    step = pd.Timedelta(rule)
+    carry = None
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk])
+        last_bucket = chunk.index[-1].floor(step)
+        done = chunk.index < last_bucket
+        carry = chunk[~done]
+        if done.any():
+            yield resample_ohlcv(chunk[done], rule)
+    if carry is not None and len(carry):
+        yield resample_ohlcv(carry, rule)
+
+
+def load_bars(
+    symbol: str,
+    rule: str = INTRADAY_BASE,
+    directory: str = INTRADAY_DIR,
+    start=None,
+    end=None,
+    chunk_rows: int = INTRADAY_CHUNK_ROWS,
+) -> pd.DataFrame:
+    """Read a symbol's raw intraday file in chunks and return rule-sized bars."""
+    parts = list(resample_chunks(read_chunks(symbol, directory, start, end, chunk_rows), rule))
+    if not parts:
+        return pd.DataFrame(columns=OHLCV_COLS, index=pd.DatetimeIndex([]))
+    return pd.concat(parts)
+
+
+# ── Features ───────────────────────────────────────────────────────────────────
+
+def timeframe_suffix(rule: str) -> str:
+    return "_" + rule.lower()
+
+
+def multi_timeframe_features(
+    bars: pd.DataFrame,
+    base: str = INTRADAY_BASE,
+    timeframes: list[str] = INTRADAY_TIMEFRAMES,
+) -> pd.DataFrame:
+    """add_features on the base bars plus FEATURE_COLS of each higher timeframe.
+
+    A higher-timeframe bar starting at T is only known once it closes at
+    T + rule, while a base bar starting at t is scored at its close
+    t + base. Each base row therefore gets the latest higher-timeframe bar
+    with T + rule <= t + base (as-of join), never a partially formed one.
+
+    Returns:
+        add_features(bars) with extra columns <feature>_<timeframe>; rows
+        before every timeframe has warmed up are dropped.
+    """
+    out = add_features(bars)
+    scored_at = out.index + pd.Timedelta(base)
+    for rule in timeframes:
+        higher = add_features(resample_ohlcv(bars, rule))[FEATURE_COLS]
+        higher = higher.add_suffix(timeframe_suffix(rule))
+        higher.index = higher.index + pd.Timedelta(rule)   # availability time
+        joined = pd.merge_asof(
+            pd.DataFrame({"_t": scored_at}), higher.rename_axis("_t").reset_index(),
+            on="_t", direction="backward",
+        )
+        for col in higher.columns:
+            out[col] = joined[col].to_numpy()
+    return out.dropna()
+
+
+def feature_columns(timeframes: list[str] = INTRADAY_TIMEFRAMES) -> list[str]:
+    """FEATURE_COLS plus their higher-timeframe counterparts, in column order."""
+    return FEATURE_COLS + [c + timeframe_suffix(r) for r in timeframes for c in FEATURE_COLS]
+
+
+# ── Labels ─────────────────────────────────────────────────────────────────────
+
+def create_intraday_labels(
+    df: pd.DataFrame,
+    hold=INTRADAY_HOLD,
+    target_pct: float = TARGET_PCT,
+    stop_pct: float = STOP_PCT,
+) -> pd.DataFrame:
+    """create_labels with a time-based holding period (trade_utils.first_touch_time).
+
+    Returns:
+        df truncated to bars whose whole holding period is in the data, with
+        'label', 'pnl' and 'exit_time' columns.
+    """
+    labels, pnl, exits = first_touch_time(
+        df.index.to_numpy(), df["Open"].to_numpy(), df["High"].to_numpy(), df["Low"].to_numpy(),
+        hold, target_pct, stop_pct,
+    )
+    n = len(labels)
+    out = df.iloc[:n].copy()
+    out["label"] = labels
+    out["pnl"] = pnl
+    out["exit_time"] = df.index.to_numpy()[np.arange(n) + exits]
+    logger.info("create_intraday_labels: %d labels (%d positive), hold %s", n, int(labels.sum()), hold)
+    return out
+
+
+def build_intraday(
+    symbol: str,
+    base: str = INTRADAY_BASE,
+    timeframes: list[str] = INTRADAY_TIMEFRAMES,
+    hold=INTRADAY_HOLD,
+    directory: str = INTRADAY_DIR,
+    start=None,
+    end=None,
+) -> pd.DataFrame:
+    """Load → resample → multi-timeframe features → time-based labels for one symbol."""
+    bars = load_bars(symbol, base, directory, start, end)
+    logger.info("Loaded %d %s bars for %s", len(bars), base, symbol)
+    return create_intraday_labels(multi_timeframe_features(bars, base, timeframes), hold)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build intraday features and labels for a symbol")
+    parser.add_argument("symbol")
+    parser.add_argument("--dir", default=INTRADAY_DIR)
+    parser.add_argument("--base", default=INTRADAY_BASE)
+    parser.add_argument("--timeframes", nargs="*", default=INTRADAY_TIMEFRAMES)
+    parser.add_argument("--hold", default=INTRADAY_HOLD)
+    parser.add_argument("--out", default=None, help="Parquet file for the labelled frame")
+    args = parser.parse_args()
+
+    df = build_intraday(args.symbol, args.base, args.timeframes, args.hold, args.dir)
+    logger.info("%d labelled rows, %.1f%% positive", len(df), 100 * df["label"].mean() if len(df) else 0.0)
+    if args.out:
+        df.to_parquet(args.out)
+        logger.info("Saved to %s", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+jobs.py
+-------
+Background job runner used by server.py for long-running requests
+(/api/train, /api/backtest). Jobs run on a bounded thread pool, identical
+in-flight jobs are de-duplicated, and clients poll progress by job id.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
+from config import JOB_WORKERS, JOB_HISTORY
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+@dataclass
+class Job:
+    """State of one background job, as reported to polling clients."""
+
+    id: str
+    kind: str
+    key: str
+    status: str = QUEUED
+    progress: float = 0.0
+    message: str = ""
+    symbols: dict[str, str] = field(default_factory=dict)
+    result: object = None
+    error: str | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    revision: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        d = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "message": self.message,
+            "symbols": dict(self.symbols),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if include_result:
+            d["result"] = self.result
+        return d
+
+
+class JobReporter:
+    """Handle passed to job functions for reporting progress."""
+
+    def __init__(self, job: Job):
+        self._job = job
+
+    def progress(self, fraction: float, message: str | None = None) -> None:
+        self._job.progress = min(max(fraction, 0.0), 1.0)
+        if message is not None:
+            self._job.message = message
+        self._job.revision += 1
+
+    def symbol(self, symbol: str, status: str) -> None:
+        self._job.symbols[symbol] = status
+        self._job.revision += 1
+
+
+class JobManager:
+    """Runs jobs on a bounded thread pool and keeps their state for polling.
+
+    Submitting a job whose key matches a queued or running job returns the
+    existing job instead of starting a duplicate. Only the most recent
+    `history` finished jobs are kept.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, history: int = JOB_HISTORY):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: dict[str, Job] = {}
+        self._active: dict[str, str] = {}
+        self._history = history
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., object], key: str | None = None, **kwargs) -> Job:
+        """Queue fn(reporter, **kwargs) and return its Job (or the identical in-flight one)."""
+        key = key or kind
+        with self._lock:
+            active_id = self._active.get(key)
+            if active_id is not None:
+                logger.info("Job %s (%s) already in flight — reusing", active_id, key)
+                return self._jobs[active_id]
+            job = Job(id=uuid.uuid4().hex[:12], kind=kind, key=key)
+            self._jobs[job.id] = job
+            self._active[key] = job.id
+            self._prune()
+        self._executor.submit(self._run, job, fn, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+    def wait(self, job_id: str, timeout: float | None = None) -> Job:
+        """Block until a job finishes (mainly for tests and CLI use)."""
+        deadline = None if timeout is None else time.time() + timeout
+        job = self._jobs[job_id]
+        while not job.finished:
+            if deadline is not None and time.time() > deadline:
+                raise TimeoutError(f"Job {job_id} still {job.status}")
+            time.sleep(0.01)
+        return job
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, job: Job, fn: Callable, kwargs: dict) -> None:
+        job.status, job.started_at = RUNNING, time.time()
+        job.revision += 1
+        try:
+            job.result = fn(JobReporter(job), **kwargs)
+            job.status, job.progress = DONE, 1.0
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.kind)
+            job.status, job.error = FAILED, str(e)
+        finally:
+            job.finished_at = time.time()
+            job.revision += 1
+            with self._lock:
+                if self._active.get(job.key) == job.id:
+                    del self._active[job.key]
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.finished]
+        finished.sort(key=lambda j: j.finished_at or 0)
+        for job in finished[:max(0, len(finished) - self._history)]:
+            del self._jobs[job.id]
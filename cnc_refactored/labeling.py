@@ -7,19 +7,23 @@ Label = 1 if a long trade hits the target within HOLD_DAYS, else 0.
 
 import logging
 import pandas as pd
-from trade_utils import simulate_trade
+import metrics
+from trade_utils import simulate_trades
 from config import HOLD_DAYS
 
 logger = logging.getLogger(__name__)
 
 
+@metrics.timed("create_labels")
 def create_labels(df: pd.DataFrame) -> pd.DataFrame:
     """Attach binary trade outcome labels to each bar in the DataFrame.
 
     For each bar i, simulates a long entry at bar i+1 Open and checks
-    whether the target or stop is hit within HOLD_DAYS bars.
+    whether the target or stop is hit within HOLD_DAYS bars. All bars are
+    evaluated in one vectorised pass (see trade_utils.first_touch).
 
-    Works on a copy — does NOT mutate the original DataFrame.
+    Works on a copy — does NOT mutate the original DataFrame, which may
+    be read-only (e.g. a view on a panel_store mapping).
 
     Args:
         df: OHLCV DataFrame (must have Open, High, Low columns).
@@ -29,21 +33,17 @@ def create_labels(df: pd.DataFrame) -> pd.DataFrame:
         A copy of df truncated to the labellable range, with a new
         'label' column (int): 1 = target hit, 0 = stop hit or expired.
     """
-    df = df.copy()
     n = len(df) - HOLD_DAYS - 1
 
     if n <= 0:
         logger.warning("create_labels: DataFrame too short to label (%d rows). Returning empty.", len(df))
-        return df.iloc[0:0]
+        return df.iloc[0:0].copy()
 
-    labels = []
-    for i in range(n):
-        label, _ = simulate_trade(df, i)
-        labels.append(label)
+    labels, _ = simulate_trades(df)
 
     # Explicitly truncate to match label length — documented intentional behaviour
     df = df.iloc[:n].copy()
     df["label"] = labels
 
-    logger.info("create_labels: generated %d labels (%d positive)", n, sum(labels))
+    logger.info("create_labels: generated %d labels (%d positive)", n, int(labels.sum()))
     return df
@@ -0,0 +1,114 @@
+"""
+live_window.py
+--------------
+Trailing-window data loading for live signals.
+
+Scoring only needs each symbol's latest feature row, so the signal job
+fetches just the bars that row depends on instead of the whole
+START_DATE..END_DATE history. Finite windows (rolling means, returns)
+need exactly their warm-up; recursive features (EMA, Wilder RSI/ATR)
+depend on every earlier bar, but the weight of the truncated start
+shrinks geometrically, so feature_registry.history_rows() gives the bars
+after which it is below LIVE_TOLERANCE.
+
+check_tail() recomputes the latest rows from a truncated copy of a full
+history and reports how far they are from the full-history values.
+"""
+
+import logging
+import math
+import numpy as np
+import pandas as pd
+from data_utils import fetch_many
+from feature_registry import history_rows
+from panel_features import featurise
+from config import END_DATE, FEATURE_COLS, LIVE_TOLERANCE, LIVE_HOLIDAY_RATE
+
+logger = logging.getLogger(__name__)
+
+
+def tail_start(
+    end=END_DATE,
+    columns: list[str] = FEATURE_COLS,
+    tolerance: float = LIVE_TOLERANCE,
+    holiday_rate: float = LIVE_HOLIDAY_RATE,
+) -> pd.Timestamp:
+    """First date to fetch so the bar before `end` has history_rows(columns) bars.
+
+    Bars are counted as weekdays, plus holiday_rate of them again for the
+    exchange holidays the window spans (so the slack grows with it).
+    """
+    bars = history_rows(columns, tolerance)
+    return pd.Timestamp(end) - pd.offsets.BDay(bars + math.ceil(bars * holiday_rate))
+
+
+def fetch_universe(
+    symbols: list[str],
+    start=None,
+    end=END_DATE,
+    columns: list[str] = FEATURE_COLS,
+    tolerance: float = LIVE_TOLERANCE,
+) -> tuple[dict[str, pd.DataFrame], list[str]]:
+    """Fetch raw bars for scoring the latest row of every symbol (concurrently, via fetch_many).
+
+    Args:
+        symbols:   Tickers to load.
+        start:     First date to fetch; None fetches only the trailing window
+                   (tail_start), otherwise e.g. START_DATE for full history.
+        end:       End date (exclusive).
+        columns:   Feature columns the window must cover.
+        tolerance: See feature_registry.history_rows.
+
+    Returns:
+        (symbol -> raw OHLCV frame, symbols with no data).
+    """
+    tail = start is None
+    if tail:
+        start = tail_start(end, columns, tolerance)
+    need = history_rows(columns, tolerance)
+    results = {r.symbol: r for r in fetch_many(symbols, start, end)}
+    raw, missing = {}, []
+    for symbol in symbols:
+        df = results[symbol].data
+        if df is None:
+            logger.warning("Skipping %s — %s.", symbol, results[symbol].error)
+            missing.append(symbol)
+            continue
+        if tail and len(df) < need:
+            logger.warning("%s: %d bars since %s, fewer than the %d its features need",
+                           symbol, len(df), start.date(), need)
+        raw[symbol] = df
+    logger.debug("Fetched %d symbols from %s", len(raw), pd.Timestamp(start).date())
+    return raw, missing
+
+
+def check_tail(
+    full: dict[str, pd.DataFrame],
+    columns: list[str] = FEATURE_COLS,
+    tolerance: float = LIVE_TOLERANCE,
+) -> pd.DataFrame:
+    """Compare latest-row features from the trailing window with full history.
+
+    Args:
+        full: symbol -> raw OHLCV frame covering the full history.
+
+    Returns:
+        One row per symbol and column: the full-history value, the value
+        from the last history_rows(columns, tolerance) bars, their absolute
+        difference, and that difference in standard deviations of the
+        column over the symbol's history (relative differences blow up for
+        features near zero, such as ema20_ema50_diff).
+    """
+    need = history_rows(columns, tolerance)
+    latest_full = featurise(full, columns)
+    latest_tail = featurise({s: df.iloc[-need:] for s, df in full.items() if df is not None}, columns)
+    rows = []
+    for symbol, df in latest_full.items():
+        if not len(df) or not len(latest_tail.get(symbol, ())):
+            continue
+        for col in columns:
+            a, b = float(df[col].iloc[-1]), float(latest_tail[symbol][col].iloc[-1])
+            scale = max(float(df[col].std()), np.finfo(float).tiny)
+            rows.append({"symbol": symbol, "column": col, "full": a, "tail": b,
+                         "abs_diff": abs(a - b), "scaled_diff": abs(a - b) / scale})
+    return pd.DataFrame(rows, columns=["symbol", "column", "full", "tail", "abs_diff", "scaled_diff"])
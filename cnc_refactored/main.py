@@ -2,40 +2,65 @@
 main.py
 -------
 Generates live buy signals for all stocks in STOCK_LIST using the
-trained XGBoost model.
+trained XGBoost model. Scores with the NumPy export (fast_model.py) when
+train_model has written one, so the job starts without importing xgboost.
+Only the trailing window the features need is fetched (live_window.py)
+unless LIVE_TAIL is off or --full-history is given.
 """
 
+import argparse
 import logging
-from data_utils import fetch_data
-from features import add_features
-from model_utils import load_model
-from config import STOCK_LIST, FEATURE_COLS
+import metrics
+from live_window import fetch_universe, check_tail
+from panel_features import add_panel_features
+from model_utils import load_scoring_model
+from scoring import score_universe
+from config import STOCK_LIST, FEATURE_COLS, SIGNAL_THRESHOLD, START_DATE, LIVE_TAIL, LIVE_TOLERANCE
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
 
-SIGNAL_THRESHOLD = 0.65
 
+def generate_signals(model=None, tail: bool = LIVE_TAIL) -> None:
+    """Load the trained model and print buy signals for the latest bar of each stock.
 
-def generate_signals() -> None:
-    """Load the trained model and print buy signals for the latest bar of each stock."""
-    model = load_model()
+    Features for all stocks are computed in one panel pass, the latest rows
+    are scored together in one model call and reported from highest to
+    lowest probability.
 
-    for stock in STOCK_LIST:
-        df = fetch_data(stock)
-        if df is None:
-            logger.warning("Skipping %s — no data.", stock)
-            continue
+    Args:
+        model: Already-loaded model (e.g. just trained by run.py --in-process);
+               loaded with load_scoring_model when None.
+        tail:  Fetch only the trailing window the features need instead of
+               the full history from START_DATE.
+    """
+    if model is None:
+        model = load_scoring_model()
 
-        df = add_features(df)
-        latest = df.iloc[-1:]
-        prob = model.predict_proba(latest[FEATURE_COLS])[:, 1][0]
+    raw, _ = fetch_universe(STOCK_LIST, None if tail else START_DATE)
+    frames = add_panel_features(raw, FEATURE_COLS)
 
-        if prob >= SIGNAL_THRESHOLD:
-            logger.info("BUY SIGNAL : %s | Probability: %.2f", stock, prob)
+    for row in score_universe(model, frames, SIGNAL_THRESHOLD).itertuples():
+        if row.signal == "BUY":
+            logger.info("BUY SIGNAL : %s | Probability: %.2f", row.symbol, row.probability)
         else:
-            logger.info("No trade   : %s | Probability: %.2f", stock, prob)
+            logger.info("No trade   : %s | Probability: %.2f", row.symbol, row.probability)
 
 
 if __name__ == "__main__":
-    generate_signals()
+    parser = argparse.ArgumentParser(description="Print buy signals for the latest bar of each stock")
+    parser.add_argument("--full-history", action="store_true",
+                        help="Fetch and featurise the full history instead of the trailing window")
+    parser.add_argument("--check-tail", action="store_true",
+                        help="Report how far trailing-window features are from full-history ones, then exit")
+    metrics.add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.check_tail:
+        report = check_tail(fetch_universe(STOCK_LIST, START_DATE)[0])
+        print(report.to_string(index=False))
+        worst = report["scaled_diff"].max() if len(report) else 0.0
+        logger.info("Largest difference %.2e standard deviations (tolerance %.0e)", worst, LIVE_TOLERANCE)
+        raise SystemExit(0 if worst <= LIVE_TOLERANCE else 1)
+    generate_signals(tail=not args.full_history)
+    if args.profile:
+        metrics.dump_profile(args.profile)
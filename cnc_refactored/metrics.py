@@ -0,0 +1,261 @@
+"""
+metrics.py
+----------
+In-process counters and latency histograms for the hot path.
+
+Stages are timed with `timer()` / `@timed()` into one histogram family,
+cnc_stage_seconds{stage=...}. Inside a `symbol_scope(symbol)` block the
+timers also carry a symbol label, giving a per-symbol breakdown.
+server.py exports everything at /api/metrics in the Prometheus text
+format; the CLI scripts can dump a JSON profile with --profile.
+
+Metrics recorded inside ProcessPoolExecutor workers stay in the worker;
+pipeline.py times each symbol's CPU stage from the parent instead.
+"""
+
+import functools
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config import METRICS_ENABLED, METRICS_PER_SYMBOL, METRICS_BUCKETS
+
+STAGE_SECONDS = "cnc_stage_seconds"
+
+_symbol: ContextVar[str | None] = ContextVar("metrics_symbol", default=None)
+
+
+def _key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _fmt_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name, self.help = name, help
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, key: tuple, value: float = 1.0) -> None:
+        self.values[key] = self.values.get(key, 0.0) + value
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_fmt_labels(k)} {_fmt_value(v)}" for k, v in sorted(self.values.items())]
+
+    def snapshot(self) -> list[dict]:
+        return [{"labels": dict(k), "value": v} for k, v in sorted(self.values.items())]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels (Prometheus semantics)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets=METRICS_BUCKETS):
+        self.name, self.help = name, help
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., count, sum, max]
+        self.values: dict[tuple, list[float]] = {}
+
+    def observe(self, key: tuple, value: float) -> None:
+        row = self.values.get(key)
+        if row is None:
+            row = self.values[key] = [0.0] * (len(self.buckets) + 3)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                row[i] += 1
+        n = len(self.buckets)
+        row[n] += 1
+        row[n + 1] += value
+        row[n + 2] = max(row[n + 2], value)
+
+    def render(self) -> list[str]:
+        n = len(self.buckets)
+        lines = []
+        for key, row in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, row[:n]):
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, (('le', _fmt_value(bound)),))} {_fmt_value(count)}")
+            lines.append(f"{self.name}_bucket{_fmt_labels(key, (('le', '+Inf'),))} {_fmt_value(row[n])}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {_fmt_value(row[n])}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(row[n + 1])}")
+        return lines
+
+    def snapshot(self) -> list[dict]:
+        n = len(self.buckets)
+        return [
+            {
+                "labels": dict(key),
+                "count": int(row[n]),
+                "total": row[n + 1],
+                "mean": row[n + 1] / row[n] if row[n] else 0.0,
+                "max": row[n + 2],
+            }
+            for key, row in sorted(self.values.items(), key=lambda kv: -kv[1][n + 1])
+        ]
+
+
+class MetricsRegistry:
+    """Thread-safe collection of named counters and histograms."""
+
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, help: str):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics.setdefault(name, cls(name, help))
+        if not isinstance(metric, cls):
+            raise TypeError(f"Metric '{name}' is a {metric.kind}, not a {cls.kind}")
+        return metric
+
+    def inc(self, name: str, value: float = 1.0, help: str = "", **labels) -> None:
+        with self._lock:
+            self._get(Counter, name, help).inc(_key(labels), value)
+
+    def observe(self, name: str, value: float, help: str = "", **labels) -> None:
+        with self._lock:
+            self._get(Histogram, name, help).observe(_key(labels), value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            lines = []
+            for name in sorted(self._metrics):
+                metric = self._metrics[name]
+                if metric.help:
+                    lines.append(f"# HELP {name} {metric.help}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+                lines.extend(metric.render())
+            return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """JSON-serialisable view: {name: {"type", "series": [...]}}."""
+        with self._lock:
+            return {name: {"type": m.kind, "series": m.snapshot()} for name, m in sorted(self._metrics.items())}
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ── Recording helpers ──────────────────────────────────────────────────────────
+
+def inc(name: str, value: float = 1.0, help: str = "", **labels) -> None:
+    """Increment counter `name` (no-op when METRICS_ENABLED is off)."""
+    if METRICS_ENABLED:
+        REGISTRY.inc(name, value, help, **labels)
+
+
+def observe(name: str, value: float, help: str = "", **labels) -> None:
+    """Record value in histogram `name` (no-op when METRICS_ENABLED is off)."""
+    if METRICS_ENABLED:
+        REGISTRY.observe(name, value, help, **labels)
+
+
+@contextmanager
+def symbol_scope(symbol: str):
+    """Attach `symbol` to every stage timer recorded inside the block."""
+    token = _symbol.set(symbol)
+    try:
+        yield
+    finally:
+        _symbol.reset(token)
+
+
+@contextmanager
+def timer(stage: str, **labels):
+    """Record the block's wall time in cnc_stage_seconds{stage=...}."""
+    if not METRICS_ENABLED:
+        yield
+        return
+    symbol = _symbol.get()
+    if METRICS_PER_SYMBOL and symbol is not None:
+        labels.setdefault("symbol", symbol)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe(STAGE_SECONDS, time.perf_counter() - t0,
+                         "Wall time per pipeline stage call", stage=stage, **labels)
+
+
+def timed(stage: str):
+    """Decorator form of timer()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with timer(stage):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+# ── Export ─────────────────────────────────────────────────────────────────────
+
+def render_prometheus() -> str:
+    return REGISTRY.render()
+
+
+def profile() -> dict:
+    """Snapshot plus a per-stage summary and the OHLCV cache hit rate."""
+    snap = REGISTRY.snapshot()
+
+    stages: dict[str, dict] = {}
+    for series in snap.get(STAGE_SECONDS, {}).get("series", []):
+        s = stages.setdefault(series["labels"]["stage"], {"calls": 0, "total": 0.0, "max": 0.0})
+        s["calls"] += series["count"]
+        s["total"] += series["total"]
+        s["max"] = max(s["max"], series["max"])
+    for s in stages.values():
+        s["mean"] = s["total"] / s["calls"] if s["calls"] else 0.0
+
+    cache = {}
+    for series in snap.get("cnc_cache_requests_total", {}).get("series", []):
+        result = series["labels"].get("result", "")
+        cache[result] = cache.get(result, 0) + series["value"]
+    lookups = sum(cache.values())
+    hit_rate = cache.get("hit", 0) / lookups if lookups else None
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "stages": dict(sorted(stages.items(), key=lambda kv: -kv[1]["total"])),
+        "cache_hit_rate": hit_rate,
+        "metrics": snap,
+    }
+
+
+def dump_profile(path: str) -> None:
+    """Write profile() as JSON to path."""
+    with open(path, "w") as f:
+        json.dump(profile(), f, indent=2, default=str)
+
+
+def add_profile_argument(parser) -> None:
+    """Add the shared --profile PATH option to a CLI's argparse parser."""
+    parser.add_argument("--profile", metavar="PATH", default=None,
+                        help="Write a JSON profile of stage timings and counters to PATH")
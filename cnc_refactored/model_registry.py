@@ -0,0 +1,137 @@
+"""
+model_registry.py
+-----------------
+Keeps trained models resident in memory for the server.
+Each named model is loaded once, its file is watched (mtime/size, then
+content hash), and a changed file is reloaded and swapped in atomically.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from model_utils import load_model
+from config import MODEL_CHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "default"
+
+
+def file_hash(path: str) -> str:
+    """Short SHA-256 of a file's contents, used as the model version id."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+@dataclass
+class ModelEntry:
+    """A loaded model plus the file fingerprint it was loaded from."""
+
+    name: str
+    path: str
+    model: object = None
+    version: str | None = None
+    mtime: float = 0.0
+    size: int = 0
+    loaded_at: float = 0.0
+    checked_at: float = 0.0
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "version": self.version,
+            "loaded": self.model is not None,
+            "mtime": self.mtime,
+            "loaded_at": self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    """Thread-safe store of named, hot-reloadable models.
+
+    get() is cheap on the hot path: the file is only stat'ed every
+    check_interval seconds, and only re-hashed when mtime or size changed.
+    A reload builds the new entry fully before swapping the reference, so
+    concurrent readers see either the old model or the new one.
+    """
+
+    def __init__(self, check_interval: float = MODEL_CHECK_INTERVAL, loader=load_model):
+        self.check_interval = check_interval
+        self.loader = loader
+        self._entries: dict[str, ModelEntry] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path: str) -> None:
+        """Add (or re-point) a named model. Loading is deferred to first use."""
+        with self._lock:
+            self._entries[name] = ModelEntry(name=name, path=path)
+
+    def names(self) -> list[str]:
+        return list(self._entries)
+
+    def get(self, name: str = DEFAULT_MODEL):
+        """Return the resident model, reloading it first if its file changed.
+
+        Raises:
+            KeyError: If no model is registered under `name`.
+            FileNotFoundError: If the model file does not exist.
+        """
+        entry = self._entries[name]
+        now = time.time()
+        if entry.model is None or now - entry.checked_at >= self.check_interval:
+            entry = self._refresh(name)
+        return entry.model
+
+    def reload(self, name: str | None = None) -> None:
+        """Force a re-check of one model, or all models when name is None."""
+        for n in ([name] if name else self.names()):
+            try:
+                self._refresh(n, force=True)
+            except FileNotFoundError:
+                logger.warning("Model '%s' not found on reload", n)
+
+    def info(self, name: str = DEFAULT_MODEL) -> dict | None:
+        entry = self._entries.get(name)
+        return entry.info() if entry else None
+
+    def versions(self) -> list[dict]:
+        return [e.info() for e in self._entries.values()]
+
+    def _refresh(self, name: str, force: bool = False) -> ModelEntry:
+        with self._lock:
+            entry = self._entries[name]
+            now = time.time()
+            if not os.path.exists(entry.path):
+                if entry.model is not None:
+                    # Keep serving the resident model if the file vanished mid-swap
+                    entry.checked_at = now
+                    return entry
+                # Let load_model raise its usual FileNotFoundError
+                self.loader(entry.path)
+
+            st = os.stat(entry.path)
+            unchanged = entry.model is not None and (st.st_mtime, st.st_size) == (entry.mtime, entry.size)
+            if unchanged and not force:
+                entry.checked_at = now
+                return entry
+
+            version = file_hash(entry.path)
+            if entry.model is not None and version == entry.version:
+                entry.mtime, entry.size, entry.checked_at = st.st_mtime, st.st_size, now
+                return entry
+
+            model = self.loader(entry.path)
+            fresh = ModelEntry(
+                name=name, path=entry.path, model=model, version=version,
+                mtime=st.st_mtime, size=st.st_size, loaded_at=now, checked_at=now,
+            )
+            self._entries[name] = fresh
+            logger.info("Loaded model '%s' version %s", name, version)
+            return fresh
@@ -1,19 +1,17 @@
 """
 model_utils.py
 --------------
-Shared model loading helper used by main.py and backtest.py.
+Shared model loading helpers used by main.py and backtest.py.
 """
 
 import logging
 import os
-import joblib
-from xgboost import XGBClassifier
-from config import MODEL_PATH
+from config import MODEL_PATH, FAST_MODEL_ENABLED
 
 logger = logging.getLogger(__name__)
 
 
-def load_model(path: str = MODEL_PATH) -> XGBClassifier:
+def load_model(path: str = MODEL_PATH):
     """Load a trained XGBoost model from disk.
 
     Args:
@@ -30,5 +28,23 @@ def load_model(path: str = MODEL_PATH) -> XGBClassifier:
             f"Model file not found at '{path}'. "
             "Run train_model.py first to generate it."
         )
+    import joblib   # unpickling pulls in xgboost and scikit-learn; keep it off the import path
     logger.info("Loading model from %s", path)
     return joblib.load(path)
+
+
+def load_scoring_model(path: str = MODEL_PATH, fast_path: str | None = None):
+    """Model for scoring only: the NumPy FastModel export when usable, else load_model.
+
+    The export (by default the .npz next to path) is used when
+    FAST_MODEL_ENABLED is on and it is at least as new as the pickled
+    model, so a stale export never shadows a retrain.
+    """
+    fast_path = fast_path or os.path.splitext(path)[0] + ".npz"
+    if FAST_MODEL_ENABLED and os.path.exists(fast_path) and (
+        not os.path.exists(path) or os.path.getmtime(fast_path) >= os.path.getmtime(path)
+    ):
+        from fast_model import FastModel
+        logger.info("Loading exported model from %s", fast_path)
+        return FastModel.load(fast_path)
+    return load_model(path)
@@ -0,0 +1,331 @@
+"""
+panel_features.py
+-----------------
+Vectorised feature engine over the whole universe at once.
+
+All symbols are aligned on the union of their dates into 2-D
+(dates × symbols) arrays, and every feature in feature_registry is
+computed for all symbols in one vectorised pass: recursions (EMA, Wilder
+smoothing) run column-wise in pandas' compiled EWM, windows use sliding
+views, and cross-sectional features (ranks, universe means, breadth)
+reduce across the symbol axis per date.
+
+Per-symbol features follow the `ta` definitions the model was trained
+on, to floating-point tolerance. They are computed on each symbol's own
+bars only: every column is packed so its bars form one contiguous run,
+then scattered back to the shared dates, so a symbol's missing days never
+enter its windows.
+
+Only the features the requested columns depend on are computed (see
+feature_registry.resolve), and each symbol's first warmup_rows() bars are
+cut instead of dropping NaN rows across the whole frame. Cross-sectional
+features compare only the rows that are kept, so training frames built
+per symbol and combined by add_cross_features get the same values.
+"""
+
+import logging
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+import metrics
+from numpy.lib.stride_tricks import sliding_window_view
+from feature_registry import RAW_INPUTS, Feature, register, check_columns, public_features, resolve, warmup_rows
+from config import FEATURE_COLS
+
+logger = logging.getLogger(__name__)
+
+
+# ── Series kernels (columns: leading NaN, then contiguous bars) ────────────────
+
+def shift(x: np.ndarray, n: int = 1) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    out[n:] = x[:-n]
+    return out
+
+
+def ewm(x: np.ndarray, alpha: float, min_periods: int) -> np.ndarray:
+    """pandas ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean() per column.
+
+    Every column starts at its first non-NaN value, so packed columns need
+    no special casing; the recursion runs in pandas' compiled loop.
+    """
+    return pd.DataFrame(x).ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean().to_numpy()
+
+
+def ema(x: np.ndarray, span: int) -> np.ndarray:
+    """ta.trend.ema_indicator."""
+    return ewm(x, 2 / (span + 1), span)
+
+
+def rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    if len(x) >= window:
+        out[window - 1:] = sliding_window_view(x, window, axis=0).mean(axis=-1)
+    return out
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int) -> np.ndarray:
+    """ta.volatility.average_true_range (NaN rather than 0 before the first full window).
+
+    ta seeds with the mean of the first `window` true ranges, then applies
+    Wilder smoothing atr = (atr_prev × (window - 1) + tr) / window, which
+    is an adjust=False EWM with alpha = 1 / window started at the seed.
+    """
+    prev_close = shift(close)
+    tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    count = np.cumsum(~np.isnan(tr), axis=0)
+    seed = np.nancumsum(tr, axis=0) / window
+    started = np.where(count < window, np.nan, np.where(count == window, seed, tr))
+    return ewm(started, 1 / window, 1)
+
+
+def rsi(close: np.ndarray, window: int) -> np.ndarray:
+    """ta.momentum.rsi."""
+    diff = close - shift(close)
+    has_bar = ~np.isnan(close)
+    up = np.where(has_bar, np.where(diff > 0, diff, 0.0), np.nan)
+    down = np.where(has_bar, np.where(diff < 0, -diff, 0.0), np.nan)
+    up, down = ewm(up, 1 / window, window), ewm(down, 1 / window, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(down == 0, 100.0, 100 - 100 / (1 + up / down))
+
+
+# ── Cross-sectional kernels (columns aligned on the shared dates) ──────────────
+
+def cs_rank(x: np.ndarray) -> np.ndarray:
+    """Percentile rank (0, 1] of each value among the symbols valid that date (ties: first)."""
+    valid = ~np.isnan(x)
+    order = np.argsort(np.where(valid, x, np.inf), axis=1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(x.shape[1]), x.shape), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(valid, (ranks + 1) / valid.sum(axis=1, keepdims=True), np.nan)
+
+
+def cs_mean(x: np.ndarray) -> np.ndarray:
+    """Mean over the symbols valid that date, as a (dates, 1) column."""
+    valid = ~np.isnan(x)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.nansum(x, axis=1, keepdims=True) / valid.sum(axis=1, keepdims=True)
+
+
+# ── Registered features ────────────────────────────────────────────────────────
+
+@register("ema20", ("Close",), warmup=19, decay=19 / 21, public=False)
+def _ema20(close):
+    return ema(close, 20)
+
+
+@register("ema50", ("Close",), warmup=49, decay=49 / 51, public=False)
+def _ema50(close):
+    return ema(close, 50)
+
+
+@register("atr", ("High", "Low", "Close"), warmup=13, decay=13 / 14, public=False)
+def _atr(high, low, close):
+    return atr(high, low, close, 14)
+
+
+@register("vol_ma10", ("Volume",), warmup=9, public=False)
+def _vol_ma10(volume):
+    return rolling_mean(volume, 10)
+
+
+@register("ret20", ("Close",), warmup=20, public=False)
+def _ret20(close):
+    return close / shift(close, 20) - 1
+
+
+@register("rsi", ("Close",), warmup=13, decay=13 / 14)
+def _rsi(close):
+    return rsi(close, 14)
+
+
+@register("close_ema20_ratio", ("Close", "ema20"))
+def _close_ema20_ratio(close, ema20):
+    return close / ema20
+
+
+@register("ema20_ema50_diff", ("ema20", "ema50"))
+def _ema20_ema50_diff(ema20, ema50):
+    return (ema20 - ema50) / ema50
+
+
+@register("atr_pct", ("atr", "Close"))
+def _atr_pct(atr_, close):
+    return atr_ / close
+
+
+@register("vol_ratio", ("Volume", "vol_ma10"))
+def _vol_ratio(volume, vol_ma10):
+    return volume / vol_ma10
+
+
+@register("rsi_rank", ("rsi",), kind="cross")
+def _rsi_rank(rsi_):
+    return cs_rank(rsi_)
+
+
+@register("vol_ratio_pct", ("vol_ratio",), kind="cross")
+def _vol_ratio_pct(vol_ratio):
+    return cs_rank(vol_ratio)
+
+
+@register("rel_strength_20", ("ret20",), kind="cross")
+def _rel_strength_20(ret20):
+    return ret20 - cs_mean(ret20)
+
+
+@register("breadth_ema50", ("Close", "ema50"), kind="cross")
+def _breadth_ema50(close, ema50):
+    above = np.where(np.isnan(ema50), np.nan, (close > ema50).astype(float))
+    return np.broadcast_to(cs_mean(above), close.shape)
+
+
+check_columns(FEATURE_COLS)
+
+
+# ── Panel ──────────────────────────────────────────────────────────────────────
+
+@dataclass
+class Panel:
+    """Raw OHLCV of a universe aligned as (dates × symbols) float64 arrays."""
+
+    dates: np.ndarray            # datetime64[ns], sorted union of every symbol's dates
+    symbols: list[str]
+    arrays: dict[str, np.ndarray]
+    valid: np.ndarray            # bool, True where the symbol has a bar that date
+    rows: list[np.ndarray]       # per symbol: row in `dates` of each of its bars
+
+
+def align(frames: dict[str, pd.DataFrame], columns: tuple[str, ...] = RAW_INPUTS) -> Panel:
+    """Align per-symbol frames' columns on the union of their dates (NaN where absent)."""
+    symbols = [s for s, df in frames.items() if df is not None and len(df)]
+    stamps = [frames[s].index.to_numpy(dtype="datetime64[ns]") for s in symbols]
+    dates = np.unique(np.concatenate(stamps)) if stamps else np.zeros(0, dtype="datetime64[ns]")
+    rows = [np.searchsorted(dates, st) for st in stamps]
+
+    shape = (len(dates), len(symbols))
+    valid = np.zeros(shape, dtype=bool)
+    arrays = {c: np.full(shape, np.nan) for c in columns}
+    for j, s in enumerate(symbols):
+        valid[rows[j], j] = True
+        for c in columns:
+            arrays[c][rows[j], j] = frames[s][c].to_numpy(dtype=np.float64)
+    return Panel(dates, symbols, arrays, valid, rows)
+
+
+def compute(panel: Panel, features: list[Feature], warmup: int = 0) -> dict[str, np.ndarray]:
+    """The given features (in dependency order) as aligned (dates × symbols) arrays.
+
+    Cross-sectional features only see the rows featurise keeps: a symbol's
+    bars after its first `warmup` bars where every series feature is
+    defined. A symbol still warming up is not part of that day's universe,
+    exactly as when frames featurised one symbol at a time are combined by
+    add_cross_features.
+    """
+    # Pack each column's bars into one run after its missing days (stable sort keeps date order)
+    order = np.argsort(panel.valid, axis=0, kind="stable")
+    packed = {c: np.take_along_axis(panel.arrays[c], order, axis=0) for c in RAW_INPUTS}
+    series = [f for f in features if f.kind == "series"]
+    for f in series:
+        packed[f.name] = f.fn(*(packed[i] for i in f.inputs))
+
+    out = dict(panel.arrays)
+    members = panel.valid & (np.cumsum(panel.valid, axis=0) > warmup)
+    for f in series:
+        aligned = np.empty_like(packed[f.name])
+        np.put_along_axis(aligned, order, packed[f.name], axis=0)
+        aligned[~panel.valid] = np.nan
+        out[f.name] = aligned
+        members &= ~np.isnan(aligned)
+    return _cross_sectional(out, members, features)
+
+
+def _cross_sectional(out: dict[str, np.ndarray], members: np.ndarray, features: list[Feature]) -> dict[str, np.ndarray]:
+    """Add the cross features to out, computed over the (date, symbol) cells in members."""
+    for f in features:
+        if f.kind == "cross":
+            inputs = (np.where(members, out[i], np.nan) for i in f.inputs)
+            values = np.array(f.fn(*inputs), dtype=np.float64)
+            values[~members] = np.nan
+            out[f.name] = values
+    return out
+
+
+def featurise(frames: dict[str, pd.DataFrame | None], columns: list[str] | None = None) -> dict[str, pd.DataFrame]:
+    """Untimed body of add_panel_features (also behind features.add_features)."""
+    columns = public_features() if columns is None else list(columns)
+    features = resolve(columns)
+    names = [f.name for f in features]
+    warmup = warmup_rows(columns)
+
+    panel = align(frames)
+    values = compute(panel, features, warmup)
+    out = {}
+    for j, symbol in enumerate(panel.symbols):
+        rows = panel.rows[j]
+        df = frames[symbol].copy()
+        for name in names:
+            df[name] = values[name][rows, j]
+        # Rows left undefined after the warm-up come from bad bars (e.g. zero volume windows)
+        out[symbol] = df.iloc[warmup:].dropna(subset=names)
+    return out
+
+
+def add_cross_features(
+    frames: dict[str, pd.DataFrame | None],
+    columns: list[str] | None = None,
+) -> dict[str, pd.DataFrame]:
+    """Add the cross-sectional columns to frames featurised one symbol at a time.
+
+    For pipelines that build features per symbol (e.g. training, through
+    features.add_features with the per-symbol columns of split_columns):
+    the cross-sectional features are then computed across all frames on
+    their shared dates, from the inputs already in them, as
+    add_panel_features would. Rows where they are undefined are dropped.
+
+    Args:
+        frames:  symbol -> frame holding split_columns(columns)[0].
+        columns: Feature columns (default FEATURE_COLS).
+
+    Returns:
+        symbol -> copy of its frame plus the cross-sectional columns
+        (the frames unchanged if there are none).
+    """
+    columns = FEATURE_COLS if columns is None else list(columns)
+    cross = [f for f in resolve(columns) if f.kind == "cross"]
+    if not cross:
+        return {s: df for s, df in frames.items() if df is not None and len(df)}
+    inputs = tuple(dict.fromkeys(i for f in cross for i in f.inputs if i not in {c.name for c in cross}))
+    panel = align(frames, inputs)
+    values = _cross_sectional(dict(panel.arrays), panel.valid, cross)
+    names = [f.name for f in cross]
+    out = {}
+    for j, symbol in enumerate(panel.symbols):
+        df = frames[symbol].copy()
+        for name in names:
+            df[name] = values[name][panel.rows[j], j]
+        out[symbol] = df.dropna(subset=names)
+    return out
+
+
+@metrics.timed("panel_features")
+def add_panel_features(
+    frames: dict[str, pd.DataFrame | None],
+    columns: list[str] | None = None,
+) -> dict[str, pd.DataFrame]:
+    """add_features for a whole universe in one pass, including cross-sectional features.
+
+    Args:
+        frames:  symbol -> OHLCV DataFrame (None frames are skipped).
+        columns: Feature columns wanted (default: every public feature);
+                 only these and what they depend on are computed.
+
+    Returns:
+        symbol -> copy of its frame plus the requested columns and their
+        intermediates, without its first warmup_rows(columns) bars.
+    """
+    out = featurise(frames, columns)
+    logger.debug("add_panel_features: %d symbols, columns %s", len(out), columns)
+    return out
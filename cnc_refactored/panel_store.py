@@ -0,0 +1,233 @@
+"""
+panel_store.py
+--------------
+Packed, memory-mapped OHLCV panel for a whole universe.
+
+A store is a directory built once from the raw data:
+
+  - <column>.bin: one flat little-endian array per column (Open, High,
+    Low, Close, Volume as float64, date as int64 nanoseconds), with every
+    symbol's bars contiguous and in date order
+  - meta.json:    symbols, their row offsets into the arrays, dtypes and
+    the date range the store was built for
+
+PanelStore maps the column files read-only (np.memmap) and hands out
+slices of them, so reading a symbol or a date range touches only those
+pages and copies nothing: frames returned by frame() are views on the
+mapping and must be copied before being modified (add_features and
+create_labels already work on copies). Worker processes that open the
+same store share one copy of the data through the page cache instead of
+each holding its own DataFrames.
+
+Usage:
+    python panel_store.py                         # STOCK_LIST → PANEL_STORE_DIR
+    python panel_store.py --out panel RELIANCE.NS INFY.NS
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from data_utils import OHLCV_COLS, fetch_many
+from config import STOCK_LIST, START_DATE, END_DATE, PANEL_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout changes
+STORE_VERSION = 1
+
+DTYPES = {**{c: "<f8" for c in OHLCV_COLS}, "date": "<i8"}
+
+
+# ── Writing ────────────────────────────────────────────────────────────────────
+
+def write_store(path: str, items, start=START_DATE, end=END_DATE) -> int:
+    """Pack (symbol, OHLCV DataFrame) pairs into a store at path.
+
+    Frames are appended to the column files as they arrive, so items can
+    be a stream (e.g. fetch_many results) and only one frame is held at a
+    time. The store is written beside path and swapped in when complete;
+    readers that already mapped the old one keep their (unlinked) files.
+
+    Args:
+        path:       Store directory (replaced if it exists).
+        items:      Iterable of (symbol, DataFrame or None); None and empty
+                    frames are skipped, as are repeated symbols.
+        start, end: Date range the data was fetched for (recorded in meta).
+
+    Returns:
+        Number of symbols written.
+    """
+    tmp = f"{path.rstrip(os.sep)}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    symbols, offsets = [], [0]
+    files = {c: open(os.path.join(tmp, f"{c}.bin"), "wb") for c in DTYPES}
+    try:
+        for symbol, df in items:
+            if df is None or not len(df) or symbol in symbols:
+                continue
+            df = df[~df.index.duplicated(keep="last")].sort_index()
+            dates = df.index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+            files["date"].write(dates.astype(DTYPES["date"]).tobytes())
+            for c in OHLCV_COLS:
+                files[c].write(df[c].to_numpy(dtype=DTYPES[c]).tobytes())
+            symbols.append(symbol)
+            offsets.append(offsets[-1] + len(df))
+    finally:
+        for f in files.values():
+            f.close()
+
+    meta = {
+        "version": STORE_VERSION,
+        "dtypes": DTYPES,
+        "symbols": symbols,
+        "offsets": offsets,
+        "start": str(pd.Timestamp(start).date()),
+        "end": str(pd.Timestamp(end).date()),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    old = None
+    if os.path.exists(path):
+        old = f"{path.rstrip(os.sep)}.{os.getpid()}.old"
+        os.replace(path, old)
+    os.replace(tmp, path)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+    logger.info("Panel store %s: %d symbols, %d rows", path, len(symbols), offsets[-1])
+    return len(symbols)
+
+
+def build_store(
+    path: str = PANEL_STORE_DIR,
+    symbols: list[str] = STOCK_LIST,
+    start=START_DATE,
+    end=END_DATE,
+) -> int:
+    """Fetch symbols (fetch_many, through the OHLCV cache) and write them to a store."""
+    results = fetch_many(symbols, start, end)
+    return write_store(path, ((r.symbol, r.data) for r in results), start, end)
+
+
+# ── Reading ────────────────────────────────────────────────────────────────────
+
+class PanelStore:
+    """Read-only, memory-mapped view of a store written by write_store.
+
+    Pickles as its path, so it can be passed to worker processes, which
+    map the same files.
+    """
+
+    def __init__(self, path: str = PANEL_STORE_DIR):
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"No panel store at {path}. Build one with: python panel_store.py --out {path}")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Panel store {path} has version {meta.get('version')}, expected {STORE_VERSION}")
+        self.symbols: list[str] = meta["symbols"]
+        self.offsets = np.asarray(meta["offsets"], dtype=np.int64)
+        self.start, self.end = meta["start"], meta["end"]
+        self._dtypes = meta["dtypes"]
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        self._columns: dict[str, np.ndarray] = {}
+
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    def __len__(self) -> int:
+        return int(self.offsets[-1])
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._index
+
+    def column(self, name: str) -> np.ndarray:
+        """The whole column as a read-only memory map (mapped on first use)."""
+        if name not in self._columns:
+            if len(self) == 0:
+                self._columns[name] = np.zeros(0, dtype=self._dtypes[name])
+            else:
+                mapped = np.memmap(os.path.join(self.path, f"{name}.bin"),
+                                   dtype=self._dtypes[name], mode="r", shape=(len(self),))
+                # Plain ndarray view of the mapping, so slices and frames are ordinary arrays
+                self._columns[name] = mapped.view(np.ndarray)
+        return self._columns[name]
+
+    def rows(self, symbol: str, start=None, end=None) -> slice:
+        """Row range of symbol's bars with start <= date < end (either bound may be None).
+
+        Raises:
+            KeyError: If symbol is not in the store.
+        """
+        i = self._index[symbol]
+        lo, hi = int(self.offsets[i]), int(self.offsets[i + 1])
+        if start is None and end is None:
+            return slice(lo, hi)
+        dates = self.column("date")[lo:hi]
+        first = int(np.searchsorted(dates, pd.Timestamp(start).value)) if start is not None else 0
+        last = int(np.searchsorted(dates, pd.Timestamp(end).value)) if end is not None else hi - lo
+        return slice(lo + first, lo + last)
+
+    def arrays(self, symbol: str, start=None, end=None, columns: list[str] = OHLCV_COLS) -> dict[str, np.ndarray]:
+        """Column slices for symbol (views on the mapping), plus 'date' as datetime64[ns]."""
+        rows = self.rows(symbol, start, end)
+        out = {c: self.column(c)[rows] for c in columns}
+        out["date"] = self.column("date")[rows].view("datetime64[ns]")
+        return out
+
+    def frame(self, symbol: str, start=None, end=None, columns: list[str] = OHLCV_COLS) -> pd.DataFrame | None:
+        """Symbol's bars in [start, end) as a DataFrame over the mapping, or None if it has none."""
+        if symbol not in self:
+            return None
+        arrays = self.arrays(symbol, start, end, columns)
+        if not len(arrays["date"]):
+            return None
+        index = pd.DatetimeIndex(arrays.pop("date"))
+        return pd.DataFrame(arrays, index=index, copy=False)
+
+    def frames(self, symbols: list[str] | None = None, start=None, end=None) -> dict[str, pd.DataFrame]:
+        """frame() for each symbol that has bars in range (default: all symbols)."""
+        out = {}
+        for symbol in self.symbols if symbols is None else symbols:
+            df = self.frame(symbol, start, end)
+            if df is None:
+                logger.warning("Skipping %s — not in panel store %s.", symbol, self.path)
+                continue
+            out[symbol] = df
+        return out
+
+
+_opened: dict[str, PanelStore] = {}
+
+
+def open_store(path: str = PANEL_STORE_DIR) -> PanelStore:
+    """PanelStore for path, mapped once per process and reused."""
+    store = _opened.get(path)
+    if store is None:
+        store = _opened[path] = PanelStore(path)
+    return store
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    parser = argparse.ArgumentParser(description="Build the memory-mapped OHLCV panel store")
+    parser.add_argument("symbols", nargs="*", default=STOCK_LIST)
+    parser.add_argument("--out", default=PANEL_STORE_DIR)
+    parser.add_argument("--start", default=START_DATE)
+    parser.add_argument("--end", default=END_DATE)
+    args = parser.parse_args()
+    build_store(args.out, args.symbols, args.start, args.end)
+
+
+if __name__ == "__main__":
+    main()
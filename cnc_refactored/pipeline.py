@@ -0,0 +1,163 @@
+"""
+pipeline.py
+-----------
+Concurrent fetch → add_features → create_labels pipeline over a universe.
+Fetching (I/O-bound) runs on a thread pool; feature and label computation
+(CPU-bound) runs on a process pool, reading through the feature store when
+enabled. Results come back in input order.
+
+Features are built one symbol at a time, so frames carry only the
+per-symbol columns (feature_registry.split_columns); callers add any
+cross-sectional FEATURE_COLS over the whole universe with
+panel_features.add_cross_features.
+
+With a panel store (panel_store.py), nothing is fetched or pickled to the
+workers: each worker maps the store and reads its symbol's bars in place.
+"""
+
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Iterator
+import pandas as pd
+import metrics
+from data_utils import throttled_fetch
+from features import add_features
+from labeling import create_labels
+from feature_registry import split_columns
+from feature_store import FeatureStore
+from panel_store import open_store
+from config import FETCH_WORKERS, CPU_WORKERS, MAX_IN_FLIGHT, FEATURE_STORE_DIR, USE_FEATURE_STORE, FEATURE_COLS
+
+logger = logging.getLogger(__name__)
+
+PER_SYMBOL_COLS = split_columns(FEATURE_COLS)[0]
+
+
+def _build(df: pd.DataFrame) -> pd.DataFrame:
+    # Cross-sectional columns are added over the whole universe afterwards (add_cross_features)
+    return create_labels(add_features(df, PER_SYMBOL_COLS))
+
+
+def engineer(symbol: str, df: pd.DataFrame, store_root: str | None = None) -> pd.DataFrame:
+    """CPU stage for one symbol: features, labels and a symbol column.
+
+    Module-level so it can be pickled into worker processes.
+
+    Args:
+        symbol:     Ticker symbol.
+        df:         Raw OHLCV DataFrame.
+        store_root: Feature store directory to read/write, or None to
+                    always compute from scratch.
+    """
+    if store_root is not None:
+        df = FeatureStore(store_root).load_or_build(symbol, df, _build)
+    else:
+        df = _build(df)
+    df["symbol"] = symbol
+    return df
+
+
+def engineer_stored(symbol: str, panel_store: str, store_root: str | None = None) -> pd.DataFrame | None:
+    """engineer() on the symbol's bars read from a panel store, or None if it has none.
+
+    Runs in the worker, so the raw bars are read from the shared mapping
+    instead of being sent over from the parent process.
+    """
+    df = open_store(panel_store).frame(symbol)
+    if df is None:
+        return None
+    return engineer(symbol, df, store_root)
+
+
+def worker_context() -> multiprocessing.context.BaseContext:
+    """Start method for worker pools: forkserver, else spawn (never fork).
+
+    Forking a parent that already runs threads (fetch pools, logging,
+    xgboost/OpenMP) can copy a lock another thread holds into the child.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def process_universe(
+    symbols: list[str],
+    fetch: Callable[[str], pd.DataFrame | None] | None = None,
+    fetch_workers: int = FETCH_WORKERS,
+    cpu_workers: int = CPU_WORKERS,
+    max_in_flight: int = MAX_IN_FLIGHT,
+    feature_store: str | None = FEATURE_STORE_DIR if USE_FEATURE_STORE else None,
+    panel_store: str | None = None,
+) -> Iterator[tuple[str, pd.DataFrame | None]]:
+    """Fetch and engineer every symbol concurrently, yielding in input order.
+
+    At most max_in_flight symbols are fetched or processed at any time, so
+    memory stays bounded however large the universe is. A failure in one
+    symbol (fetch error, too little data, exception in add_features...) is
+    logged and yielded as None without affecting the others.
+
+    Args:
+        symbols:       Ticker symbols to process.
+        fetch:         Callable returning raw OHLCV for a symbol, or None.
+                       Defaults to throttled_fetch(), so the fetch threads
+                       share one rate limit and retry failed requests.
+        fetch_workers: Thread pool size for fetching.
+        cpu_workers:   Process pool size for features/labels. 1 runs the
+                       CPU stage inline in the fetch threads.
+        max_in_flight: Upper bound on symbols held in memory at once.
+        feature_store: Feature store directory, or None to disable it.
+        panel_store:   Panel store directory to read raw bars from instead
+                       of calling fetch.
+
+    Yields:
+        (symbol, DataFrame or None) tuples in the same order as `symbols`.
+    """
+    max_in_flight = max(1, max_in_flight)
+    if fetch is None and panel_store is None:
+        fetch = throttled_fetch()
+    procs = None
+    if cpu_workers > 1:
+        # Workers are started lazily from the fetch threads; forking there could copy a lock
+        # (logging, metrics) held by another thread, so they start from a clean process instead
+        procs = ProcessPoolExecutor(max_workers=cpu_workers, mp_context=worker_context())
+
+    def run_one(symbol: str) -> pd.DataFrame | None:
+        try:
+            with metrics.symbol_scope(symbol):
+                if panel_store is not None:
+                    with metrics.timer("engineer"):
+                        if procs is None:
+                            return engineer_stored(symbol, panel_store, feature_store)
+                        return procs.submit(engineer_stored, symbol, panel_store, feature_store).result()
+                df = fetch(symbol)
+                if df is None:
+                    return None
+                # Timed from this thread: metrics recorded in worker processes are not collected
+                with metrics.timer("engineer"):
+                    if procs is None:
+                        return engineer(symbol, df, feature_store)
+                    return procs.submit(engineer, symbol, df, feature_store).result()
+        except Exception as e:
+            logger.error("Pipeline failed for %s: %s", symbol, e)
+            return None
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as threads:
+            pending = deque()
+            queue = iter(symbols)
+            for symbol in queue:
+                pending.append((symbol, threads.submit(run_one, symbol)))
+                if len(pending) >= max_in_flight:
+                    break
+
+            while pending:
+                symbol, future = pending.popleft()
+                result = future.result()
+                nxt = next(queue, None)
+                if nxt is not None:
+                    pending.append((nxt, threads.submit(run_one, nxt)))
+                yield symbol, result
+    finally:
+        if procs is not None:
+            procs.shutdown(cancel_futures=True)
@@ -0,0 +1,333 @@
+"""
+portfolio.py
+------------
+Portfolio-level, event-driven backtest on a shared date timeline.
+
+Unlike backtest_engine (which sums every signal's P&L independently), this
+simulates one account: limited cash, at most max_positions open at once,
+one position per symbol, same-day signals taken in order of model
+probability, and commission + slippage on both sides.
+
+Trade outcomes (exit bar and target/stop/expiry return) come from one
+vectorised trade_utils.first_touch pass over all symbols. Only the capacity
+bookkeeping is sequential: a heap of open positions ordered by exit day,
+walked one trading day at a time and stopping as soon as the day's slots
+or cash run out, so the loop costs O(days + trades taken).
+
+Open positions are marked to each day's Close (net of exit slippage and
+commission), so the equity curve and drawdown see trades that go
+underwater before they exit; a trade is realised on its exit day at the
+target/stop/expiry return of the labels. A position exits during its
+exit day, after that day's entries at the Open, so its slot and capital
+are released (and leave `invested`) from the next trading day.
+"""
+
+import heapq
+import logging
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+import metrics
+from trade_utils import first_touch
+from config import (
+    TARGET_PCT, STOP_PCT, HOLD_DAYS,
+    INITIAL_CAPITAL, MAX_POSITIONS, POSITION_SIZE, COST_BPS, SLIPPAGE_BPS,
+)
+
+logger = logging.getLogger(__name__)
+
+TRADE_COLS = [
+    "symbol", "signal_date", "entry_date", "exit_date", "probability",
+    "allocation", "gross_return", "net_return", "pnl",
+]
+
+
+@dataclass
+class PortfolioResult:
+    """Equity curve, executed trades and skip counts of a portfolio run."""
+
+    equity: pd.Series                 # account value per timeline date
+    invested: pd.Series               # cost basis of positions held on each date
+    trades: pd.DataFrame              # one row per executed trade (TRADE_COLS)
+    initial_capital: float
+    signals: int = 0                  # above-threshold candidates
+    skipped_capacity: int = 0         # no free position slot
+    skipped_held: int = 0             # symbol already held
+    skipped_cash: int = 0             # not enough cash left
+    max_concurrent: int = 0
+    stats: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        if not self.stats:
+            self.stats = self._compute_stats()
+
+    def _compute_stats(self) -> dict:
+        eq = self.equity
+        final = float(eq.iloc[-1]) if len(eq) else self.initial_capital
+        daily = eq.pct_change().dropna() if len(eq) > 1 else pd.Series(dtype=float)
+        sharpe = float(daily.mean() / daily.std() * np.sqrt(252)) if len(daily) > 1 and daily.std() > 0 else 0.0
+        peak = eq.cummax()
+        max_dd = float(((peak - eq) / peak).max()) if len(eq) else 0.0
+        years = (eq.index[-1] - eq.index[0]).days / 365.25 if len(eq) > 1 else 0.0
+        cagr = (final / self.initial_capital) ** (1 / years) - 1 if years > 0 and final > 0 else 0.0
+        n = len(self.trades)
+        wins = int((self.trades["net_return"] > 0).sum()) if n else 0
+        exposure = float((self.invested / eq).mean()) if len(eq) else 0.0
+        return {
+            "final_equity": final,
+            "total_return": final / self.initial_capital - 1,
+            "cagr": cagr,
+            "max_drawdown": max_dd,
+            "sharpe": sharpe,
+            "trades": n,
+            "wins": wins,
+            "win_rate": wins / n if n else 0.0,
+            "exposure": exposure,
+            "max_concurrent": self.max_concurrent,
+            "signals": self.signals,
+            "skipped_capacity": self.skipped_capacity,
+            "skipped_held": self.skipped_held,
+            "skipped_cash": self.skipped_cash,
+        }
+
+    def to_dict(self) -> dict:
+        """JSON-friendly summary (percentages) plus the equity curve."""
+        s = self.stats
+        return {
+            "summary": {
+                **{k: s[k] for k in ("trades", "wins", "signals", "max_concurrent",
+                                     "skipped_capacity", "skipped_held", "skipped_cash")},
+                "final_equity": round(s["final_equity"], 2),
+                "total_return": round(s["total_return"] * 100, 2),
+                "cagr": round(s["cagr"] * 100, 2),
+                "max_drawdown": round(s["max_drawdown"] * 100, 2),
+                "sharpe": round(s["sharpe"], 2),
+                "win_rate": round(s["win_rate"] * 100, 1),
+                "exposure": round(s["exposure"] * 100, 1),
+            },
+            "equity": [
+                {"date": str(d.date()), "equity": round(float(v), 2)}
+                for d, v in self.equity.items()
+            ],
+        }
+
+
+@metrics.timed("portfolio")
+def simulate_portfolio(
+    symbols: list[str],
+    probs: list[np.ndarray],
+    opens: list[np.ndarray],
+    highs: list[np.ndarray],
+    lows: list[np.ndarray],
+    closes: list[np.ndarray],
+    dates: list[np.ndarray],
+    threshold: float,
+    initial_capital: float = INITIAL_CAPITAL,
+    max_positions: int = MAX_POSITIONS,
+    position_size: float = POSITION_SIZE,
+    cost_bps: float = COST_BPS,
+    slippage_bps: float = SLIPPAGE_BPS,
+    target_pct: float = TARGET_PCT,
+    stop_pct: float = STOP_PCT,
+    hold_days: int = HOLD_DAYS,
+) -> PortfolioResult:
+    """Simulate one capital-constrained account trading every symbol's signals.
+
+    A signal on bar i enters at bar i+1's Open and exits on the bar
+    first_touch reports. On each trading day, positions that exited on an
+    earlier day are closed first (their proceeds become available), then
+    that day's entries are taken by descending probability while slots
+    and cash allow. Each entry is allocated position_size × current equity
+    (capped by cash).
+
+    Args:
+        symbols:         Symbol names, one per input array.
+        probs:           Model probability per bar for each symbol.
+        opens, highs, lows, closes: Price arrays aligned with probs.
+        dates:           Bar dates per symbol (defines the shared timeline).
+        threshold:       Minimum probability to take a trade.
+        initial_capital: Starting cash.
+        max_positions:   Maximum concurrent open positions.
+        position_size:   Fraction of equity per new position.
+        cost_bps:        Commission per side in basis points.
+        slippage_bps:    Adverse price slippage per side in basis points.
+        target_pct, stop_pct, hold_days: Trade parameters (default from config).
+
+    Returns:
+        A PortfolioResult.
+    """
+    lengths = np.array([len(p) for p in probs], dtype=np.int64)
+    all_dates = np.concatenate([np.asarray(d, dtype="datetime64[ns]") for d in dates]
+                               or [np.zeros(0, dtype="datetime64[ns]")])
+    timeline, day_of = np.unique(all_dates, return_inverse=True)
+    index = pd.DatetimeIndex(timeline)
+
+    def empty() -> PortfolioResult:
+        flat = pd.Series(initial_capital, index=index, dtype=float)
+        return PortfolioResult(flat, flat * 0.0, pd.DataFrame(columns=TRADE_COLS), initial_capital)
+
+    total = int(lengths.sum())
+    if total == 0:
+        return empty()
+
+    # ── Candidate trades (vectorised) ──────────────────────────────────────
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    sym_id  = np.repeat(np.arange(len(symbols)), lengths)
+    local   = np.arange(total) - offsets[sym_id]
+    prob    = np.concatenate(probs)
+    open_ = np.concatenate(opens).astype(np.float64)
+    close = np.concatenate(closes).astype(np.float64)
+    _, pnl, exits = first_touch(open_, np.concatenate(highs), np.concatenate(lows),
+                                target_pct, stop_pct, hold_days)
+    n = len(pnl)
+    valid = local[:n] < (lengths[sym_id[:n]] - hold_days - 1)
+    cand = np.flatnonzero(valid & (prob[:n] >= threshold))
+    if len(cand) == 0:
+        return empty()
+
+    entry_day = day_of[cand + 1]
+    exit_day  = day_of[cand + exits[cand]]
+    order = np.lexsort((-prob[cand], entry_day))
+    cand, entry_day, exit_day = cand[order], entry_day[order], exit_day[order]
+    c_sym = sym_id[cand]
+
+    slip, cost = slippage_bps / 1e4, cost_bps / 1e4
+    gross = pnl[cand]
+    # Buy at open × (1 + slip), sell at the exit level × (1 - slip), commission on both legs
+    round_trip = (1 - slip) / (1 + slip) * (1 - cost) * (1 - cost)
+    net_mult = (1 + gross) * round_trip
+
+    # ── Capacity loop: one step per trading day with candidates ────────────
+    starts = np.flatnonzero(np.r_[True, entry_day[1:] != entry_day[:-1]])
+    ends = np.r_[starts[1:], len(cand)]
+
+    open_heap: list[tuple[int, int, int, float, float]] = []   # (exit_day, seq, sym, cost, proceeds)
+    held = np.zeros(len(symbols), dtype=bool)
+    cash, open_cost = float(initial_capital), 0.0
+    taken, allocs = [], []
+    skipped_capacity = skipped_held = skipped_cash = 0
+    max_concurrent = 0
+
+    for s, e in zip(starts, ends):
+        day = entry_day[s]
+        while open_heap and open_heap[0][0] < day:
+            _, _, k, basis, proceeds = heapq.heappop(open_heap)
+            cash += proceeds
+            open_cost -= basis
+            held[k] = False
+
+        for j in range(s, e):
+            if len(open_heap) >= max_positions:
+                skipped_capacity += int(e - j)
+                break
+            k = c_sym[j]
+            if held[k]:
+                skipped_held += 1
+                continue
+            alloc = min((cash + open_cost) * position_size, cash)
+            if alloc <= 0:
+                skipped_cash += int(e - j)
+                break
+            cash -= alloc
+            open_cost += alloc
+            held[k] = True
+            heapq.heappush(open_heap, (int(exit_day[j]), j, int(k), alloc, alloc * float(net_mult[j])))
+            taken.append(j)
+            allocs.append(alloc)
+        max_concurrent = max(max_concurrent, len(open_heap))
+
+    # ── Equity / exposure curves from the executed trades ──────────────────
+    taken = np.asarray(taken, dtype=np.int64)
+    alloc = np.asarray(allocs, dtype=np.float64)
+    proceeds = alloc * net_mult[taken]
+    days = len(timeline)
+    realised = np.bincount(exit_day[taken], weights=proceeds - alloc, minlength=days)
+    equity = initial_capital + np.cumsum(realised) + _unrealised(
+        cand[taken], exits[cand[taken]], alloc, open_, close, day_of, round_trip, days)
+    delta = np.zeros(days + 1)
+    np.add.at(delta, entry_day[taken], alloc)
+    np.add.at(delta, exit_day[taken] + 1, -alloc)   # held through the exit day, like its slot
+    invested = np.cumsum(delta[:-1])
+
+    tg = cand[taken]
+    trades = pd.DataFrame({
+        "symbol":       np.asarray(symbols, dtype=object)[c_sym[taken]],
+        "signal_date":  all_dates[tg],
+        "entry_date":   timeline[entry_day[taken]],
+        "exit_date":    timeline[exit_day[taken]],
+        "probability":  prob[tg],
+        "allocation":   alloc,
+        "gross_return": gross[taken],
+        "net_return":   net_mult[taken] - 1,
+        "pnl":          proceeds - alloc,
+    }, columns=TRADE_COLS)
+
+    result = PortfolioResult(
+        equity=pd.Series(equity, index=index),
+        invested=pd.Series(invested, index=index),
+        trades=trades,
+        initial_capital=initial_capital,
+        signals=len(cand),
+        skipped_capacity=skipped_capacity,
+        skipped_held=skipped_held,
+        skipped_cash=skipped_cash,
+        max_concurrent=max_concurrent,
+    )
+    logger.info("Portfolio: %d/%d signals traded, final equity %.2f (max DD %.2f%%)",
+                len(trades), len(cand), result.stats["final_equity"], result.stats["max_drawdown"] * 100)
+    return result
+
+
+def _unrealised(
+    signal: np.ndarray,
+    exits: np.ndarray,
+    alloc: np.ndarray,
+    open_: np.ndarray,
+    close: np.ndarray,
+    day_of: np.ndarray,
+    round_trip: float,
+    days: int,
+) -> np.ndarray:
+    """Mark-to-market gain of the open positions on every timeline day.
+
+    A trade signalled on bar i (global index) holds bars i+1 .. i+exit-1
+    before its exit bar; each is valued at its Close as if sold there
+    (round_trip: slippage and commission), from that bar's day until the
+    symbol's next bar, so days the symbol did not trade keep the last mark.
+    """
+    held = exits - 1
+    bars = np.repeat(signal + 1, held) + (np.arange(held.sum()) - np.repeat(np.cumsum(held) - held, held))
+    owner = np.repeat(np.arange(len(signal)), held)
+    gain = alloc[owner] * (close[bars] / open_[signal + 1][owner] * round_trip - 1)
+    delta = np.zeros(days + 1)
+    np.add.at(delta, day_of[bars], gain)
+    np.add.at(delta, day_of[bars + 1], -gain)
+    return np.cumsum(delta[:-1])
+
+
+def simulate_frames(
+    frames: dict[str, pd.DataFrame],
+    probs: dict[str, np.ndarray],
+    threshold: float,
+    **params,
+) -> PortfolioResult:
+    """Convenience wrapper over simulate_portfolio for per-symbol OHLC DataFrames.
+
+    Args:
+        frames:    symbol -> DataFrame with Open, High, Low, Close columns and a date index.
+        probs:     symbol -> probability array aligned with the frame's rows.
+        threshold: Minimum probability to take a trade.
+        **params:  Forwarded to simulate_portfolio.
+    """
+    symbols = list(frames)
+    return simulate_portfolio(
+        symbols,
+        [np.asarray(probs[s]) for s in symbols],
+        [frames[s]["Open"].to_numpy() for s in symbols],
+        [frames[s]["High"].to_numpy() for s in symbols],
+        [frames[s]["Low"].to_numpy() for s in symbols],
+        [frames[s]["Close"].to_numpy() for s in symbols],
+        [frames[s].index.to_numpy() for s in symbols],
+        threshold,
+        **params,
+    )
@@ -0,0 +1,138 @@
+"""
+response_cache.py
+-----------------
+In-memory result cache for the server's expensive read endpoints
+(/api/signals, /api/backtest).
+
+Entries are keyed on everything the result depends on — endpoint, model
+name and version, universe, trade parameters and the current bar date —
+so a new model or a new trading day simply produces a new key. Entries
+also expire after a TTL (to pick up intraday bar updates) and the least
+recently used are evicted beyond max_entries. Each entry carries an ETag
+so clients can revalidate with If-None-Match and get a 304.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+import pandas as pd
+from config import RESPONSE_CACHE_TTL, RESPONSE_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts) -> str:
+    """Stable hash of JSON-serialisable key parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+
+def current_bar_date(now: pd.Timestamp | None = None) -> str:
+    """Date of the latest daily bar that can exist now (last weekday on or before today)."""
+    today = (now or pd.Timestamp.now()).normalize()
+    return str(pd.offsets.BDay().rollback(today).date())
+
+
+@dataclass
+class CachedResponse:
+    """A computed result plus its serialised JSON body and ETag."""
+
+    payload: dict
+    body: bytes
+    etag: str
+    created_at: float
+    expires_at: float
+
+    @classmethod
+    def build(cls, payload: dict, now: float, ttl: float) -> "CachedResponse":
+        body = json.dumps(payload, default=str).encode()
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        return cls(payload, body, etag, now, now + ttl)
+
+
+class ResponseCache:
+    """Thread-safe TTL + LRU cache of computed responses.
+
+    Concurrent requests for the same key are coalesced: the first computes,
+    the others wait for its result instead of recomputing.
+    """
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = RESPONSE_CACHE_SIZE,
+                 clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._computing: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: str) -> CachedResponse | None:
+        """Return a live entry (marking it recently used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, payload: dict) -> CachedResponse:
+        entry = CachedResponse.build(payload, self._clock(), self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_or_compute(self, key: str, compute: Callable[[], dict]) -> tuple[CachedResponse, bool]:
+        """Return (entry, hit). On a miss, compute() runs once per key even under concurrency.
+
+        Exceptions from compute() propagate and nothing is cached.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            self._count(hit=True)
+            return entry, True
+
+        with self._lock:
+            key_lock = self._computing.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another request may have filled the entry while we waited
+            entry = self.get(key)
+            if entry is not None:
+                self._count(hit=True)
+                return entry, True
+            try:
+                entry = self.put(key, compute())
+            finally:
+                with self._lock:
+                    self._computing.pop(key, None)
+        self._count(hit=False)
+        return entry, False
+
+    def clear(self) -> None:
+        """Drop every entry (e.g. after a new model is trained)."""
+        with self._lock:
+            n = len(self._entries)
+            self._entries.clear()
+        logger.info("Response cache cleared (%d entries)", n)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries,
+                    "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
@@ -4,9 +4,16 @@ run.py
 One-command runner for the CNC AI trading system.
 Chains install → train → signals → backtest in sequence.
 
+By default each step runs as its own script in a fresh interpreter. With
+--in-process, train → signals → backtest run in this interpreter instead:
+imports are paid once, each symbol's bars are fetched once
+(data_utils.shared_fetches) and the freshly trained model is passed
+straight to the signal and backtest steps.
+
 Usage:
     python run.py              # full pipeline
     python run.py --skip-install
+    python run.py --skip-install --in-process
     python run.py --only train
     python run.py --only signals
     python run.py --only backtest
@@ -16,6 +23,8 @@ Usage:
 import argparse
 import subprocess
 import sys
+import time
+import traceback
 
 
 STEPS = {
@@ -26,6 +35,8 @@ STEPS = {
     "test":     [sys.executable, "-m", "pytest", "tests/", "-v"],
 }
 
+IN_PROCESS_STEPS = ("train", "signals", "backtest")
+
 DIVIDER = "─" * 52
 
 
@@ -41,23 +52,66 @@ def run_step(name: str, cmd: list[str]) -> bool:
     return True
 
 
+def run_in_process(names: list[str]) -> bool:
+    """Run the given IN_PROCESS_STEPS in this interpreter, sharing data and the model."""
+    from data_utils import shared_fetches
+
+    model = None
+    with shared_fetches():
+        for name in names:
+            print(f"\n{DIVIDER}")
+            print(f"  ▶  {name.upper()}  (in-process)")
+            print(DIVIDER)
+            t0 = time.perf_counter()
+            try:
+                if name == "train":
+                    from train_model import train
+                    model = train()
+                elif name == "signals":
+                    from main import generate_signals
+                    generate_signals(model)
+                elif name == "backtest":
+                    from backtest import backtest
+                    backtest(model=model)
+            except Exception as e:
+                traceback.print_exc()
+                print(f"\n✗ Step '{name}' failed ({type(e).__name__}: {e}). Stopping.")
+                return False
+            print(f"\n✓ {name} complete ({time.perf_counter() - t0:.1f}s).")
+    return True
+
+
 def main():
     parser = argparse.ArgumentParser(description="CNC AI System runner")
     parser.add_argument("--skip-install", action="store_true", help="Skip pip install step")
     parser.add_argument("--only", choices=STEPS.keys(), help="Run a single step only")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Run train → signals → backtest in one interpreter")
     args = parser.parse_args()
 
     if args.only:
-        run_step(args.only, STEPS[args.only])
+        if args.in_process and args.only in IN_PROCESS_STEPS:
+            run_in_process([args.only])
+        else:
+            run_step(args.only, STEPS[args.only])
         return
 
     steps = list(STEPS.items())
     if args.skip_install:
         steps = [(k, v) for k, v in steps if k != "install"]
 
+    pending = []   # consecutive in-process steps, run together to share state
     for name, cmd in steps:
+        if args.in_process and name in IN_PROCESS_STEPS:
+            pending.append(name)
+            continue
+        if pending and not run_in_process(pending):
+            sys.exit(1)
+        pending = []
         if not run_step(name, cmd):
             sys.exit(1)
+    if pending and not run_in_process(pending):
+        sys.exit(1)
 
     print(f"\n{DIVIDER}")
     print("  ✓  All steps completed successfully.")
@@ -0,0 +1,79 @@
+"""
+scoring.py
+----------
+Batched cross-symbol inference for live signals.
+Stacks the latest feature row of every symbol into one matrix and scores
+the whole universe with a single model call.
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+import metrics
+from config import FEATURE_COLS, SIGNAL_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+def latest_rows(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Stack the last row of each featured frame into one DataFrame indexed by symbol.
+
+    Args:
+        frames: symbol -> DataFrame returned by add_features.
+
+    Returns:
+        One row per non-empty frame, with a 'date' column for the bar used.
+    """
+    rows = {symbol: df.iloc[-1] for symbol, df in frames.items() if len(df)}
+    if not rows:
+        return pd.DataFrame(columns=["date", *FEATURE_COLS])
+    latest = pd.DataFrame.from_dict(rows, orient="index")
+    latest["date"] = [frames[s].index[-1] for s in latest.index]
+    return latest
+
+
+@metrics.timed("predict")
+def predict_probs(model, X: pd.DataFrame) -> np.ndarray:
+    """Positive-class probabilities for every row of X in one call.
+
+    Uses the native booster's inplace_predict when available, which skips
+    the DMatrix construction predict_proba does on every call, and falls
+    back to predict_proba for other estimators.
+    """
+    if len(X) == 0:
+        return np.zeros(0)
+    metrics.inc("cnc_predicted_rows_total", len(X), help="Rows scored by the model")
+    get_booster = getattr(model, "get_booster", None)
+    if get_booster is not None:
+        try:
+            probs = np.asarray(get_booster().inplace_predict(X))
+            return probs[:, 1] if probs.ndim == 2 else probs
+        except Exception as e:
+            logger.debug("inplace_predict unavailable, using predict_proba: %s", e)
+    return model.predict_proba(X)[:, 1]
+
+
+def score_universe(
+    model,
+    frames: dict[str, pd.DataFrame],
+    threshold: float = SIGNAL_THRESHOLD,
+) -> pd.DataFrame:
+    """Score the latest bar of every symbol and rank by probability.
+
+    Args:
+        model:     Trained classifier.
+        frames:    symbol -> DataFrame returned by add_features.
+        threshold: Probability at or above which a row is a BUY.
+
+    Returns:
+        DataFrame sorted by descending probability with columns:
+        symbol, date, every FEATURE_COLS column, probability, signal.
+    """
+    latest = latest_rows(frames)
+    probs = predict_probs(model, latest[FEATURE_COLS].astype(np.float64))
+
+    table = latest[["date", *FEATURE_COLS]].copy()
+    table.insert(0, "symbol", latest.index)
+    table["probability"] = probs
+    table["signal"] = np.where(probs >= threshold, "BUY", "HOLD")
+    return table.sort_values("probability", ascending=False, kind="stable").reset_index(drop=True)
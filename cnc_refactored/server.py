@@ -5,24 +5,36 @@ Local Flask server that powers the CNC AI Trading System browser dashboard.
 Started automatically by launch.bat — do not run directly unless debugging.
 """
 
+import json
 import logging
 import os
+import re
+import subprocess
 import sys
 import threading
+import time
 import webbrowser
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_from_directory
 from flask_cors import CORS
 
 # ── Path setup ─────────────────────────────────────────────────────────────────
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, BASE_DIR)
 
-from config import STOCK_LIST, FEATURE_COLS, MODEL_PATH
+from config import (
+    STOCK_LIST, FEATURE_COLS, MODEL_PATH, MODEL_VERSIONS, SIGNAL_THRESHOLD,
+    TARGET_PCT, STOP_PCT, HOLD_DAYS, START_DATE, LIVE_TAIL,
+)
 from data_utils import fetch_data
-from features import add_features
+from live_window import fetch_universe
+from panel_features import add_panel_features
 from labeling import create_labels
-from model_utils import load_model
-from trade_utils import simulate_trade
+from model_registry import ModelRegistry, DEFAULT_MODEL
+from backtest_engine import backtest_frames
+from scoring import score_universe, predict_probs
+from jobs import JobManager
+from response_cache import ResponseCache, make_key, current_bar_date
+import metrics
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
@@ -30,7 +42,160 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__, static_folder=os.path.join(BASE_DIR, "gui"))
 CORS(app)
 
-SIGNAL_THRESHOLD = 0.65
+models = ModelRegistry()
+models.register(DEFAULT_MODEL, os.path.join(BASE_DIR, MODEL_PATH))
+for _name, _path in MODEL_VERSIONS.items():
+    models.register(_name, os.path.join(BASE_DIR, _path))
+
+jobs = JobManager()
+responses = ResponseCache()
+
+_FETCHED_RE = re.compile(r"Fetched \d+ rows for (\S+)")
+
+
+def _model_name() -> str:
+    """Model named by the ?model= query parameter (default model otherwise)."""
+    name = request.args.get("model", DEFAULT_MODEL)
+    if name not in models.names():
+        raise FileNotFoundError(f"Unknown model '{name}'. Available: {', '.join(models.names())}")
+    return name
+
+
+def _job_accepted(job):
+    return jsonify({"success": True, "job_id": job.id, "job": job.to_dict(include_result=False)}), 202
+
+
+# ── Response cache ─────────────────────────────────────────────────────────────
+
+def _cached(endpoint: str, name: str, compute):
+    """Serve compute(model) from the response cache, computing it on a miss.
+
+    The key covers the model version, universe, trade parameters and bar
+    date, so a retrained model or a new trading day never reuses a result.
+
+    Returns:
+        (CachedResponse, hit)
+    """
+    model = models.get(name)  # refreshes the version if the file changed
+    key = make_key(endpoint, name, models.info(name)["version"], STOCK_LIST,
+                   SIGNAL_THRESHOLD, TARGET_PCT, STOP_PCT, HOLD_DAYS, current_bar_date())
+    entry, hit = responses.get_or_compute(key, lambda: compute(model))
+    metrics.inc("cnc_response_cache_requests_total", help="Response cache lookups by outcome",
+                endpoint=endpoint, result="hit" if hit else "miss")
+    return entry, hit
+
+
+def _conditional_response(entry, hit: bool):
+    """JSON response for a cache entry, or 304 if the client already has it."""
+    if entry.etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        resp = Response(entry.body, mimetype="application/json")
+    resp.set_etag(entry.etag)
+    resp.headers["Cache-Control"] = "no-cache"   # always revalidate via ETag
+    resp.headers["X-Cache"] = "HIT" if hit else "MISS"
+    return resp
+
+
+# ── Job bodies ─────────────────────────────────────────────────────────────────
+
+def _train_job(reporter) -> dict:
+    """Run train_model.py in a subprocess, reporting per-symbol fetch progress."""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(BASE_DIR, "train_model.py")],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, cwd=BASE_DIR,
+    )
+    lines, fetched = [], 0
+    for line in proc.stdout:
+        lines.append(line)
+        match = _FETCHED_RE.search(line)
+        if match:
+            fetched += 1
+            reporter.symbol(match.group(1), "fetched")
+            reporter.progress(0.8 * fetched / len(STOCK_LIST), f"Fetched {match.group(1)}")
+        elif "Training on" in line:
+            reporter.progress(0.85, "Fitting model")
+    proc.wait()
+
+    output = "".join(lines)[-2000:]
+    if proc.returncode != 0:
+        raise RuntimeError(output)
+    models.reload(DEFAULT_MODEL)
+    responses.clear()
+    return {"output": output}
+
+
+def _backtest_payload(model, reporter=None) -> dict:
+    """Fetch every stock, featurise them in one panel pass, label and score, then backtest."""
+    raw = {}
+    for k, stock in enumerate(STOCK_LIST):
+        with metrics.symbol_scope(stock):
+            df = fetch_data(stock)
+        if df is not None:
+            raw[stock] = df
+        if reporter is not None:
+            reporter.symbol(stock, "fetched" if df is not None else "no data")
+            reporter.progress(0.5 * (k + 1) / len(STOCK_LIST), f"Fetched {stock}")
+
+    frames, probs = {}, {}
+    featured = add_panel_features(raw, FEATURE_COLS)
+    for k, (stock, df) in enumerate(featured.items()):
+        with metrics.symbol_scope(stock):
+            df = create_labels(df)
+            frames[stock] = df
+            probs[stock] = predict_probs(model, df[FEATURE_COLS])
+        if reporter is not None:
+            reporter.symbol(stock, "done")
+            reporter.progress(0.5 + 0.45 * (k + 1) / len(featured), f"Processed {stock}")
+
+    return backtest_frames(frames, probs, SIGNAL_THRESHOLD).to_dict()
+
+
+def _backtest_job(reporter, model_name: str) -> dict:
+    entry, _ = _cached("backtest", model_name, lambda model: {"success": True, **_backtest_payload(model, reporter)})
+    return entry.payload
+
+
+def _signals_payload(model) -> dict:
+    """Fetch and featurise every stock, then rank the latest bars in one model call.
+
+    Only the trailing window the features need is fetched when LIVE_TAIL is on.
+    """
+    raw, missing = fetch_universe(STOCK_LIST, None if LIVE_TAIL else START_DATE)
+    errors = [{"symbol": stock, "error": "No data"} for stock in missing]
+    frames = add_panel_features(raw, FEATURE_COLS)
+
+    ranked = [
+        {
+            "symbol": row.symbol,
+            "probability": round(float(row.probability), 4),
+            "signal": row.signal,
+            "rsi": round(float(row.rsi), 2),
+            "atr_pct": round(float(row.atr_pct) * 100, 3),
+            "vol_ratio": round(float(row.vol_ratio), 2),
+        }
+        for row in score_universe(model, frames, SIGNAL_THRESHOLD).itertuples()
+    ]
+    return {"success": True, "signals": ranked + errors}
+
+
+# ── Request metrics ────────────────────────────────────────────────────────────
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        metrics.observe("cnc_http_request_seconds", time.perf_counter() - started,
+                        "Server request latency (to first byte for streams)", route=route, method=request.method)
+        metrics.inc("cnc_http_requests_total", help="Server requests by route and status",
+                    route=route, method=request.method, status=response.status_code)
+    return response
 
 
 # ── API routes ─────────────────────────────────────────────────────────────────
@@ -38,20 +203,20 @@ SIGNAL_THRESHOLD = 0.65
 @app.route("/api/status")
 def status():
     model_ready = os.path.exists(os.path.join(BASE_DIR, MODEL_PATH))
-    return jsonify({"status": "ok", "model_ready": model_ready})
+    return jsonify({
+        "status": "ok",
+        "model_ready": model_ready,
+        "model": models.info(DEFAULT_MODEL),
+        "models": models.versions(),
+        "response_cache": responses.stats(),
+    })
 
 
 @app.route("/api/train", methods=["POST"])
 def train():
+    """Start (or join) a background training job and return its id."""
     try:
-        import subprocess
-        result = subprocess.run(
-            [sys.executable, os.path.join(BASE_DIR, "train_model.py")],
-            capture_output=True, text=True, cwd=BASE_DIR
-        )
-        if result.returncode != 0:
-            return jsonify({"success": False, "error": result.stderr[-2000:]}), 500
-        return jsonify({"success": True, "output": result.stdout[-2000:]})
+        return _job_accepted(jobs.submit("train", _train_job))
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -59,25 +224,7 @@ def train():
 @app.route("/api/signals")
 def signals():
     try:
-        model = load_model(os.path.join(BASE_DIR, MODEL_PATH))
-        results = []
-        for stock in STOCK_LIST:
-            df = fetch_data(stock)
-            if df is None:
-                results.append({"symbol": stock, "error": "No data"})
-                continue
-            df = add_features(df)
-            latest = df.iloc[-1:]
-            prob = float(model.predict_proba(latest[FEATURE_COLS])[:, 1][0])
-            results.append({
-                "symbol": stock,
-                "probability": round(prob, 4),
-                "signal": "BUY" if prob >= SIGNAL_THRESHOLD else "HOLD",
-                "rsi": round(float(latest["rsi"].iloc[0]), 2),
-                "atr_pct": round(float(latest["atr_pct"].iloc[0]) * 100, 3),
-                "vol_ratio": round(float(latest["vol_ratio"].iloc[0]), 2),
-            })
-        return jsonify({"success": True, "signals": results})
+        return _conditional_response(*_cached("signals", _model_name(), _signals_payload))
     except FileNotFoundError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -85,53 +232,19 @@ def signals():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route("/api/backtest")
+@app.route("/api/backtest", methods=["GET", "POST"])
 def backtest():
-    try:
-        model = load_model(os.path.join(BASE_DIR, MODEL_PATH))
-        total_return = 0.0
-        trades = 0
-        wins = 0
-        per_stock = []
+    """GET runs the backtest synchronously; POST queues it as a background job.
 
-        for stock in STOCK_LIST:
-            df = fetch_data(stock)
-            if df is None:
-                continue
-            df = add_features(df)
-            df = create_labels(df)
-            probs = model.predict_proba(df[FEATURE_COLS])[:, 1]
-
-            s_trades, s_wins, s_return = 0, 0, 0.0
-            for i in range(len(df) - 6):
-                if probs[i] >= SIGNAL_THRESHOLD:
-                    label, pnl = simulate_trade(df, i)
-                    s_trades += 1
-                    s_return += pnl
-                    if label == 1:
-                        s_wins += 1
-
-            trades += s_trades
-            wins += s_wins
-            total_return += s_return
-            per_stock.append({
-                "symbol": stock,
-                "trades": s_trades,
-                "wins": s_wins,
-                "win_rate": round(s_wins / s_trades * 100, 1) if s_trades else 0,
-                "total_return": round(s_return * 100, 2),
-            })
-
-        return jsonify({
-            "success": True,
-            "summary": {
-                "trades": trades,
-                "wins": wins,
-                "win_rate": round(wins / trades * 100, 1) if trades else 0,
-                "total_return": round(total_return * 100, 2),
-            },
-            "per_stock": per_stock,
-        })
+    Both read through the response cache, so a repeat of either is served
+    without recomputing.
+    """
+    try:
+        if request.method == "POST":
+            name = _model_name()
+            return _job_accepted(jobs.submit("backtest", _backtest_job, key=f"backtest:{name}", model_name=name))
+        return _conditional_response(*_cached(
+            "backtest", _model_name(), lambda model: {"success": True, **_backtest_payload(model)}))
     except FileNotFoundError as e:
         return jsonify({"success": False, "error": str(e)}), 400
     except Exception as e:
@@ -139,6 +252,53 @@ def backtest():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route("/api/jobs")
+def list_jobs():
+    return jsonify({"success": True, "jobs": [j.to_dict(include_result=False) for j in jobs.list()]})
+
+
+@app.route("/api/jobs/<job_id>")
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"Unknown job '{job_id}'"}), 404
+    return jsonify({"success": True, "job": job.to_dict()})
+
+
+@app.route("/api/jobs/<job_id>/events")
+def job_events(job_id):
+    """Server-sent events stream of a job's state, ending when it finishes."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": f"Unknown job '{job_id}'"}), 404
+
+    def stream():
+        seen = -1
+        while True:
+            finished = job.finished
+            if job.revision != seen or finished:
+                seen = job.revision
+                yield f"data: {json.dumps(job.to_dict(include_result=finished))}\n\n"
+            if finished:
+                return
+            time.sleep(0.25)
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.route("/api/cache", methods=["DELETE"])
+def clear_cache():
+    """Drop all cached /api/signals and /api/backtest results."""
+    responses.clear()
+    return jsonify({"success": True, "response_cache": responses.stats()})
+
+
+@app.route("/api/metrics")
+def prometheus_metrics():
+    """Counters and latency histograms in the Prometheus text format."""
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 # ── Serve GUI ──────────────────────────────────────────────────────────────────
 
 @app.route("/")
@@ -0,0 +1,212 @@
+"""
+streaming_features.py
+---------------------
+Incremental version of features.add_features for live signal generation.
+Keeps per-symbol state for the features the requested columns depend on
+and updates it per new bar, without recomputing the history.
+
+Features come from feature_registry, exactly as panel_features computes
+them:
+
+  - finite-window features (decay == 0) keep the last warmup + 1 values
+    of their inputs and evaluate the registered function over them, so
+    their windows always match the batch engine;
+  - recursive features (EMA, Wilder ATR/RSI) have an O(1) update in
+    RECURSIONS, parameterised by the feature's registered decay (weight
+    on the previous value) and warm-up.
+
+Once a symbol has seen its full history the latest row matches the batch
+output to floating-point tolerance.
+"""
+
+import json
+import logging
+import math
+from dataclasses import dataclass, field, asdict
+import numpy as np
+import pandas as pd
+# Resolved through panel_features, whose import registers the features
+from panel_features import RAW_INPUTS, Feature, resolve, warmup_rows
+from feature_registry import split_columns
+from config import FEATURE_COLS
+
+logger = logging.getLogger(__name__)
+
+
+# ── Recursions (state dict, feature, current inputs) -> value or NaN ───────────
+
+def _ema(state: dict, f: Feature, x: float) -> float:
+    """panel_features.ema: adjust=False EWM seeded with the first value."""
+    n = state["n"] = state.get("n", 0) + 1
+    state["mean"] = x if n == 1 else f.decay * state["mean"] + (1 - f.decay) * x
+    return state["mean"] if n > f.warmup else math.nan
+
+
+def _atr(state: dict, f: Feature, high: float, low: float, close: float) -> float:
+    """panel_features.atr: mean of the first warmup + 1 true ranges, then Wilder smoothing."""
+    prev = state.get("prev_close")
+    tr = high - low if prev is None else max(high - low, abs(high - prev), abs(low - prev))
+    state["prev_close"] = close
+    n = state["n"] = state.get("n", 0) + 1
+    if n <= f.warmup:
+        state["sum"] = state.get("sum", 0.0) + tr
+        return math.nan
+    if n == f.warmup + 1:
+        state["atr"] = (state.get("sum", 0.0) + tr) / n
+    else:
+        state["atr"] = f.decay * state["atr"] + (1 - f.decay) * tr
+    return state["atr"]
+
+
+def _rsi(state: dict, f: Feature, close: float) -> float:
+    """panel_features.rsi: Wilder EWM of up/down moves (first move 0)."""
+    prev = state.get("prev_close")
+    diff = 0.0 if prev is None else close - prev
+    up, down = max(diff, 0.0), max(-diff, 0.0)
+    state["prev_close"] = close
+    n = state["n"] = state.get("n", 0) + 1
+    if n == 1:
+        state["up"], state["down"] = up, down
+    else:
+        state["up"] = f.decay * state["up"] + (1 - f.decay) * up
+        state["down"] = f.decay * state["down"] + (1 - f.decay) * down
+    if n <= f.warmup:
+        return math.nan
+    return 100.0 if state["down"] == 0 else 100 - 100 / (1 + state["up"] / state["down"])
+
+
+# Registered recursive features -> their incremental update
+RECURSIONS = {"ema20": _ema, "ema50": _ema, "atr": _atr, "rsi": _rsi}
+
+
+@dataclass
+class FeatureState:
+    """Feature state for one symbol. Plain fields so it serialises to JSON."""
+
+    n: int = 0
+    last_ts: str | None = None
+    recursions: dict[str, dict] = field(default_factory=dict)     # feature -> its recursion state
+    windows: dict[str, list[float]] = field(default_factory=dict)  # input -> its latest values
+
+
+class IncrementalFeatureEngine:
+    """Per-symbol streaming computation of `columns` (default FEATURE_COLS).
+
+    Usage:
+        engine = IncrementalFeatureEngine()
+        engine.update_from_frame("INFY.NS", df)   # replays history once
+        row = engine.update("INFY.NS", bar)        # per new bar
+
+    Raises:
+        ValueError: If columns include cross-sectional features (they need
+                    the whole universe), or depend on a recursive feature
+                    with no entry in RECURSIONS.
+    """
+
+    def __init__(self, columns: list[str] = FEATURE_COLS):
+        _, cross = split_columns(columns)
+        if cross:
+            raise ValueError(f"Cross-sectional feature(s) {', '.join(cross)} cannot be streamed per symbol")
+        self.features = resolve(columns)
+        missing = [f.name for f in self.features if f.decay and f.name not in RECURSIONS]
+        if missing:
+            raise ValueError(f"No incremental form for recursive feature(s): {', '.join(missing)}")
+        self.warmup = warmup_rows(columns)
+        self.inputs = [c for c in RAW_INPUTS if any(c in f.inputs for f in self.features)]
+        # Values each finite-window feature reads, and how many of them it needs
+        self._window: dict[str, int] = {}
+        for f in self.features:
+            if not f.decay:
+                for dep in f.inputs:
+                    self._window[dep] = max(self._window.get(dep, 0), f.warmup + 1)
+        self.states: dict[str, FeatureState] = {}
+
+    # ── Updates ────────────────────────────────────────────────────────────────
+
+    def update(self, symbol: str, bar, ts=None) -> dict | None:
+        """Consume one bar and return the features for it.
+
+        Args:
+            symbol: Ticker symbol.
+            bar:    Mapping (dict / Series) with the raw columns the features
+                    read (Open, High, Low, Close, Volume).
+            ts:     Optional bar timestamp. Bars at or before the last seen
+                    timestamp are ignored, so replaying overlapping data is safe.
+
+        Returns:
+            A dict of every feature the columns depend on (as add_features
+            adds them), or None while the symbol is still in its warm-up
+            period or when a feature is undefined for this bar.
+        """
+        st = self.states.setdefault(symbol, FeatureState())
+        if ts is not None:
+            ts = str(pd.Timestamp(ts))
+            if st.last_ts is not None and ts <= st.last_ts:
+                return None
+            st.last_ts = ts
+
+        values = {c: float(bar[c]) for c in self.inputs}
+        self._remember(st, values)
+        for f in self.features:
+            if f.decay:
+                state = st.recursions.setdefault(f.name, {})
+                values[f.name] = RECURSIONS[f.name](state, f, *(values[i] for i in f.inputs))
+            else:
+                window = [np.array(st.windows[i][-(f.warmup + 1):], dtype=np.float64)[:, None] for i in f.inputs]
+                if len(window[0]) <= f.warmup:
+                    values[f.name] = math.nan
+                else:
+                    values[f.name] = float(f.fn(*window)[-1, 0])
+            self._remember(st, {f.name: values[f.name]})
+        st.n += 1
+
+        row = {f.name: values[f.name] for f in self.features}
+        if st.n <= self.warmup or any(math.isnan(v) for v in row.values()):
+            return None
+        return row
+
+    def _remember(self, st: FeatureState, values: dict[str, float]) -> None:
+        """Append values to the windows that finite-window features read."""
+        for name, value in values.items():
+            size = self._window.get(name)
+            if size:
+                window = st.windows.setdefault(name, [])
+                window.append(value)
+                del window[:-size]
+
+    def update_from_frame(self, symbol: str, df: pd.DataFrame) -> dict | None:
+        """Feed every bar of df newer than the symbol's last seen timestamp.
+
+        Returns:
+            Features for the latest bar, or None if nothing new was consumed
+            or the symbol is still warming up.
+        """
+        last = self.states.get(symbol, FeatureState()).last_ts
+        if last is not None:
+            df = df[df.index > pd.Timestamp(last)]
+        row = None
+        for ts, bar in zip(df.index, df[self.inputs].to_dict("records")):
+            row = self.update(symbol, bar, ts)
+        return row
+
+    # ── Persistence ────────────────────────────────────────────────────────────
+
+    def snapshot(self) -> dict:
+        """Return all symbol states as a JSON-serialisable dict."""
+        return {symbol: asdict(st) for symbol, st in self.states.items()}
+
+    def restore(self, snapshot: dict) -> None:
+        """Replace all symbol states with those from a snapshot()."""
+        self.states = {symbol: FeatureState(**st) for symbol, st in snapshot.items()}
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f)
+        logger.info("Saved feature state for %d symbols to %s", len(self.states), path)
+
+    @classmethod
+    def load(cls, path: str, columns: list[str] = FEATURE_COLS) -> "IncrementalFeatureEngine":
+        engine = cls(columns)
+        with open(path) as f:
+            engine.restore(json.load(f))
+        return engine
@@ -0,0 +1,136 @@
+"""
+sweep.py
+--------
+Evaluates a grid of SIGNAL_THRESHOLD / TARGET_PCT / STOP_PCT / HOLD_DAYS
+settings against a single set of model predictions.
+
+Frames and probabilities are built once, exactly as backtest.py builds
+them (backtest.load_predictions), so the row with the config parameters
+reproduces backtest.py's result. Each (target, stop, hold) combination
+then costs one first_touch pass over the whole universe, and every
+threshold is scored from that pass with a sort and a cumulative sum.
+
+Usage:
+    python sweep.py
+    python sweep.py --thresholds 0.5 0.6 0.7 --targets 0.02 0.03 --holds 3 5 10
+"""
+
+import argparse
+import itertools
+import logging
+import numpy as np
+import pandas as pd
+import metrics
+from backtest import load_predictions
+from trade_utils import first_touch
+from config import TARGET_PCT, STOP_PCT, HOLD_DAYS
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+SWEEP_COLS = [
+    "threshold", "target_pct", "stop_pct", "hold_days",
+    "trades", "wins", "win_rate", "total_return", "avg_return",
+]
+
+
+def sweep(
+    frames: dict[str, pd.DataFrame],
+    probs: dict[str, np.ndarray],
+    thresholds: list[float],
+    target_pcts: list[float] | None = None,
+    stop_pcts: list[float] | None = None,
+    hold_days_list: list[int] | None = None,
+) -> pd.DataFrame:
+    """Score every combination of thresholds and trade parameters.
+
+    Candidate bars follow backtest_engine.run_backtest: bar i of a symbol
+    with L bars is tradeable when i < L - hold_days - 1. A row with the same
+    parameters therefore matches run_backtest on the same frames/probs.
+
+    Args:
+        frames:         symbol -> DataFrame with Open, High, Low columns.
+        probs:          symbol -> probability array aligned with the frame.
+        thresholds:     Signal thresholds to evaluate.
+        target_pcts, stop_pcts, hold_days_list: Trade parameter grids
+                        (default: the single config value).
+
+    Returns:
+        A DataFrame with one row per combination (columns: SWEEP_COLS).
+    """
+    target_pcts = target_pcts or [TARGET_PCT]
+    stop_pcts = stop_pcts or [STOP_PCT]
+    hold_days_list = hold_days_list or [HOLD_DAYS]
+
+    symbols = list(frames)
+    lengths = np.array([len(frames[s]) for s in symbols], dtype=np.int64)
+    if lengths.sum() == 0:
+        return pd.DataFrame(columns=SWEEP_COLS)
+
+    opens = np.concatenate([frames[s]["Open"].to_numpy(dtype=np.float64) for s in symbols])
+    highs = np.concatenate([frames[s]["High"].to_numpy(dtype=np.float64) for s in symbols])
+    lows  = np.concatenate([frames[s]["Low"].to_numpy(dtype=np.float64) for s in symbols])
+    prob  = np.concatenate([np.asarray(probs[s], dtype=np.float64) for s in symbols])
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    sym_id  = np.repeat(np.arange(len(symbols)), lengths)
+    local   = np.arange(len(prob)) - offsets[sym_id]
+    thresholds = np.asarray(sorted(thresholds), dtype=np.float64)
+
+    rows = []
+    for target_pct, stop_pct, hold_days in itertools.product(target_pcts, stop_pcts, hold_days_list):
+        labels, pnl, _ = first_touch(opens, highs, lows, target_pct, stop_pct, hold_days)
+        n = len(labels)
+        valid = np.flatnonzero(local[:n] < lengths[sym_id[:n]] - hold_days - 1)
+
+        # Sort candidates by probability; "prob >= t" is then a suffix
+        order = np.argsort(prob[valid], kind="stable")
+        p_sorted = prob[valid][order]
+        cum_pnl  = np.concatenate(([0.0], np.cumsum(pnl[valid][order])))
+        cum_wins = np.concatenate(([0], np.cumsum(labels[valid][order])))
+
+        first = np.searchsorted(p_sorted, thresholds, side="left")
+        trades = len(p_sorted) - first
+        wins = cum_wins[-1] - cum_wins[first]
+        total = cum_pnl[-1] - cum_pnl[first]
+
+        for t, k, w, r in zip(thresholds, trades, wins, total):
+            rows.append({
+                "threshold": float(t),
+                "target_pct": target_pct,
+                "stop_pct": stop_pct,
+                "hold_days": hold_days,
+                "trades": int(k),
+                "wins": int(w),
+                "win_rate": w / k if k else 0.0,
+                "total_return": float(r),
+                "avg_return": float(r / k) if k else 0.0,
+            })
+
+    return pd.DataFrame(rows, columns=SWEEP_COLS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep signal threshold and trade parameters")
+    parser.add_argument("--thresholds", type=float, nargs="+",
+                        default=[round(t, 2) for t in np.arange(0.50, 0.91, 0.05)])
+    parser.add_argument("--targets", type=float, nargs="+", default=[TARGET_PCT])
+    parser.add_argument("--stops", type=float, nargs="+", default=[STOP_PCT])
+    parser.add_argument("--holds", type=int, nargs="+", default=[HOLD_DAYS])
+    parser.add_argument("--out", default="sweep_results.csv", help="CSV file for the results table")
+    metrics.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    frames, probs = load_predictions()
+    with metrics.timer("sweep"):
+        results = sweep(frames, probs, args.thresholds, args.targets, args.stops, args.holds)
+    results.to_csv(args.out, index=False)
+
+    logger.info("Evaluated %d combinations → %s", len(results), args.out)
+    best = results.sort_values("total_return", ascending=False).head(10)
+    print(best.to_string(index=False))
+    if args.profile:
+        metrics.dump_profile(args.profile)
+
+
+if __name__ == "__main__":
+    main()
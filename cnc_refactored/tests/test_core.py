@@ -63,6 +63,145 @@ class TestSimulateTrade:
         assert pnl == 0.0
 
 
+class TestFirstTouch:
+    def _random_ohlcv(self, n=400, seed=0):
+        rng = np.random.default_rng(seed)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        df = make_ohlcv(n)
+        df["Open"]  = close * (1 + rng.normal(0, 0.005, n))
+        df["High"]  = np.maximum(df["Open"], close) * (1 + rng.uniform(0, 0.03, n))
+        df["Low"]   = np.minimum(df["Open"], close) * (1 - rng.uniform(0, 0.03, n))
+        df["Close"] = close
+        return df
+
+    def test_matches_scalar_simulation(self):
+        """Vectorised labels/pnl must equal the per-bar simulate_trade loop exactly."""
+        from trade_utils import simulate_trade, simulate_trades
+        from config import HOLD_DAYS
+        df = self._random_ohlcv()
+        labels, pnl = simulate_trades(df)
+        expected = [simulate_trade(df, i) for i in range(len(df) - HOLD_DAYS - 1)]
+        assert labels.tolist() == [e[0] for e in expected]
+        assert pnl.tolist() == [e[1] for e in expected]
+
+    def test_stop_wins_same_bar_tie(self):
+        """Stop and target touched on the same bar → counted as a stop."""
+        from trade_utils import simulate_trades
+        from config import STOP_PCT
+        df = make_ohlcv(20, close=100.0)
+        df["Low"] = 99.0
+        df["High"] = 101.0
+        df.loc[df.index[2], ["High", "Low"]] = [200.0, 1.0]
+        labels, pnl = simulate_trades(df)
+        assert labels[0] == 0
+        assert pnl[0] == -STOP_PCT
+
+    def test_exit_offsets(self):
+        from trade_utils import first_touch
+        from config import HOLD_DAYS
+        df = make_ohlcv(20, close=100.0)
+        df["Low"] = 99.0
+        df["High"] = 101.0
+        df.loc[df.index[3], "High"] = 200.0
+        _, _, exits = first_touch(df["Open"].values, df["High"].values, df["Low"].values)
+        assert exits[0] == 3       # target on bar 3
+        assert exits[10] == HOLD_DAYS  # expired
+
+
+# ── backtest_engine ────────────────────────────────────────────────────────────
+
+class TestBacktestEngine:
+    def test_matches_per_bar_loop(self):
+        """Engine totals must equal the old per-bar simulate_trade loop, per symbol."""
+        from trade_utils import simulate_trade
+        from backtest_engine import backtest_frames
+        from config import HOLD_DAYS
+        rng = np.random.default_rng(1)
+        frames, probs = {}, {}
+        for k, sym in enumerate(["AAA", "BBB", "CCC"]):
+            df = TestFirstTouch()._random_ohlcv(150 + 40 * k, seed=k)
+            frames[sym] = df
+            probs[sym] = rng.uniform(0, 1, len(df))
+
+        result = backtest_frames(frames, probs, 0.6)
+
+        for stats in result.per_symbol:
+            df, p = frames[stats.symbol], probs[stats.symbol]
+            outcomes = [simulate_trade(df, i) for i in range(len(df) - HOLD_DAYS - 1) if p[i] >= 0.6]
+            assert stats.trades == len(outcomes)
+            assert stats.wins == sum(o[0] for o in outcomes)
+            assert stats.total_return == pytest.approx(sum(o[1] for o in outcomes))
+        assert result.summary.trades == sum(s.trades for s in result.per_symbol)
+
+    def test_drawdown_and_exposure(self):
+        from backtest_engine import run_backtest
+        from config import STOP_PCT
+        df = make_ohlcv(30, close=100.0)
+        df["Low"] = 99.0
+        df["High"] = 101.0
+        df.loc[df.index[2], "Low"] = 1.0      # signal at bar 0 stops out on bar 2
+        probs = np.zeros(len(df))
+        probs[0] = 1.0
+        result = run_backtest(["X"], [probs], [df["Open"].values], [df["High"].values],
+                              [df["Low"].values], threshold=0.5)
+        stats = result.per_symbol[0]
+        assert stats.trades == 1
+        assert stats.max_drawdown == pytest.approx(STOP_PCT)
+        assert stats.exposure == pytest.approx(2 / len(df))
+
+    def test_empty_input(self):
+        from backtest_engine import run_backtest
+        result = run_backtest([], [], [], [], [], threshold=0.5)
+        assert result.summary.trades == 0
+
+
+# ── sweep ──────────────────────────────────────────────────────────────────────
+
+class TestSweep:
+    def test_rows_match_run_backtest(self):
+        """Every grid row must equal a standalone backtest with the same parameters."""
+        from sweep import sweep
+        from backtest_engine import backtest_frames
+        rng = np.random.default_rng(3)
+        frames = {s: TestFirstTouch()._random_ohlcv(200, seed=k) for k, s in enumerate(["A", "B"])}
+        probs = {s: rng.uniform(0, 1, len(df)) for s, df in frames.items()}
+
+        table = sweep(frames, probs, [0.3, 0.6, 0.9], [0.02, 0.04], [0.01, 0.03], [3, 7])
+        assert len(table) == 3 * 2 * 2 * 2
+
+        for row in table.sample(6, random_state=0).itertuples():
+            ref = backtest_frames(frames, probs, row.threshold, target_pct=row.target_pct,
+                                  stop_pct=row.stop_pct, hold_days=row.hold_days).summary
+            assert row.trades == ref.trades
+            assert row.wins == ref.wins
+            assert row.total_return == pytest.approx(ref.total_return)
+
+
+    def test_default_row_matches_backtest_script(self):
+        """load_predictions builds backtest.py's frames, so the config row reproduces its result."""
+        from sweep import sweep
+        from backtest import load_predictions
+        from backtest_engine import backtest_frames
+        from config import SIGNAL_THRESHOLD, TARGET_PCT, STOP_PCT, HOLD_DAYS
+
+        class RsiModel:
+            def predict_proba(self, X):
+                p = X["rsi"].to_numpy() / 100
+                return np.column_stack([1 - p, p])
+
+        raw = {s: TestFirstTouch()._random_ohlcv(200, seed=k) for k, s in enumerate(["A", "B"])}
+        with patch("backtest.fetch_data", raw.get):
+            frames, probs = load_predictions(RsiModel(), list(raw), panel_store=None)
+        assert "label" in frames["A"] and len(probs["A"]) == len(frames["A"])
+
+        table = sweep(frames, probs, [SIGNAL_THRESHOLD])
+        [row] = table.itertuples()
+        assert (row.target_pct, row.stop_pct, row.hold_days) == (TARGET_PCT, STOP_PCT, HOLD_DAYS)
+        ref = backtest_frames(frames, probs, SIGNAL_THRESHOLD).summary
+        assert ref.trades > 0
+        assert (row.trades, row.wins) == (ref.trades, ref.wins)
+        assert row.total_return == pytest.approx(ref.total_return)
+
 # ── labeling ───────────────────────────────────────────────────────────────────
 
 class TestCreateLabels:
@@ -127,3 +266,1092 @@ class TestAddFeatures:
         df = make_ohlcv(100)
         result = add_features(df)
         assert result[FEATURE_COLS].isna().sum().sum() == 0
+
+
+# ── data_utils / data_cache ────────────────────────────────────────────────────
+
+class CountingSource:
+    """LocalSource wrapper that records every fetch call."""
+
+    def __init__(self, directory):
+        from data_utils import LocalSource
+        self.inner = LocalSource(directory)
+        self.calls = []
+
+    def fetch(self, symbol, start, end):
+        self.calls.append((symbol, start, end))
+        return self.inner.fetch(symbol, start, end)
+
+
+class TestFetchDataCache:
+    def _setup(self, tmp_path, n=100):
+        from data_cache import OHLCVCache
+        src_dir = tmp_path / "src"
+        src_dir.mkdir()
+        df = make_ohlcv(n)
+        df.to_csv(src_dir / "TEST.csv")
+        return df, CountingSource(str(src_dir)), OHLCVCache(str(tmp_path / "cache"))
+
+    def test_second_read_served_from_cache(self, tmp_path):
+        from data_utils import fetch_data
+        df, source, cache = self._setup(tmp_path)
+        first = fetch_data("TEST", "2020-01-01", "2021-01-01", source=source, cache=cache)
+        second = fetch_data("TEST", "2020-01-01", "2021-01-01", source=source, cache=cache)
+        assert len(source.calls) == 1
+        assert len(first) == len(second) == len(df)
+        assert np.allclose(second["Close"].values, df["Close"].values)
+
+    def test_stale_cache_fetches_only_tail(self, tmp_path):
+        from data_utils import fetch_data
+        df, source, cache = self._setup(tmp_path)
+        # Seed the cache with the first 60 bars, covering only up to bar 60
+        cache.write("TEST", df.iloc[:60], "2020-01-01", df.index[60])
+        cache.max_age_hours = 0
+        result = fetch_data("TEST", "2020-01-01", "2021-01-01", source=source, cache=cache)
+        assert len(result) == len(df)
+        assert len(source.calls) == 1
+        assert source.calls[0][1] == df.index[59]
+
+    def test_earlier_start_triggers_full_fetch(self, tmp_path):
+        from data_utils import fetch_data
+        df, source, cache = self._setup(tmp_path)
+        cache.write("TEST", df.iloc[20:], df.index[20], "2021-01-01")
+        result = fetch_data("TEST", "2020-01-01", "2021-01-01", source=source, cache=cache)
+        assert len(result) == len(df)
+        assert len(source.calls) == 1
+
+    def test_missing_symbol_returns_none(self, tmp_path):
+        from data_utils import fetch_data
+        _, source, cache = self._setup(tmp_path)
+        assert fetch_data("NOPE", source=source, cache=cache) is None
+
+
+class FlakySource:
+    """Fake network source with injected latency and failures."""
+
+    def __init__(self, latency=0.0, failures=None, latencies=None):
+        import threading
+        self.latency = latency
+        self.latencies = latencies or {}
+        self.failures = dict(failures or {})    # symbol -> failures before success (-1: always)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def fetch(self, symbol, start, end):
+        import time
+        with self._lock:
+            self.calls.append(symbol)
+            left = self.failures.get(symbol, 0)
+            if left > 0:
+                self.failures[symbol] = left - 1
+        time.sleep(self.latencies.get(symbol, self.latency))
+        if left:
+            raise ConnectionError(f"injected failure for {symbol}")
+        return make_ohlcv(30)
+
+
+class TestFetchMany:
+    def _fetch(self, source, symbols, **kwargs):
+        from data_utils import fetch_many
+        kwargs = {"start": "2020-01-01", "end": "2021-01-01", "use_cache": False,
+                  "rate": 0, "backoff": 0.0, **kwargs}
+        return list(fetch_many(symbols, source=source, **kwargs))
+
+    def test_retries_then_reports_partial_failures(self):
+        source = FlakySource(failures={"B": 2, "C": -1})
+        results = {r.symbol: r for r in self._fetch(source, ["A", "B", "C"], retries=3)}
+        assert results["A"].ok and results["A"].attempts == 1
+        assert results["B"].ok and results["B"].attempts == 3
+        assert not results["C"].ok and results["C"].attempts == 4
+        assert "ConnectionError" in results["C"].error
+
+    def test_yahoo_empty_download_is_retried(self):
+        import yfinance
+        from data_utils import YahooSource
+        calls = []
+
+        def download(symbol, **kwargs):
+            calls.append(symbol)
+            # yfinance logs network errors and returns an empty frame instead of raising
+            return make_ohlcv(30) if symbol == "A" and len(calls) == 3 else pd.DataFrame()
+
+        with patch.object(yfinance, "download", download):
+            [ok] = self._fetch(YahooSource(), ["A"], retries=3)
+            calls.clear()
+            [down] = self._fetch(YahooSource(), ["B"], retries=2)
+        assert ok.ok and ok.attempts == 3
+        assert not down.ok and down.attempts == 3 and "DownloadError" in down.error
+
+    def test_cache_hit_reports_no_attempts(self, tmp_path):
+        from data_cache import OHLCVCache
+        cache = OHLCVCache(str(tmp_path / "cache"))
+        cache.write("A", make_ohlcv(30), "2020-01-01", "2021-01-01")
+        source = FlakySource(failures={"BAD": -1})
+        results = self._fetch(source, ["BAD", "A"], retries=3, workers=1, max_in_flight=1,
+                              cache=cache, use_cache=True)
+        assert [(r.symbol, r.attempts) for r in results] == [("BAD", 4), ("A", 0)]
+        assert results[1].ok and source.calls == ["BAD"] * 4
+
+    def test_throttled_fetch_retries_for_pipeline(self):
+        from data_utils import throttled_fetch
+        from pipeline import process_universe
+        source = FlakySource(failures={"B": 2, "C": -1})
+        fetch = throttled_fetch("2020-01-01", "2021-01-01", source=source, use_cache=False,
+                                rate=0, retries=3, backoff=0.0)
+        out = dict(process_universe(["A", "B", "C"], fetch=fetch, cpu_workers=1, feature_store=None))
+        assert fetch("B") is not None and source.calls.count("B") == 4
+        assert out["C"] is None and source.calls.count("C") == 4
+
+    def test_missing_file_is_not_retried(self, tmp_path):
+        from data_utils import LocalSource
+        [result] = self._fetch(LocalSource(str(tmp_path)), ["NOPE"], retries=3)
+        assert not result.ok and result.attempts == 1 and "FileNotFoundError" in result.error
+
+    def test_concurrent_and_streamed_in_completion_order(self):
+        import time
+        source = FlakySource(latency=0.05, latencies={"SLOW": 0.3})
+        symbols = ["SLOW"] + [f"S{k}" for k in range(15)]
+        t0 = time.perf_counter()
+        results = self._fetch(source, symbols, workers=8)
+        elapsed = time.perf_counter() - t0
+        assert sorted(r.symbol for r in results) == sorted(symbols)
+        assert results[-1].symbol == "SLOW"
+        assert elapsed < 0.6                 # sequential would take 1.05s
+
+    def test_token_bucket_spaces_requests(self):
+        from data_utils import TokenBucket
+        now = [0.0]
+        waits = []
+
+        def sleep(s):
+            waits.append(s)
+            now[0] += s
+
+        bucket = TokenBucket(rate=10, burst=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(5):
+            bucket.acquire()
+        assert waits == pytest.approx([0.1, 0.1, 0.1])
+        assert now[0] == pytest.approx(0.3)     # 5 requests: burst of 2, then 10/s
+
+
+# ── pipeline ───────────────────────────────────────────────────────────────────
+
+class TestProcessUniverse:
+    @staticmethod
+    def _fetch(symbol):
+        import time
+        if symbol == "BAD":
+            raise RuntimeError("boom")
+        if symbol == "NONE":
+            return None
+        # Later symbols finish first, to check ordering
+        time.sleep(0.01 * (5 - int(symbol[-1])))
+        return TestFirstTouch()._random_ohlcv(120, seed=int(symbol[-1]))
+
+    def test_order_and_failure_isolation(self):
+        from pipeline import process_universe
+        symbols = ["S1", "BAD", "S2", "NONE", "S3", "S4"]
+        out = list(process_universe(symbols, fetch=self._fetch, fetch_workers=4,
+                                    cpu_workers=1, max_in_flight=3, feature_store=None))
+        assert [s for s, _ in out] == symbols
+        assert out[1][1] is None and out[3][1] is None
+        for sym, df in out:
+            if df is not None:
+                assert (df["symbol"] == sym).all()
+                assert "label" in df.columns
+
+    def test_process_pool_matches_inline(self):
+        from pipeline import process_universe
+        symbols = ["S1", "S2", "S3"]
+        inline = dict(process_universe(symbols, fetch=self._fetch, cpu_workers=1, feature_store=None))
+        pooled = dict(process_universe(symbols, fetch=self._fetch, cpu_workers=2, feature_store=None))
+        for sym in symbols:
+            pd.testing.assert_frame_equal(inline[sym], pooled[sym])
+
+
+# ── feature_store ──────────────────────────────────────────────────────────────
+
+class TestFeatureStore:
+    def _build_counting(self, calls):
+        from pipeline import _build
+
+        def build(raw):
+            calls.append(len(raw))
+            return _build(raw)
+        return build
+
+    def test_hit_skips_build_and_matches(self, tmp_path):
+        from feature_store import FeatureStore, STORED_COLS
+        store = FeatureStore(str(tmp_path))
+        raw = TestFirstTouch()._random_ohlcv(200, seed=7)
+        calls = []
+        first = store.load_or_build("X", raw, self._build_counting(calls))
+        second = store.load_or_build("X", raw, self._build_counting(calls))
+        assert len(calls) == 1
+        np.testing.assert_array_equal(first[STORED_COLS].values, second[STORED_COLS].values)
+        np.testing.assert_array_equal(first["label"].values, second["label"].values)
+        assert (first.index == second.index).all()
+
+    def test_changed_data_or_params_invalidate(self, tmp_path):
+        import os
+        from feature_store import FeatureStore, store_key
+        store = FeatureStore(str(tmp_path))
+        raw = TestFirstTouch()._random_ohlcv(200, seed=7)
+        calls = []
+        store.load_or_build("X", raw, self._build_counting(calls))
+        changed = raw.copy()
+        changed.iloc[-1, changed.columns.get_loc("Close")] *= 1.01
+        store.load_or_build("X", changed, self._build_counting(calls))
+        assert len(calls) == 2
+        assert len(os.listdir(tmp_path / "X")) == 1   # stale entry removed
+        assert store_key(raw) != store_key(raw, hold_days=7)
+
+
+# ── streaming_features ─────────────────────────────────────────────────────────
+
+class TestIncrementalFeatures:
+    def test_matches_batch_add_features(self):
+        from features import add_features
+        from streaming_features import IncrementalFeatureEngine
+        df = TestFirstTouch()._random_ohlcv(300, seed=5)
+        df["Volume"] = np.random.default_rng(5).integers(100_000, 1_000_000, len(df)).astype(float)
+        batch = add_features(df)
+
+        engine = IncrementalFeatureEngine()
+        rows = {}
+        for ts, bar in df.iterrows():
+            out = engine.update("X", bar, ts)
+            if out is not None:
+                rows[ts] = out
+        stream = pd.DataFrame.from_dict(rows, orient="index")
+
+        assert list(stream.index) == list(batch.index)
+        for col in ["ema20", "ema50", "atr", "rsi", "close_ema20_ratio",
+                    "ema20_ema50_diff", "atr_pct", "vol_ratio"]:
+            np.testing.assert_allclose(stream[col], batch[col], rtol=1e-9, err_msg=col)
+
+    def test_matches_featurise_for_every_feature_column(self):
+        """Windows and warm-ups come from the registry, so each column (alone or together) matches featurise."""
+        from config import FEATURE_COLS
+        from panel_features import featurise
+        from streaming_features import IncrementalFeatureEngine
+        df = TestFirstTouch()._random_ohlcv(250, seed=7)
+        df["Volume"] = np.random.default_rng(7).integers(100_000, 1_000_000, len(df)).astype(float)
+
+        for columns in [FEATURE_COLS, ["ret20"], *([c] for c in FEATURE_COLS)]:
+            batch = featurise({"X": df}, columns)["X"]
+            engine = IncrementalFeatureEngine(columns)
+            rows = {}
+            for ts, bar in df.iterrows():
+                out = engine.update("X", bar, ts)
+                if out is not None:
+                    rows[ts] = out
+            stream = pd.DataFrame.from_dict(rows, orient="index")
+            assert list(stream.index) == list(batch.index), columns
+            for name in stream.columns:
+                np.testing.assert_allclose(stream[name], batch[name], rtol=1e-9, err_msg=name)
+
+    def test_rejects_cross_sectional_columns(self):
+        from streaming_features import IncrementalFeatureEngine
+        with pytest.raises(ValueError, match="rsi_rank"):
+            IncrementalFeatureEngine(["rsi", "rsi_rank"])
+
+    def test_snapshot_restore_continues_identically(self):
+        from streaming_features import IncrementalFeatureEngine
+        df = TestFirstTouch()._random_ohlcv(200, seed=6)
+        full = IncrementalFeatureEngine()
+        expected = full.update_from_frame("X", df)
+
+        part = IncrementalFeatureEngine()
+        part.update_from_frame("X", df.iloc[:150])
+        resumed = IncrementalFeatureEngine()
+        resumed.restore(part.snapshot())
+        got = resumed.update_from_frame("X", df)   # overlapping bars are skipped
+        assert got == pytest.approx(expected)
+
+    def test_warmup_returns_none(self):
+        from streaming_features import IncrementalFeatureEngine
+        engine = IncrementalFeatureEngine()
+        assert engine.update_from_frame("X", make_ohlcv(30)) is None
+
+
+# ── model_registry ─────────────────────────────────────────────────────────────
+
+class TestModelRegistry:
+    @staticmethod
+    def _loader(path):
+        with open(path) as f:
+            return f.read()
+
+    def test_loads_once_and_hot_swaps(self, tmp_path):
+        import os
+        from model_registry import ModelRegistry
+        path = tmp_path / "m.pkl"
+        path.write_text("v1")
+        calls = []
+        reg = ModelRegistry(check_interval=0, loader=lambda p: calls.append(p) or self._loader(p))
+        reg.register("default", str(path))
+
+        assert reg.get() == "v1"
+        assert reg.get() == "v1"
+        assert len(calls) == 1
+        v1 = reg.info()["version"]
+
+        path.write_text("v2!")
+        os.utime(path, (os.path.getmtime(path) + 5,) * 2)
+        assert reg.get() == "v2!"
+        assert reg.info()["version"] != v1
+
+    def test_named_versions_side_by_side(self, tmp_path):
+        from model_registry import ModelRegistry
+        (tmp_path / "a").write_text("A")
+        (tmp_path / "b").write_text("B")
+        reg = ModelRegistry(loader=self._loader)
+        reg.register("default", str(tmp_path / "a"))
+        reg.register("challenger", str(tmp_path / "b"))
+        assert (reg.get(), reg.get("challenger")) == ("A", "B")
+        assert {v["name"] for v in reg.versions()} == {"default", "challenger"}
+
+    def test_missing_file_raises(self, tmp_path):
+        from model_registry import ModelRegistry
+        reg = ModelRegistry()
+        reg.register("default", str(tmp_path / "missing.pkl"))
+        with pytest.raises(FileNotFoundError):
+            reg.get()
+
+
+# ── scoring ────────────────────────────────────────────────────────────────────
+
+def make_model(n_estimators: int = 20):
+    """Small XGBClassifier fitted on random FEATURE_COLS data."""
+    from xgboost import XGBClassifier
+    from config import FEATURE_COLS
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, len(FEATURE_COLS))), columns=FEATURE_COLS)
+    y = (X.iloc[:, 0] + rng.normal(scale=0.5, size=300) > 0).astype(int)
+    return XGBClassifier(n_estimators=n_estimators, max_depth=3).fit(X, y)
+
+
+class TestScoreUniverse:
+    def test_batched_matches_per_symbol_predict_proba(self):
+        from features import add_features
+        from scoring import score_universe
+        from config import FEATURE_COLS
+        model = make_model()
+        frames = {f"S{k}": add_features(TestFirstTouch()._random_ohlcv(120, seed=k)) for k in range(6)}
+
+        table = score_universe(model, frames, threshold=0.5)
+
+        assert list(table["probability"]) == sorted(table["probability"], reverse=True)
+        for row in table.itertuples():
+            expected = model.predict_proba(frames[row.symbol].iloc[-1:][FEATURE_COLS])[:, 1][0]
+            assert row.probability == pytest.approx(expected, abs=1e-6)
+            assert row.signal == ("BUY" if row.probability >= 0.5 else "HOLD")
+
+    def test_empty_universe(self):
+        from scoring import score_universe
+        assert len(score_universe(make_model(), {})) == 0
+
+
+# ── jobs ───────────────────────────────────────────────────────────────────────
+
+class TestJobManager:
+    def test_runs_and_reports_progress(self):
+        from jobs import JobManager, DONE
+
+        def work(reporter, n):
+            for k in range(n):
+                reporter.symbol(f"S{k}", "done")
+                reporter.progress((k + 1) / n, f"step {k}")
+            return {"n": n}
+
+        mgr = JobManager(max_workers=2)
+        job = mgr.wait(mgr.submit("demo", work, n=3).id, timeout=5)
+        assert job.status == DONE
+        assert job.result == {"n": 3}
+        assert job.to_dict()["symbols"] == {"S0": "done", "S1": "done", "S2": "done"}
+        assert job.progress == 1.0
+
+    def test_identical_in_flight_jobs_are_deduplicated(self):
+        import threading
+        from jobs import JobManager
+        gate = threading.Event()
+        mgr = JobManager(max_workers=2)
+        first = mgr.submit("slow", lambda r: gate.wait(5), key="same")
+        second = mgr.submit("slow", lambda r: gate.wait(5), key="same")
+        assert first.id == second.id
+        gate.set()
+        mgr.wait(first.id, timeout=5)
+        third = mgr.submit("slow", lambda r: None, key="same")
+        assert third.id != first.id
+
+    def test_failure_is_captured(self):
+        from jobs import JobManager, FAILED
+
+        def boom(reporter):
+            raise ValueError("bad input")
+
+        mgr = JobManager(max_workers=1)
+        job = mgr.wait(mgr.submit("boom", boom).id, timeout=5)
+        assert job.status == FAILED
+        assert "bad input" in job.error
+
+
+# ── walk_forward ───────────────────────────────────────────────────────────────
+
+def make_panel(n_symbols: int = 3, n: int = 400) -> pd.DataFrame:
+    """prepare_data-shaped panel built from synthetic OHLCV (no network)."""
+    from pipeline import engineer
+    frames = [engineer(f"S{k}", TestFirstTouch()._random_ohlcv(n, seed=k)) for k in range(n_symbols)]
+    return pd.concat(frames).sort_index(kind="stable")
+
+
+class TestWalkForward:
+    def test_folds_are_ordered_with_embargo(self):
+        from walk_forward import make_folds
+        from config import HOLD_DAYS
+        dates = pd.bdate_range("2020-01-01", "2021-06-30")
+        folds = make_folds(dates, start="2021-01-01", freq="MS", window="rolling", train_years=1)
+        assert len(folds) == 6
+        for prev, nxt in zip(folds, folds[1:]):
+            assert prev.test_end == nxt.test_start
+        for f in folds:
+            assert f.train_end <= f.test_start - pd.tseries.offsets.BDay(HOLD_DAYS + 1)
+            assert f.train_start >= f.test_start - pd.DateOffset(years=1)
+
+    def test_warm_and_cold_cover_same_oos_rows(self):
+        from walk_forward import make_folds, walk_forward, backtest_predictions
+        panel = make_panel()
+        folds = make_folds(panel.index, start="2021-01-01", freq="MS")
+        params = {"max_depth": 2, "n_estimators": 10, "learning_rate": 0.1}
+
+        warm = walk_forward(panel, folds, warm_start=True, params=params, warm_trees=5)
+        cold = walk_forward(panel, folds, warm_start=False, workers=2, params=params)
+
+        assert len(warm) == len(cold) == (panel.index >= "2021-01-01").sum()
+        assert warm["prob"].between(0, 1).all()
+        assert (warm.index >= pd.Timestamp("2021-01-01")).all()
+        result = backtest_predictions(panel, warm, threshold=0.5)
+        assert result.summary.bars == len(warm)
+
+
+# ── training_data ──────────────────────────────────────────────────────────────
+
+class TestTrainingPanel:
+    def _items(self):
+        from pipeline import engineer
+        return [(f"S{k}", engineer(f"S{k}", TestFirstTouch()._random_ohlcv(300, seed=k))) for k in range(3)]
+
+    def test_panel_is_compact_and_aligned(self):
+        from training_data import build_panel
+        from config import FEATURE_COLS
+        items = self._items() + [("MISSING", None)]
+        panel = build_panel(items)
+        assert panel.X.dtype == np.float32 and panel.X.flags["C_CONTIGUOUS"]
+        assert panel.y.dtype == np.int8
+        assert panel.symbols == ["S0", "S1", "S2"]
+        assert len(panel) == sum(len(df) for _, df in items if df is not None)
+        first = items[0][1]
+        np.testing.assert_allclose(panel.X[:len(first)], first[FEATURE_COLS].to_numpy(np.float32))
+        assert (panel.symbol_codes[:len(first)] == 0).all()
+
+    def test_between_bounds(self):
+        from training_data import build_panel
+        panel = build_panel(self._items())
+        cut = pd.Timestamp(panel.dates[len(panel) // 6])
+        before, after = panel.between(until=cut), panel.between(after=cut)
+        assert len(before) + len(after) == len(panel)
+        assert (before.dates <= np.datetime64(cut)).all()
+
+    def test_in_memory_and_external_memory_fit(self, tmp_path):
+        from training_data import build_panel, spill_chunks, load_chunk, external_dmatrix, fit_classifier
+        params = {"max_depth": 2, "n_estimators": 10, "learning_rate": 0.1}
+        items = self._items()
+        panel = build_panel(items)
+
+        model = fit_classifier(panel.quantile_dmatrix(), params)
+        probs = model.predict_proba(panel.X)[:, 1]
+        assert probs.shape == (len(panel),) and ((probs >= 0) & (probs <= 1)).all()
+
+        prefixes = spill_chunks(items, str(tmp_path))
+        X, y = load_chunk(prefixes[0])
+        assert len(y) == len(items[0][1])
+        ext = fit_classifier(external_dmatrix(prefixes), params)
+        assert ext.get_booster().num_boosted_rounds() == 10
+        assert ext.predict_proba(X).shape == (len(y), 2)
+
+
+# ── bench ──────────────────────────────────────────────────────────────────────
+
+class TestBench:
+    def test_runs_selected_stages_offline(self, tmp_path):
+        from bench import run_benchmarks, save_results
+        params = {"max_depth": 2, "n_estimators": 5}
+        results = run_benchmarks(n_symbols=2, years=1, repeat=1, stages=["labels", "backtest"], params=params)
+        assert set(results["stages"]) == {"labels", "backtest"}
+        for r in results["stages"].values():
+            assert r["seconds"] > 0 and r["peak_mb"] >= 0
+        path = save_results(results, str(tmp_path))
+        assert os.path.exists(path)
+
+    def test_compare_flags_regressions(self):
+        from bench import compare
+        base = {"params": {}, "stages": {"a": {"seconds": 1.0, "peak_mb": 10.0},
+                                          "b": {"seconds": 1.0, "peak_mb": 10.0}}}
+        cur = {"params": {}, "stages": {"a": {"seconds": 1.1, "peak_mb": 10.0},
+                                         "b": {"seconds": 2.0, "peak_mb": 30.0}}}
+        table = compare(cur, base, tolerance=0.25)
+        assert table.loc["b", "regression"] and not table.loc["a", "regression"]
+        assert table.loc["b", "mem_ratio"] == pytest.approx(3.0)
+
+
+# ── metrics ────────────────────────────────────────────────────────────────────
+
+class TestMetrics:
+    def test_timer_records_symbol_breakdown(self):
+        import metrics
+        from features import add_features
+        metrics.REGISTRY.reset()
+        with metrics.symbol_scope("AAA"):
+            add_features(make_ohlcv(80))
+        add_features(make_ohlcv(80))
+        series = metrics.REGISTRY.snapshot()[metrics.STAGE_SECONDS]["series"]
+        labels = sorted(tuple(sorted(s["labels"].items())) for s in series)
+        assert labels == [(("stage", "add_features"),), (("stage", "add_features"), ("symbol", "AAA"))]
+        assert metrics.profile()["stages"]["add_features"]["calls"] == 2
+
+    def test_prometheus_histogram_is_cumulative(self):
+        from metrics import MetricsRegistry
+        reg = MetricsRegistry()
+        for v in (0.002, 0.02, 5.0):
+            reg.observe("lat_seconds", v, "Latency", route="/x")
+        reg.inc("hits_total", 3, route="/x")
+        text = reg.render()
+        assert '# TYPE lat_seconds histogram' in text
+        assert 'lat_seconds_bucket{route="/x",le="0.005"} 1' in text
+        assert 'lat_seconds_bucket{route="/x",le="0.025"} 2' in text
+        assert 'lat_seconds_bucket{route="/x",le="+Inf"} 3' in text
+        assert 'lat_seconds_count{route="/x"} 3' in text
+        assert 'hits_total{route="/x"} 3' in text
+
+    def test_cache_hit_rate_and_metrics_endpoint(self, tmp_path):
+        import metrics
+        import server
+        from data_cache import OHLCVCache
+        from data_utils import fetch_data, LocalSource
+        metrics.REGISTRY.reset()
+        make_ohlcv(60).to_csv(tmp_path / "AAA.csv")
+        cache = OHLCVCache(str(tmp_path / "cache"))
+        for _ in range(4):
+            fetch_data("AAA", "2020-01-01", "2020-03-01", source=LocalSource(str(tmp_path)), cache=cache)
+        assert metrics.profile()["cache_hit_rate"] == pytest.approx(0.75)
+
+        resp = server.app.test_client().get("/api/metrics")
+        assert resp.status_code == 200 and resp.mimetype == "text/plain"
+        body = resp.get_data(as_text=True)
+        assert 'cnc_cache_requests_total{result="hit"} 3' in body
+        assert 'cnc_stage_seconds_count{stage="fetch",symbol="AAA"} 4' in body
+
+
+# ── response_cache ─────────────────────────────────────────────────────────────
+
+class TestResponseCache:
+    def test_ttl_and_lru(self):
+        from response_cache import ResponseCache
+        now = [0.0]
+        cache = ResponseCache(ttl=10, max_entries=2, clock=lambda: now[0])
+        calls = []
+        compute = lambda v: (lambda: calls.append(v) or {"v": v})
+
+        entry, hit = cache.get_or_compute("a", compute(1))
+        assert not hit and entry.payload == {"v": 1}
+        assert cache.get_or_compute("a", compute(2)) == (entry, True)
+        cache.put("b", {"v": 2})
+        cache.get("a")                      # a is now most recently used
+        cache.put("c", {"v": 3})            # evicts b
+        assert cache.get("b") is None and cache.get("a") is not None
+        now[0] = 11
+        assert cache.get("a") is None       # expired
+        assert calls == [1]
+
+    def test_bar_date_skips_weekends(self):
+        from response_cache import current_bar_date
+        assert current_bar_date(pd.Timestamp("2024-06-08 15:00")) == "2024-06-07"   # Saturday
+        assert current_bar_date(pd.Timestamp("2024-06-10 09:00")) == "2024-06-10"   # Monday
+
+    def test_server_etag_and_model_invalidation(self, tmp_path):
+        import joblib
+        import server
+        import live_window
+        path = tmp_path / "model.pkl"
+        joblib.dump(make_model(), path)
+        server.models.register("cachetest", str(path))
+        server.responses.clear()
+        frames = {"AAA": TestFirstTouch()._random_ohlcv(200, seed=1)}
+        fetches = []
+
+        def fake_fetch(symbol, *args, **kwargs):
+            fetches.append(symbol)
+            return frames.get(symbol)
+
+        client = server.app.test_client()
+        def fake_many(symbols, *args, **kwargs):
+            from data_utils import FetchResult
+            for s in symbols:
+                df = fake_fetch(s)
+                yield FetchResult(s, df, None if df is not None else "No data", 1, 0.0)
+
+        with patch.object(server, "STOCK_LIST", ["AAA"]), patch.object(server, "fetch_data", fake_fetch), \
+             patch.object(live_window, "fetch_many", fake_many):
+            first = client.get("/api/signals?model=cachetest")
+            assert first.status_code == 200 and first.headers["X-Cache"] == "MISS"
+            etag = first.headers["ETag"]
+
+            second = client.get("/api/signals?model=cachetest")
+            assert second.headers["X-Cache"] == "HIT" and second.get_json() == first.get_json()
+            not_modified = client.get("/api/signals?model=cachetest", headers={"If-None-Match": etag})
+            assert not_modified.status_code == 304
+            assert fetches == ["AAA"]
+
+            # A new model file means a new version, hence a new key
+            joblib.dump(make_model(n_estimators=5), path)
+            server.models.reload("cachetest")
+            third = client.get("/api/signals?model=cachetest")
+            assert third.headers["X-Cache"] == "MISS" and fetches == ["AAA", "AAA"]
+
+
+# ── portfolio ──────────────────────────────────────────────────────────────────
+
+class TestPortfolio:
+    def _universe(self, n_symbols=4, n=300):
+        frames = {f"S{k}": TestFirstTouch()._random_ohlcv(n, seed=k) for k in range(n_symbols)}
+        rng = np.random.default_rng(42)
+        probs = {s: rng.uniform(size=n) for s in frames}
+        return frames, probs
+
+    def test_equity_reconciles_with_trades(self):
+        from portfolio import simulate_frames
+        frames, probs = self._universe()
+        result = simulate_frames(frames, probs, 0.7, cost_bps=0, slippage_bps=0)
+        trades = result.trades
+        assert len(trades) > 0
+        assert result.equity.iloc[-1] == pytest.approx(result.initial_capital + trades["pnl"].sum())
+        np.testing.assert_allclose(trades["net_return"], trades["gross_return"], atol=1e-12)
+        assert result.stats["exposure"] <= 1.0
+
+    def test_position_limit_and_one_per_symbol(self):
+        from portfolio import simulate_frames
+        frames, probs = self._universe()
+        result = simulate_frames(frames, probs, 0.5, max_positions=2)
+        trades = result.trades
+        assert result.max_concurrent <= 2
+        for day in result.equity.index[::7]:
+            open_ = trades[(trades["entry_date"] <= day) & (trades["exit_date"] > day)]
+            assert len(open_) <= 2
+            assert open_["symbol"].is_unique
+        assert result.skipped_capacity > 0
+
+    def test_same_day_signals_ranked_by_probability(self):
+        from portfolio import simulate_frames
+        frames = {s: make_ohlcv(30) for s in ("LOW", "HIGH")}
+        probs = {"LOW": np.full(30, 0.8), "HIGH": np.full(30, 0.9)}
+        result = simulate_frames(frames, probs, 0.5, max_positions=1)
+        assert (result.trades["symbol"] == "HIGH").all()
+
+    def test_open_positions_marked_to_close(self):
+        """A winner that goes underwater first shows in the equity curve and drawdown."""
+        from portfolio import simulate_frames
+        close = np.array([100, 100, 95, 94, 96, 104, 104, 104, 104, 104], dtype=float)
+        df = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close,
+                           "Volume": 1.0}, index=pd.bdate_range("2024-01-01", periods=len(close)))
+        df.loc[df.index[5], "High"] = 106
+        probs = {"A": np.r_[0.9, np.zeros(len(df) - 1)]}
+        result = simulate_frames({"A": df}, probs, 0.5, target_pct=0.05, stop_pct=0.1, hold_days=5,
+                                 position_size=0.5, cost_bps=0, slippage_bps=0)
+        [trade] = result.trades.itertuples()
+        assert trade.exit_date == df.index[5] and trade.pnl == pytest.approx(trade.allocation * 0.05)
+        expected = result.initial_capital + trade.allocation * np.r_[0, 0, -0.05, -0.06, -0.04, 0, 0, 0, 0, 0]
+        expected[5:] += trade.allocation * 0.05
+        np.testing.assert_allclose(result.equity.to_numpy(), expected)
+        assert result.stats["max_drawdown"] == pytest.approx(trade.allocation * 0.06 / result.initial_capital)
+
+    def test_capital_and_slot_released_together(self):
+        from portfolio import simulate_frames
+        frames, probs = self._universe()
+        result = simulate_frames(frames, probs, 0.5, max_positions=1)
+        trades = result.trades
+        assert len(trades) > 1
+        # One slot: a new entry only after the previous exit day, and invested is that one position
+        assert (trades["entry_date"].iloc[1:].to_numpy() > trades["exit_date"].iloc[:-1].to_numpy()).all()
+        for t in trades.itertuples():
+            held = result.invested[t.entry_date:t.exit_date]
+            np.testing.assert_allclose(held, t.allocation)
+
+    def test_costs_reduce_returns(self):
+        from portfolio import simulate_frames
+        frames, probs = self._universe()
+        free = simulate_frames(frames, probs, 0.7, cost_bps=0, slippage_bps=0)
+        costly = simulate_frames(frames, probs, 0.7, cost_bps=10, slippage_bps=10)
+        assert (costly.trades["net_return"] < costly.trades["gross_return"]).all()
+        assert costly.stats["final_equity"] < free.stats["final_equity"]
+
+
+# ── intraday ───────────────────────────────────────────────────────────────────
+
+def make_minute_bars(days: int = 30, seed: int = 0) -> pd.DataFrame:
+    """Random-walk 1-minute bars, 375 per weekday session (09:15-15:30)."""
+    rng = np.random.default_rng(seed)
+    sessions = pd.bdate_range("2024-01-01", periods=days)
+    idx = pd.DatetimeIndex(np.concatenate([
+        pd.date_range(d + pd.Timedelta("9h15min"), periods=375, freq="min").values for d in sessions
+    ]))
+    n = len(idx)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    open_ = close * (1 + rng.normal(0, 0.0005, n))
+    return pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) * (1 + rng.uniform(0, 0.002, n)),
+        "Low": np.minimum(open_, close) * (1 - rng.uniform(0, 0.002, n)),
+        "Close": close,
+        "Volume": rng.integers(1, 1000, n).astype(float),
+    }, index=idx)
+
+
+class TestIntraday:
+    def test_chunked_resample_matches_whole_frame(self, tmp_path):
+        from intraday import load_bars, resample_ohlcv
+        df = make_minute_bars(5)
+        df.to_parquet(tmp_path / "P.parquet")
+        df.to_csv(tmp_path / "C.csv")
+        expected = resample_ohlcv(df, "5min")
+        for sym in ("P", "C"):
+            bars = load_bars(sym, "5min", str(tmp_path), chunk_rows=333)
+            pd.testing.assert_frame_equal(bars, expected, check_freq=False)
+
+    def test_chunked_resample_matches_whole_frame_for_daily_rules(self):
+        """Daily rules are not Tick offsets; both paths must still bin from the epoch."""
+        from intraday import resample_chunks, resample_ohlcv
+        df = make_minute_bars(7)
+        for rule in ("1h", "1D", "2D"):
+            expected = resample_ohlcv(df, rule)
+            chunks = (df.iloc[k:k + 500] for k in range(0, len(df), 500))
+            streamed = pd.concat(resample_chunks(chunks, rule))
+            pd.testing.assert_frame_equal(streamed, expected, check_freq=False)
+            assert (expected.index == expected.index.floor(pd.Timedelta(rule))).all(), rule
+
+    def test_time_hold_matches_bar_hold_on_regular_bars(self):
+        from trade_utils import first_touch, first_touch_time
+        df = TestFirstTouch()._random_ohlcv(300)
+        times = pd.date_range("2024-01-01", periods=300, freq="h")
+        o, h, l = df["Open"].values, df["High"].values, df["Low"].values
+        by_time = first_touch_time(times, o, h, l, "5h", block_cells=1000)
+        by_bars = first_touch(o, h, l, hold_days=5)
+        for a, b in zip(by_time, by_bars):
+            np.testing.assert_array_equal(a, b)
+
+    def test_time_hold_spans_overnight_gap(self):
+        from trade_utils import first_touch_time
+        times = pd.DatetimeIndex(["2024-01-01 15:00", "2024-01-01 15:29", "2024-01-02 09:15",
+                                  "2024-01-02 09:16", "2024-01-03 09:15"])
+        flat = np.full(5, 100.0)
+        high = flat.copy()
+        high[2] = 110.0                      # next morning's first bar hits the target
+        labels, pnl, exits = first_touch_time(times, flat, high, flat * 0.999, "1D",
+                                              target_pct=0.05, stop_pct=0.05)
+        assert labels[0] == 1 and exits[0] == 2
+        assert len(labels) == 2              # later entries lack a full day of data
+
+    def test_higher_timeframe_features_have_no_lookahead(self):
+        from intraday import multi_timeframe_features, resample_ohlcv
+        from features import add_features
+        bars = resample_ohlcv(make_minute_bars(12), "5min")
+        out = multi_timeframe_features(bars, "5min", ["1h"])
+        hourly = add_features(resample_ohlcv(bars, "1h"))
+        for t in out.index[::37]:
+            usable = hourly[hourly.index + pd.Timedelta("1h") <= t + pd.Timedelta("5min")]
+            assert out.loc[t, "rsi_1h"] == pytest.approx(usable["rsi"].iloc[-1])
+
+
+# ── fast_model ─────────────────────────────────────────────────────────────────
+
+class TestFastModel:
+    def test_matches_predict_proba_including_missing_values(self, tmp_path):
+        from fast_model import export_model, FastModel
+        from config import FEATURE_COLS
+        model = make_model(n_estimators=40)
+        rng = np.random.default_rng(1)
+        X = pd.DataFrame(rng.normal(size=(500, len(FEATURE_COLS))), columns=FEATURE_COLS)
+        X[X > 1.5] = np.nan
+        export_model(model, str(tmp_path / "m.npz"), str(tmp_path / "m.json"))
+
+        fast = FastModel.load(str(tmp_path / "m.npz"), block_rows=64)
+
+        np.testing.assert_allclose(fast.predict_proba(X), model.predict_proba(X), atol=1e-6)
+        assert (tmp_path / "m.json").exists()
+
+    def test_scoring_loader_skips_stale_export_and_avoids_xgboost(self, tmp_path):
+        import subprocess
+        import joblib
+        from fast_model import export_model
+        model = make_model()
+        pkl, npz = tmp_path / "m.pkl", tmp_path / "m.npz"
+        joblib.dump(model, pkl)
+        export_model(model, str(npz), None)
+        code = (
+            "import sys; from model_utils import load_scoring_model; "
+            f"m = load_scoring_model({str(pkl)!r}, {str(npz)!r}); "
+            "print(type(m).__name__, 'xgboost' in sys.modules)"
+        )
+        run = lambda: subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                     cwd=os.path.join(os.path.dirname(__file__), "..")).stdout.split()
+        assert run() == ["FastModel", "False"]
+
+        os.utime(npz, (0, 0))                # export older than the pickle
+        assert run() == ["XGBClassifier", "True"]
+
+
+# ── startup ────────────────────────────────────────────────────────────────────
+
+class TestStartup:
+    @pytest.mark.parametrize("module", ["main", "backtest", "server"])
+    def test_entry_points_do_not_import_heavy_libraries(self, module):
+        from bench import import_profile
+        assert import_profile(module)["heavy"] == []
+
+    def test_shared_fetches_reads_each_symbol_once(self):
+        import data_utils
+        calls = []
+        source = type("S", (), {"fetch": lambda self, s, a, b: calls.append(s) or make_ohlcv(30)})()
+        with patch.object(data_utils, "get_source", lambda: source), \
+             patch.object(data_utils, "_get_default_cache", lambda: None):
+            with data_utils.shared_fetches():
+                first = data_utils.fetch_data("X", "2020-01-01", "2021-01-01", use_cache=False)
+                again = data_utils.fetch_data("X", "2020-01-01", "2021-01-01", use_cache=False)
+            data_utils.fetch_data("X", "2020-01-01", "2021-01-01", use_cache=False)
+        assert first is again
+        assert calls == ["X", "X"]
+
+
+# ── tuning ─────────────────────────────────────────────────────────────────────
+
+class TestTuning:
+    def test_time_splits_are_ordered_and_embargoed(self):
+        from tuning import time_splits
+        dates = np.repeat(pd.bdate_range("2020-01-01", periods=120).to_numpy(), 3)
+        splits = time_splits(dates, n_splits=3, embargo_days=6)
+        assert len(splits) == 3
+        for train, val in splits:
+            gap = np.busday_count(dates[train].max().astype("datetime64[D]"),
+                                  dates[val].min().astype("datetime64[D]"))
+            assert gap > 6
+        assert len(splits[0][0]) < len(splits[1][0]) < len(splits[2][0])
+
+    def test_successive_halving_narrows_to_best_trial(self):
+        from training_data import build_panel
+        from tuning import tune
+        panel = build_panel(TestTrainingPanel()._items())
+        result = tune(panel, method="halving", n_trials=6, n_splits=2, min_rounds=4, max_rounds=36,
+                      eta=3, early_stopping=5, workers=1)
+        trials = result.trials
+        assert list(trials.groupby("rung").size()) == [6, 2, 1]
+        assert list(trials.groupby("rung")["rounds"].first()) == [4, 12, 36]
+        final = trials[trials["rung"] == 2].iloc[0]
+        assert result.best_score == final["val_logloss"]
+        assert 1 <= result.best_params["n_estimators"] <= 36
+        assert result.best_params["max_depth"] == final["max_depth"]
+
+
+    def test_worker_pool_matches_inline(self):
+        from training_data import build_panel
+        from tuning import tune
+        panel = build_panel(TestTrainingPanel()._items())
+        kwargs = dict(method="random", n_trials=2, n_splits=2, max_rounds=8, early_stopping=5)
+        inline = tune(panel, workers=1, **kwargs).trials
+        pooled = tune(panel, workers=2, **kwargs).trials
+        np.testing.assert_allclose(pooled["val_logloss"], inline["val_logloss"], rtol=1e-6)
+
+# ── panel features ─────────────────────────────────────────────────────────────
+
+class TestPanelFeatures:
+    def _universe(self):
+        frames = {f"S{k}": TestFirstTouch()._random_ohlcv(200, seed=k) for k in range(4)}
+        frames["S1"] = frames["S1"].iloc[30:]                                # later listing
+        frames["S2"] = frames["S2"].drop(frames["S2"].index[90:95])          # missing days
+        return frames
+
+    @staticmethod
+    def _ta_features(df):
+        """Reference: the original per-symbol `ta` implementation of FEATURE_COLS."""
+        import ta
+        df = df.copy()
+        df["ema20"] = ta.trend.ema_indicator(df["Close"], window=20)
+        df["ema50"] = ta.trend.ema_indicator(df["Close"], window=50)
+        df["atr"]   = ta.volatility.average_true_range(df["High"], df["Low"], df["Close"], window=14)
+        df["rsi"]   = ta.momentum.rsi(df["Close"], window=14)
+        df["close_ema20_ratio"] = df["Close"] / df["ema20"]
+        df["ema20_ema50_diff"]  = (df["ema20"] - df["ema50"]) / df["ema50"]
+        df["atr_pct"]           = df["atr"] / df["Close"]
+        df["vol_ratio"]         = df["Volume"] / df["Volume"].rolling(10).mean()
+        return df.dropna()
+
+    def test_matches_ta_reference(self):
+        from features import add_features
+        from panel_features import add_panel_features
+        frames = self._universe()
+        out = add_panel_features({**frames, "EMPTY": None})
+        assert set(out) == set(frames)
+        for symbol, df in frames.items():
+            expected = self._ta_features(df)
+            for got in (out[symbol], add_features(df)):
+                pd.testing.assert_index_equal(got.index, expected.index)
+                for col in expected.columns:
+                    np.testing.assert_allclose(got[col].to_numpy(float), expected[col].to_numpy(float),
+                                               rtol=1e-9, err_msg=f"{symbol}.{col}")
+
+    def test_cross_sectional_features(self):
+        from panel_features import add_panel_features
+        out = add_panel_features(self._universe())
+        day = out["S0"].index[-1]
+        rows = pd.DataFrame({s: df.loc[day] for s, df in out.items()}).T
+        assert sorted(rows["rsi_rank"]) == [0.25, 0.5, 0.75, 1.0]
+        assert list(rows.sort_values("rsi")["rsi_rank"]) == sorted(rows["rsi_rank"])
+        assert rows["rel_strength_20"].sum() == pytest.approx(0.0, abs=1e-12)
+        assert rows["breadth_ema50"].nunique() == 1
+        assert rows["breadth_ema50"].iloc[0] == pytest.approx((rows["Close"] > rows["ema50"]).mean())
+
+    def test_registry_rejects_unknown_inputs_and_columns(self):
+        from feature_registry import register, check_columns
+        with pytest.raises(ValueError):
+            register("bad_feature", ("no_such_column",))
+        with pytest.raises(ValueError):
+            check_columns(["rsi", "ema50"])          # ema50 is an intermediate
+
+    def test_cross_sectional_columns_need_the_universe(self):
+        from features import add_features
+        from feature_registry import split_columns
+        from panel_features import add_cross_features, add_panel_features
+        columns = ["rsi", "rsi_rank", "rel_strength_20"]
+        frames = self._universe()
+        with pytest.raises(ValueError, match="rsi_rank, rel_strength_20"):
+            add_features(frames["S0"], columns)
+
+        per_symbol, cross = split_columns(columns)
+        assert per_symbol == ["ret20", "rsi"] and cross == ["rsi_rank", "rel_strength_20"]
+        built = add_cross_features({s: add_features(df, per_symbol) for s, df in frames.items()}, columns)
+        expected = add_panel_features(frames, columns)
+        for symbol, df in expected.items():
+            pd.testing.assert_frame_equal(built[symbol][columns], df[columns])
+        assert built["S0"]["rsi_rank"].std() > 0
+
+    def test_computes_only_requested_columns_with_exact_warmup(self):
+        from features import add_features
+        from feature_registry import resolve, warmup_rows
+        from config import FEATURE_COLS
+        df = TestFirstTouch()._random_ohlcv(120)
+        assert warmup_rows(FEATURE_COLS) == 49
+        assert warmup_rows(["rsi"]) == 13
+        assert warmup_rows(["close_ema20_ratio", "vol_ratio"]) == 19
+
+        out = add_features(df, ["rsi"])
+        assert "ema50" not in out.columns and "atr" not in out.columns
+        assert len(out) == len(df) - 13 and out["rsi"].notna().all()
+
+        names = [f.name for f in resolve(["close_ema20_ratio", "ema20_ema50_diff"])]
+        assert names == ["ema20", "ema50", "close_ema20_ratio", "ema20_ema50_diff"]
+
+
+# ── live_window ────────────────────────────────────────────────────────────────
+
+class TestLiveWindow:
+    def test_history_rows_covers_recursions(self):
+        from feature_registry import history_rows, warmup_rows, convergence_rows
+        from config import FEATURE_COLS
+        assert convergence_rows(0.0, 1e-4) == 0
+        assert (49 / 51) ** convergence_rows(49 / 51, 1e-4) <= 1e-4
+        assert history_rows(["vol_ratio"], 1e-4) == warmup_rows(["vol_ratio"]) + 1
+        assert history_rows(FEATURE_COLS, 1e-4) > history_rows(FEATURE_COLS, 1e-2) > warmup_rows(FEATURE_COLS)
+
+    def test_tail_matches_full_history(self):
+        from live_window import check_tail
+        from config import FEATURE_COLS
+        frames = {f"S{k}": TestFirstTouch()._random_ohlcv(1200, seed=k) for k in range(3)}
+        report = check_tail(frames, tolerance=1e-4)
+        assert len(report) == 3 * len(FEATURE_COLS)
+        assert (report["scaled_diff"] <= 1e-4).all()
+
+    def test_fetches_only_trailing_window(self):
+        import live_window
+        from feature_registry import history_rows
+        from config import FEATURE_COLS
+        starts = []
+
+        def fake_many(symbols, start, end):
+            from data_utils import FetchResult
+            starts.append(pd.Timestamp(start))
+            for s in reversed(symbols):     # completion order differs from input order
+                df = None if s == "NONE" else TestFirstTouch()._random_ohlcv(50)
+                yield FetchResult(s, df, None if df is not None else "No data", 1, 0.0)
+
+        with patch.object(live_window, "fetch_many", fake_many):
+            raw, missing = live_window.fetch_universe(["A", "NONE"], end="2024-12-31")
+        assert list(raw) == ["A"] and missing == ["NONE"]
+        bars = pd.bdate_range(starts[0], "2024-12-30")
+        need = history_rows(FEATURE_COLS, 1e-4)
+        assert need * 1.07 <= len(bars) < 400
+
+
+# ── panel_store ────────────────────────────────────────────────────────────────
+
+class TestPanelStore:
+    def _frames(self):
+        return {f"S{k}": TestFirstTouch()._random_ohlcv(120 + 10 * k, seed=k) for k in range(3)}
+
+    def test_round_trip_is_zero_copy(self, tmp_path):
+        from panel_store import write_store, PanelStore
+        frames = self._frames()
+        path = str(tmp_path / "store")
+        assert write_store(path, [*frames.items(), ("EMPTY", None)]) == 3
+        store = PanelStore(path)
+        assert store.symbols == list(frames) and len(store) == sum(map(len, frames.values()))
+        for symbol, df in frames.items():
+            got = store.frame(symbol)
+            pd.testing.assert_frame_equal(got, df[["Open", "High", "Low", "Close", "Volume"]],
+                                          check_freq=False, check_index_type=False, check_dtype=False)
+            assert np.shares_memory(got["Close"].to_numpy(), store.column("Close"))
+        assert store.frame("EMPTY") is None
+
+    def test_date_slices_and_pickling(self, tmp_path):
+        import pickle
+        from panel_store import write_store, PanelStore
+        frames = self._frames()
+        path = str(tmp_path / "store")
+        write_store(path, frames.items())
+        store = pickle.loads(pickle.dumps(PanelStore(path)))
+        df = frames["S1"]
+        start, end = df.index[10], df.index[40]
+        got = store.frame("S1", start, end)
+        assert got.index[0] == start and got.index[-1] == df.index[39] and len(got) == 30
+        assert store.frame("S1", end=df.index[0]) is None
+
+        # Rebuilding swaps the whole store in
+        write_store(path, [("S2", frames["S2"])])
+        assert PanelStore(path).symbols == ["S2"]
+
+    def test_labels_and_pipeline_read_from_store(self, tmp_path):
+        from panel_store import write_store, open_store
+        from labeling import create_labels
+        from pipeline import process_universe
+        frames = self._frames()
+        path = str(tmp_path / "store")
+        write_store(path, frames.items())
+
+        view = open_store(path).frame("S0")
+        labels = create_labels(view)["label"].to_numpy()
+        np.testing.assert_array_equal(labels, create_labels(frames["S0"])["label"].to_numpy())
+
+        fetched = dict(process_universe(list(frames), fetch=frames.get, cpu_workers=1, feature_store=None))
+        stored = dict(process_universe(list(frames) + ["NOPE"], cpu_workers=2, feature_store=None, panel_store=path))
+        assert stored["NOPE"] is None
+        for symbol in frames:
+            pd.testing.assert_frame_equal(stored[symbol], fetched[symbol][stored[symbol].columns],
+                                          check_freq=False, check_index_type=False, check_dtype=False)
@@ -6,8 +6,10 @@ Extracted to eliminate copy-paste duplication.
 """
 
 import logging
+import numpy as np
 import pandas as pd
-from config import TARGET_PCT, STOP_PCT, HOLD_DAYS
+from numpy.lib.stride_tricks import sliding_window_view
+from config import TARGET_PCT, STOP_PCT, HOLD_DAYS, INTRADAY_BLOCK_CELLS
 
 logger = logging.getLogger(__name__)
 
@@ -42,3 +44,153 @@ def simulate_trade(df: pd.DataFrame, i: int) -> tuple[int, float]:
             return 1, TARGET_PCT
 
     return 0, 0.0
+
+
+def first_touch(
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    target_pct: float = TARGET_PCT,
+    stop_pct: float = STOP_PCT,
+    hold_days: int = HOLD_DAYS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorised simulate_trade for every signal bar at once.
+
+    Evaluates the same trade as simulate_trade for each bar i in
+    range(len - hold_days - 1), using sliding-window views over High/Low
+    instead of a per-bar Python loop. Within a bar the stop is checked
+    before the target, exactly as in simulate_trade.
+
+    Args:
+        open_, high, low: 1-D price arrays of equal length.
+        target_pct, stop_pct, hold_days: Trade parameters (default from config).
+
+    Returns:
+        A tuple of (labels, pnl, exit_offset) arrays of length
+        len - hold_days - 1, where exit_offset is the bar j (1..hold_days)
+        on which the trade closed, relative to the signal bar.
+    """
+    n = len(open_) - hold_days - 1
+    if n <= 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64)
+
+    open_ = np.asarray(open_, dtype=np.float64)
+    entry  = open_[1:n + 1]
+    target = entry * (1 + target_pct)
+    stop   = entry * (1 - stop_pct)
+
+    # Row i holds bars i+1 .. i+hold_days
+    highs = sliding_window_view(np.asarray(high, dtype=np.float64)[1:], hold_days)[:n]
+    lows  = sliding_window_view(np.asarray(low, dtype=np.float64)[1:], hold_days)[:n]
+
+    stop_hit   = lows <= stop[:, None]
+    target_hit = highs >= target[:, None]
+
+    # First bar of each event; hold_days means "never"
+    first_stop   = np.where(stop_hit.any(axis=1), stop_hit.argmax(axis=1), hold_days)
+    first_target = np.where(target_hit.any(axis=1), target_hit.argmax(axis=1), hold_days)
+
+    stopped = (first_stop < hold_days) & (first_stop <= first_target)
+    won     = (first_target < hold_days) & ~stopped
+
+    labels = won.astype(np.int64)
+    pnl = np.where(stopped, -stop_pct, np.where(won, target_pct, 0.0))
+    exit_offset = np.where(stopped, first_stop, np.where(won, first_target, hold_days - 1)) + 1
+    return labels, pnl, exit_offset
+
+
+def first_touch_time(
+    times: np.ndarray,
+    open_: np.ndarray,
+    high: np.ndarray,
+    low: np.ndarray,
+    hold,
+    target_pct: float = TARGET_PCT,
+    stop_pct: float = STOP_PCT,
+    block_cells: int = INTRADAY_BLOCK_CELLS,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """first_touch with the holding period given as a time span instead of bars.
+
+    A signal on bar i enters at bar i+1's Open at time t = times[i+1] and
+    watches every bar starting before t + hold (the entry bar included, as
+    in first_touch). Bars may be irregularly spaced (sessions, gaps), so
+    each signal has its own window length; windows are evaluated in blocks
+    of at most block_cells signal × bar cells to bound memory.
+
+    Args:
+        times:            Bar start times, strictly increasing.
+        open_, high, low: 1-D price arrays aligned with times.
+        hold:             Holding period (anything pd.Timedelta accepts).
+        target_pct, stop_pct: Trade parameters (default from config).
+        block_cells:      Memory bound for one block of window comparisons.
+
+    Returns:
+        (labels, pnl, exit_offset) for the n signal bars whose whole holding
+        period lies within the data (times[i+1] + hold <= times[-1]);
+        exit_offset is the exit bar's index relative to the signal bar.
+    """
+    times = np.asarray(times, dtype="datetime64[ns]")
+    hold = np.timedelta64(pd.Timedelta(hold).value, "ns")
+    if hold <= np.timedelta64(0, "ns"):
+        raise ValueError("hold must be a positive time span")
+    if len(times) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64)
+
+    expiry = times[1:] + hold
+    n = int(np.searchsorted(expiry, times[-1], side="right"))
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64)
+
+    # Signal i watches bars i+1 .. end[i]-1
+    end = np.searchsorted(times, expiry[:n], side="left")
+    lengths = end - np.arange(1, n + 1)
+    width = int(lengths.max())
+
+    pad = np.full(width, np.nan)
+    highs = sliding_window_view(np.concatenate((np.asarray(high, dtype=np.float64)[1:], pad)), width)
+    lows  = sliding_window_view(np.concatenate((np.asarray(low, dtype=np.float64)[1:], pad)), width)
+    entry = np.asarray(open_, dtype=np.float64)[1:n + 1]
+    target, stop = entry * (1 + target_pct), entry * (1 - stop_pct)
+
+    labels = np.zeros(n, dtype=np.int64)
+    pnl = np.zeros(n)
+    exit_offset = np.zeros(n, dtype=np.int64)
+    cols = np.arange(width)
+    step = max(1, block_cells // width)
+    for s in range(0, n, step):
+        e = min(n, s + step)
+        inside = cols < lengths[s:e, None]
+        stop_hit   = (lows[s:e] <= stop[s:e, None]) & inside
+        target_hit = (highs[s:e] >= target[s:e, None]) & inside
+
+        first_stop   = np.where(stop_hit.any(axis=1), stop_hit.argmax(axis=1), width)
+        first_target = np.where(target_hit.any(axis=1), target_hit.argmax(axis=1), width)
+        stopped = (first_stop < width) & (first_stop <= first_target)
+        won     = (first_target < width) & ~stopped
+
+        labels[s:e] = won
+        pnl[s:e] = np.where(stopped, -stop_pct, np.where(won, target_pct, 0.0))
+        exit_offset[s:e] = np.where(stopped, first_stop, np.where(won, first_target, lengths[s:e] - 1)) + 1
+    return labels, pnl, exit_offset
+
+
+def simulate_trades(
+    df: pd.DataFrame,
+    target_pct: float = TARGET_PCT,
+    stop_pct: float = STOP_PCT,
+    hold_days: int = HOLD_DAYS,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Run simulate_trade for every labellable bar of df in one pass.
+
+    Args:
+        df: OHLCV DataFrame with Open, High, Low columns.
+        target_pct, stop_pct, hold_days: Trade parameters (default from config).
+
+    Returns:
+        A tuple of (labels, pnl) arrays of length len(df) - hold_days - 1.
+    """
+    labels, pnl, _ = first_touch(
+        df["Open"].to_numpy(), df["High"].to_numpy(), df["Low"].to_numpy(),
+        target_pct, stop_pct, hold_days,
+    )
+    return labels, pnl
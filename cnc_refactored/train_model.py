@@ -2,18 +2,30 @@
 train_model.py
 --------------
 Trains an XGBoost classifier to predict whether a long trade will hit
-its target within HOLD_DAYS. Saves the trained model to MODEL_PATH.
+its target within HOLD_DAYS. Saves the trained model to MODEL_PATH and
+exports it (fast_model.export_model) for xgboost-free scoring.
 """
 
+import argparse
 import logging
+import os
+import tempfile
+import numpy as np
 import pandas as pd
 import joblib
-from xgboost import XGBClassifier
+import metrics
+import tuning
 from sklearn.metrics import classification_report
 from data_utils import fetch_data
-from features import add_features
-from labeling import create_labels
-from config import STOCK_LIST, TRAIN_END, TEST_END, MODEL_PATH, FEATURE_COLS
+from pipeline import engineer, process_universe
+from fast_model import export_model
+from feature_registry import split_columns
+from panel_features import add_cross_features
+from training_data import build_panel, spill_chunks, load_chunk, external_dmatrix, fit_classifier
+from config import (
+    STOCK_LIST, FEATURE_COLS, TRAIN_END, TEST_END, MODEL_PATH, CPU_WORKERS, MODEL_PARAMS, TUNE_TRIALS_PATH,
+    USE_PANEL_STORE, PANEL_STORE_DIR,
+)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger(__name__)
@@ -26,19 +38,41 @@ def process_stock(stock: str) -> pd.DataFrame | None:
         stock: Ticker symbol.
 
     Returns:
-        Processed DataFrame with feature columns and 'label', or None on failure.
+        Processed DataFrame with the per-symbol feature columns and 'label', or None on failure.
     """
     df = fetch_data(stock)
     if df is None:
         return None
-    df = add_features(df)
-    df = create_labels(df)
-    df["symbol"] = stock
-    return df
+    return engineer(stock, df)
 
 
-def prepare_data() -> pd.DataFrame:
-    """Fetch and process all stocks, returning a combined DataFrame.
+def _engineered(workers: int | None = None, panel_store: str | None = None):
+    for stock, df in process_universe(STOCK_LIST, cpu_workers=workers or CPU_WORKERS, panel_store=panel_store):
+        if df is None:
+            logger.warning("Skipping %s — could not load data.", stock)
+            continue
+        yield stock, df
+
+
+def _universe(workers: int | None = None, panel_store: str | None = None):
+    """Yield (symbol, engineered DataFrame) for every stock that loaded.
+
+    Frames stream one at a time unless FEATURE_COLS has cross-sectional
+    columns: those are computed over the whole universe with the panel
+    engine (add_cross_features), so every frame is collected first.
+    """
+    items = _engineered(workers, panel_store)
+    if split_columns(FEATURE_COLS)[1]:
+        items = add_cross_features(dict(items)).items()
+    yield from items
+
+
+def prepare_data(workers: int | None = None) -> pd.DataFrame:
+    """Fetch and process all stocks concurrently, returning a combined DataFrame.
+
+    Args:
+        workers: Process count for feature/label computation. Defaults to
+                 CPU_WORKERS from config; 1 disables the process pool.
 
     Returns:
         Concatenated DataFrame across all stocks in STOCK_LIST.
@@ -46,50 +80,95 @@ def prepare_data() -> pd.DataFrame:
     Raises:
         ValueError: If no valid data could be loaded for any stock.
     """
-    all_data = []
-    for stock in STOCK_LIST:
-        df = process_stock(stock)
-        if df is not None:
-            all_data.append(df)
-        else:
-            logger.warning("Skipping %s — could not load data.", stock)
-
+    all_data = [df for _, df in _universe(workers)]
     if not all_data:
         raise ValueError("No data loaded for any stock. Check STOCK_LIST and network.")
 
     return pd.concat(all_data)
 
 
-def train() -> None:
-    """Train the XGBoost model on TRAIN_END data, evaluate on TEST_END, and save."""
-    df = prepare_data()
-
-    train_df = df[df.index <= TRAIN_END]
-    test_df  = df[(df.index > TRAIN_END) & (df.index <= TEST_END)]
+def train(
+    external_memory: bool = False,
+    workers: int | None = None,
+    tune: bool = False,
+    panel_store: str | None = PANEL_STORE_DIR if USE_PANEL_STORE else None,
+):
+    """Train the XGBoost model on TRAIN_END data, evaluate on TEST_END, and save.
 
-    X_train, y_train = train_df[FEATURE_COLS], train_df["label"]
-    X_test,  y_test  = test_df[FEATURE_COLS],  test_df["label"]
+    The training panel is held as compact float32 arrays (training_data.py)
+    and fed to XGBoost as a QuantileDMatrix.
 
-    logger.info("Training on %d samples, evaluating on %d samples.", len(X_train), len(X_test))
-
-    model = XGBClassifier(
-        max_depth=4,
-        learning_rate=0.05,
-        n_estimators=300,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        eval_metric="logloss",
-        # Note: use_label_encoder removed — deprecated and removed in recent XGBoost versions
-    )
+    Args:
+        external_memory: Spill per-symbol arrays to disk and train through an
+                         external-memory iterator, for panels larger than RAM.
+        workers:         Process count for feature/label computation (and
+                         tuning trials).
+        tune:            Search hyperparameters on time-ordered validation
+                         splits of the training period (tuning.py) and fit
+                         the final model with the best ones. Trials are
+                         saved to TUNE_TRIALS_PATH.
+        panel_store:     Read raw bars from this panel store (panel_store.py)
+                         instead of fetching them.
 
-    model.fit(X_train, y_train)
+    Returns:
+        The trained XGBClassifier.
+    """
+    if external_memory and tune:
+        raise ValueError("--tune needs the in-memory training panel; drop --external-memory")
+    if external_memory:
+        with tempfile.TemporaryDirectory(prefix="cnc_panel_") as tmp:
+            prefixes = spill_chunks(_universe(workers, panel_store), tmp)
+            dtrain = external_dmatrix(prefixes, until=TRAIN_END)
+            test_parts = [load_chunk(p, after=TRAIN_END, until=TEST_END) for p in prefixes]
+            X_test = np.concatenate([p[0] for p in test_parts])
+            y_test = np.concatenate([p[1] for p in test_parts])
+            logger.info("Training on %d samples, evaluating on %d samples.", dtrain.num_row(), len(y_test))
+            with metrics.timer("train_fit"):
+                model = fit_classifier(dtrain, MODEL_PARAMS)
+            del dtrain  # release the page cache before the temp dir goes away
+    else:
+        panel = build_panel(_universe(workers, panel_store))
+        train_panel = panel.between(until=TRAIN_END)
+        test_panel  = panel.between(after=TRAIN_END, until=TEST_END)
+        X_test, y_test = test_panel.X, test_panel.y
+        logger.info("Training on %d samples, evaluating on %d samples.", len(train_panel), len(test_panel))
+        params = MODEL_PARAMS
+        if tune:
+            with metrics.timer("tune"):
+                result = tuning.tune(train_panel, workers=workers or CPU_WORKERS)
+            result.trials.to_csv(TUNE_TRIALS_PATH, index=False)
+            logger.info("Saved %d trial results to %s", len(result.trials), TUNE_TRIALS_PATH)
+            params = result.best_params
+        with metrics.timer("train_fit"):
+            model = fit_classifier(train_panel.quantile_dmatrix(), params)
 
     preds = model.predict(X_test)
     print(classification_report(y_test, preds))
 
-    joblib.dump(model, MODEL_PATH)
+    # Write-then-rename so a watching server never sees a half-written file
+    tmp_path = f"{MODEL_PATH}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, MODEL_PATH)
     logger.info("Model saved to %s", MODEL_PATH)
+    export_model(model)
+    return model
 
 
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="Train the CNC AI model")
+    parser.add_argument("--external-memory", action="store_true",
+                        help="Stream the training panel from disk instead of holding it in RAM")
+    parser.add_argument("--workers", type=int, default=None, help="Processes for features/labels and tuning")
+    parser.add_argument("--tune", action="store_true",
+                        help="Search hyperparameters (see tuning.py) before the final fit")
+    parser.add_argument("--panel-store", nargs="?", const=PANEL_STORE_DIR,
+                        default=PANEL_STORE_DIR if USE_PANEL_STORE else None,
+                        help="Read raw bars from a panel store (built with panel_store.py) instead of fetching")
+    metrics.add_profile_argument(parser)
+    args = parser.parse_args()
+    if args.tune and args.external_memory:
+        parser.error("--tune cannot be combined with --external-memory")
+    train(external_memory=args.external_memory, workers=args.workers, tune=args.tune,
+          panel_store=args.panel_store)
+    if args.profile:
+        metrics.dump_profile(args.profile)
@@ -0,0 +1,185 @@
+"""
+training_data.py
+----------------
+Compact training-panel builder for train_model.
+Keeps only FEATURE_COLS (as contiguous float32), the label, the date and an
+integer symbol code per row, instead of concatenating full float64
+DataFrames. Panels are fed to XGBoost as a QuantileDMatrix; for panels that
+do not fit in RAM, per-symbol arrays are spilled to .npy files and streamed
+through an external-memory DataIter.
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from typing import Iterable
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from config import FEATURE_COLS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TrainingPanel:
+    """Row-aligned training arrays for the whole universe."""
+
+    X: np.ndarray              # float32, shape (rows, len(FEATURE_COLS)), C-contiguous
+    y: np.ndarray              # int8 labels
+    dates: np.ndarray          # datetime64[ns]
+    symbol_codes: np.ndarray   # int32 index into `symbols`
+    symbols: list[str]
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    @property
+    def nbytes(self) -> int:
+        return self.X.nbytes + self.y.nbytes + self.dates.nbytes + self.symbol_codes.nbytes
+
+    def between(self, after=None, until=None) -> "TrainingPanel":
+        """Rows with after < date <= until (either bound may be None)."""
+        mask = np.ones(len(self), dtype=bool)
+        if after is not None:
+            mask &= self.dates > np.datetime64(pd.Timestamp(after))
+        if until is not None:
+            mask &= self.dates <= np.datetime64(pd.Timestamp(until))
+        return TrainingPanel(self.X[mask], self.y[mask], self.dates[mask],
+                             self.symbol_codes[mask], self.symbols)
+
+    def quantile_dmatrix(self, ref: xgb.QuantileDMatrix | None = None) -> xgb.QuantileDMatrix:
+        return xgb.QuantileDMatrix(self.X, self.y, ref=ref, feature_names=FEATURE_COLS)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame view for inspection (symbol as a categorical)."""
+        df = pd.DataFrame(self.X, columns=FEATURE_COLS, index=pd.DatetimeIndex(self.dates))
+        df["label"] = self.y
+        df["symbol"] = pd.Categorical.from_codes(self.symbol_codes, categories=self.symbols)
+        return df
+
+
+def compact(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(X float32, y int8, dates) arrays for one engineered symbol frame."""
+    X = np.ascontiguousarray(df[FEATURE_COLS].to_numpy(dtype=np.float32))
+    y = df["label"].to_numpy(dtype=np.int8)
+    dates = df.index.to_numpy(dtype="datetime64[ns]")
+    return X, y, dates
+
+
+def build_panel(items: Iterable[tuple[str, pd.DataFrame | None]]) -> TrainingPanel:
+    """Build a TrainingPanel from (symbol, engineered DataFrame) pairs.
+
+    Each frame is reduced to compact arrays as soon as it arrives, so only
+    the compact chunks (not full DataFrames) are alive when concatenating.
+    None frames are skipped.
+    """
+    symbols, chunks = [], []
+    for symbol, df in items:
+        if df is None or len(df) == 0:
+            continue
+        chunks.append(compact(df))
+        symbols.append(symbol)
+
+    if not chunks:
+        raise ValueError("No data loaded for any stock. Check STOCK_LIST and network.")
+
+    panel = TrainingPanel(
+        X=np.concatenate([c[0] for c in chunks]),
+        y=np.concatenate([c[1] for c in chunks]),
+        dates=np.concatenate([c[2] for c in chunks]),
+        symbol_codes=np.repeat(np.arange(len(symbols), dtype=np.int32), [len(c[1]) for c in chunks]),
+        symbols=symbols,
+    )
+    logger.info("Training panel: %d rows × %d features, %.1f MB",
+                len(panel), panel.X.shape[1], panel.nbytes / 1e6)
+    return panel
+
+
+# ── External memory ────────────────────────────────────────────────────────────
+
+def spill_chunks(items: Iterable[tuple[str, pd.DataFrame | None]], directory: str) -> list[str]:
+    """Write each symbol's compact arrays to <directory>/<n>.{X,y,dates}.npy.
+
+    Returns:
+        The chunk path prefixes, in input order.
+    """
+    os.makedirs(directory, exist_ok=True)
+    prefixes = []
+    for symbol, df in items:
+        if df is None or len(df) == 0:
+            continue
+        X, y, dates = compact(df)
+        prefix = os.path.join(directory, str(len(prefixes)))
+        np.save(prefix + ".X.npy", X)
+        np.save(prefix + ".y.npy", y)
+        np.save(prefix + ".dates.npy", dates.view(np.int64))
+        prefixes.append(prefix)
+    if not prefixes:
+        raise ValueError("No data loaded for any stock. Check STOCK_LIST and network.")
+    return prefixes
+
+
+def load_chunk(prefix: str, after=None, until=None) -> tuple[np.ndarray, np.ndarray]:
+    """Memory-map one spilled chunk and return its (X, y) rows with after < date <= until."""
+    X = np.load(prefix + ".X.npy", mmap_mode="r")
+    y = np.load(prefix + ".y.npy", mmap_mode="r")
+    dates = np.load(prefix + ".dates.npy", mmap_mode="r").view("datetime64[ns]")
+    mask = np.ones(len(y), dtype=bool)
+    if after is not None:
+        mask &= dates > np.datetime64(pd.Timestamp(after))
+    if until is not None:
+        mask &= dates <= np.datetime64(pd.Timestamp(until))
+    return X[mask], y[mask]
+
+
+class ChunkIter(xgb.DataIter):
+    """Streams spilled chunks into XGBoost one symbol at a time."""
+
+    def __init__(self, prefixes: list[str], after=None, until=None, cache_prefix: str | None = None):
+        self._prefixes = prefixes
+        self._after, self._until = after, until
+        self._i = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data) -> bool:
+        while self._i < len(self._prefixes):
+            X, y = load_chunk(self._prefixes[self._i], self._after, self._until)
+            self._i += 1
+            if len(y):
+                input_data(data=X, label=y, feature_names=FEATURE_COLS)
+                return True
+        return False
+
+    def reset(self) -> None:
+        self._i = 0
+
+
+def external_dmatrix(prefixes: list[str], after=None, until=None, cache_dir: str | None = None):
+    """External-memory quantile DMatrix over spilled chunks."""
+    cache_prefix = os.path.join(cache_dir or os.path.dirname(prefixes[0]), "xgb_cache")
+    return xgb.ExtMemQuantileDMatrix(ChunkIter(prefixes, after, until, cache_prefix))
+
+
+# ── Fitting ────────────────────────────────────────────────────────────────────
+
+def fit_classifier(dtrain: xgb.DMatrix, params: dict) -> xgb.XGBClassifier:
+    """Train with the native API on a (Quantile/ExtMem) DMatrix and wrap as XGBClassifier.
+
+    Args:
+        dtrain: Training matrix.
+        params: XGBClassifier-style parameters (n_estimators, max_depth, ...).
+
+    Returns:
+        An XGBClassifier usable with predict_proba, joblib and model_utils.
+    """
+    params = dict(params)
+    rounds = params.pop("n_estimators", 100)
+    booster = xgb.train(
+        {"objective": "binary:logistic", "tree_method": "hist", **params},
+        dtrain,
+        num_boost_round=rounds,
+    )
+    model = xgb.XGBClassifier(n_estimators=rounds, **params)
+    model.load_model(bytearray(booster.save_raw("json")))
+    return model
@@ -0,0 +1,238 @@
+"""
+tuning.py
+---------
+Hyperparameter search for train_model (python train_model.py --tune).
+
+Configurations are sampled from TUNE_SPACE and scored by mean validation
+logloss over TUNE_SPLITS time-ordered splits of the training period, each
+fit stopping early once the validation loss stops improving. With
+successive halving, every configuration first gets TUNE_MIN_ROUNDS
+boosting rounds; the best 1/TUNE_ETA move on with TUNE_ETA× the rounds,
+until the survivors reach TUNE_MAX_ROUNDS. A configuration that already
+stopped early keeps its result instead of being refitted.
+
+Trials run in parallel across processes. Each worker receives the panel
+once (pool initializer) and caches its quantised DMatrices across rungs;
+XGBoost threads per trial are capped at cpu_count // workers so workers ×
+threads does not oversubscribe the CPU.
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from training_data import TrainingPanel
+from pipeline import worker_context
+from config import (
+    FEATURE_COLS, HOLD_DAYS, MODEL_PARAMS, CPU_WORKERS,
+    TUNE_SPACE, TUNE_METHOD, TUNE_TRIALS, TUNE_SPLITS, TUNE_MIN_ROUNDS, TUNE_MAX_ROUNDS,
+    TUNE_ETA, TUNE_EARLY_STOPPING, TUNE_SEED,
+)
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("halving", "random")
+
+
+@dataclass
+class TuningResult:
+    """Best configuration and the full trials table of a search."""
+
+    best_params: dict          # XGBClassifier parameters, n_estimators = best early-stopped rounds
+    best_score: float          # mean validation logloss of the best trial in the last rung
+    trials: pd.DataFrame       # one row per (trial, rung) evaluation
+
+
+# ── Search space and splits ────────────────────────────────────────────────────
+
+def sample_params(rng: np.random.Generator, space: dict = TUNE_SPACE) -> dict:
+    """Draw one configuration from a TUNE_SPACE-style search space."""
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            value = spec[rng.integers(len(spec))]
+            params[name] = value.item() if isinstance(value, np.generic) else value
+            continue
+        kind, lo, hi = spec
+        if kind == "uniform":
+            params[name] = float(rng.uniform(lo, hi))
+        elif kind == "log":
+            params[name] = float(np.exp(rng.uniform(np.log(lo), np.log(hi))))
+        elif kind == "int":
+            params[name] = int(rng.integers(lo, hi + 1))
+        else:
+            raise ValueError(f"Unknown search space kind '{kind}' for '{name}'")
+    return params
+
+
+def time_splits(
+    dates: np.ndarray,
+    n_splits: int = TUNE_SPLITS,
+    embargo_days: int = HOLD_DAYS + 1,
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """Expanding-window (train rows, validation rows) splits in date order.
+
+    The distinct dates are cut into n_splits + 1 consecutive blocks; split
+    k trains on blocks 0..k and validates on block k + 1. The last
+    embargo_days dates before each validation block are dropped from its
+    training rows, since their labels look into the validation period.
+    """
+    days = np.unique(dates)
+    if len(days) < 2 * (n_splits + 1) + embargo_days:
+        raise ValueError(f"Not enough dates ({len(days)}) for {n_splits} time splits")
+    bounds = np.linspace(0, len(days), n_splits + 2).astype(int)
+    splits = []
+    for k in range(n_splits):
+        val_start, val_end = days[bounds[k + 1]], days[bounds[k + 2] - 1]
+        train_end = days[max(0, bounds[k + 1] - embargo_days)]
+        train = np.flatnonzero(dates < train_end)
+        val = np.flatnonzero((dates >= val_start) & (dates <= val_end))
+        splits.append((train, val))
+    return splits
+
+
+# ── Trial execution (runs inside worker processes) ─────────────────────────────
+
+_worker: dict = {}
+
+
+def _init_worker(X: np.ndarray, y: np.ndarray, splits: list, nthread: int) -> None:
+    _worker.clear()
+    _worker.update(X=X, y=y, splits=splits, nthread=nthread, dmatrices={})
+
+
+def _dmatrices(k: int) -> tuple[xgb.QuantileDMatrix, xgb.QuantileDMatrix]:
+    cache = _worker["dmatrices"]
+    if k not in cache:
+        X, y = _worker["X"], _worker["y"]
+        train, val = _worker["splits"][k]
+        dtrain = xgb.QuantileDMatrix(X[train], y[train], feature_names=FEATURE_COLS, nthread=_worker["nthread"])
+        dval = xgb.QuantileDMatrix(X[val], y[val], ref=dtrain, feature_names=FEATURE_COLS)
+        cache[k] = (dtrain, dval)
+    return cache[k]
+
+
+def _evaluate(trial: int, params: dict, rounds: int, early_stopping: int) -> dict:
+    """Fit params on every split with early stopping; return the mean validation score."""
+    t0 = time.perf_counter()
+    booster_params = {
+        "objective": "binary:logistic", "tree_method": "hist", "eval_metric": "logloss",
+        "nthread": _worker["nthread"], "seed": TUNE_SEED, **params,
+    }
+    scores, best_rounds, stopped = [], [], []
+    for k in range(len(_worker["splits"])):
+        dtrain, dval = _dmatrices(k)
+        booster = xgb.train(booster_params, dtrain, num_boost_round=rounds, evals=[(dval, "val")],
+                            early_stopping_rounds=early_stopping, verbose_eval=False)
+        scores.append(float(booster.best_score))
+        best_rounds.append(booster.best_iteration + 1)
+        stopped.append(booster.num_boosted_rounds() < rounds)
+    return {
+        "trial": trial,
+        "rounds": rounds,
+        "val_logloss": float(np.mean(scores)),
+        "best_rounds": int(round(np.mean(best_rounds))),
+        "stopped_early": all(stopped),
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+# ── Search ─────────────────────────────────────────────────────────────────────
+
+def _rungs(method: str, min_rounds: int, max_rounds: int, eta: int) -> list[int]:
+    if method == "random":
+        return [max_rounds]
+    rungs = [min(min_rounds, max_rounds)]
+    while rungs[-1] < max_rounds:
+        rungs.append(min(max_rounds, rungs[-1] * eta))
+    return rungs
+
+
+def tune(
+    panel: TrainingPanel,
+    method: str = TUNE_METHOD,
+    n_trials: int = TUNE_TRIALS,
+    n_splits: int = TUNE_SPLITS,
+    min_rounds: int = TUNE_MIN_ROUNDS,
+    max_rounds: int = TUNE_MAX_ROUNDS,
+    eta: int = TUNE_ETA,
+    early_stopping: int = TUNE_EARLY_STOPPING,
+    workers: int = CPU_WORKERS,
+    space: dict = TUNE_SPACE,
+    seed: int = TUNE_SEED,
+) -> TuningResult:
+    """Search XGBoost parameters on a training panel.
+
+    Args:
+        panel:          Training rows only (the test period must be excluded).
+        method:         "halving" or "random" (every trial at max_rounds).
+        n_trials:       Configurations sampled from space.
+        n_splits:       Time-ordered validation splits (see time_splits).
+        min_rounds, max_rounds, eta: Halving schedule.
+        early_stopping: Rounds without validation improvement before a fit stops.
+        workers:        Processes running trials in parallel.
+        space:          Search space (TUNE_SPACE format).
+        seed:           Sampling seed.
+
+    Returns:
+        A TuningResult; best_params merges MODEL_PARAMS with the best
+        configuration and sets n_estimators to its early-stopped round count.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got '{method}'")
+    rng = np.random.default_rng(seed)
+    configs = [sample_params(rng, space) for _ in range(n_trials)]
+    splits = time_splits(panel.dates, n_splits)
+    workers = max(1, min(workers, n_trials))
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+    rungs = _rungs(method, min_rounds, max_rounds, eta)
+    logger.info("Tuning: %d %s trials × %d splits, rungs %s, %d workers × %d threads",
+                n_trials, method, n_splits, rungs, workers, nthread)
+
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=worker_context(),
+                                   initializer=_init_worker, initargs=(panel.X, panel.y, splits, nthread))
+    else:
+        _init_worker(panel.X, panel.y, splits, nthread)
+
+    rows, done = [], {}    # done: trial -> result of a fit that stopped before its budget
+    alive = list(range(n_trials))
+    try:
+        for rung, rounds in enumerate(rungs):
+            todo = [i for i in alive if i not in done]
+            if pool is not None:
+                futures = [pool.submit(_evaluate, i, configs[i], rounds, early_stopping) for i in todo]
+                fresh = {i: f.result() for i, f in zip(todo, futures)}
+            else:
+                fresh = {i: _evaluate(i, configs[i], rounds, early_stopping) for i in todo}
+
+            results = {i: fresh[i] if i in fresh else {**done[i], "rounds": rounds, "seconds": 0.0}
+                       for i in alive}
+            for i, res in results.items():
+                if res["stopped_early"]:
+                    done[i] = res
+                rows.append({"rung": rung, **res, "reused": i not in fresh, **configs[i]})
+            best = min(results.values(), key=lambda r: r["val_logloss"])
+            logger.info("Rung %d: %d trials at %d rounds, best logloss %.5f (trial %d)",
+                        rung, len(alive), rounds, best["val_logloss"], best["trial"])
+
+            if rung + 1 < len(rungs):
+                keep = max(1, len(alive) // eta)
+                alive = sorted(alive, key=lambda i: results[i]["val_logloss"])[:keep]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    trials = pd.DataFrame(rows)
+    last = trials[trials["rung"] == trials["rung"].max()]
+    winner = last.loc[last["val_logloss"].idxmin()]
+    base = {k: v for k, v in MODEL_PARAMS.items() if k != "n_estimators"}
+    best_params = {**base, **configs[int(winner["trial"])], "n_estimators": int(winner["best_rounds"])}
+    logger.info("Best trial %d: logloss %.5f, %d rounds, %s",
+                int(winner["trial"]), winner["val_logloss"], best_params["n_estimators"], configs[int(winner["trial"])])
+    return TuningResult(best_params, float(winner["val_logloss"]), trials)
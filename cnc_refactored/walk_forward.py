@@ -0,0 +1,217 @@
+"""
+walk_forward.py
+---------------
+Walk-forward (rolling or expanding window) training and out-of-sample
+prediction. Each fold trains on data before its test period and predicts
+the test period; the test predictions are stitched into one series.
+
+With warm starting (the default) each fold continues boosting from the
+previous fold's booster, adding WF_WARM_TREES trees instead of fitting
+MODEL_PARAMS["n_estimators"] from scratch. Warm-started folds depend on
+each other and run in sequence; with --cold, folds are independent and
+run in parallel across processes.
+
+Usage:
+    python walk_forward.py
+    python walk_forward.py --window rolling --cold --workers 4
+"""
+
+import argparse
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+import metrics
+from xgboost import XGBClassifier
+from backtest_engine import backtest_frames, BacktestResult
+from pipeline import worker_context
+from config import (
+    FEATURE_COLS, HOLD_DAYS, MODEL_PARAMS, SIGNAL_THRESHOLD, CPU_WORKERS,
+    WF_START, WF_FREQ, WF_WINDOW, WF_TRAIN_YEARS, WF_WARM_TREES, WF_PREDICTIONS_PATH,
+)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Fold:
+    """Date bounds of one walk-forward fold (train_end and test_end exclusive)."""
+
+    train_start: pd.Timestamp
+    train_end: pd.Timestamp
+    test_start: pd.Timestamp
+    test_end: pd.Timestamp
+
+
+def make_folds(
+    dates: pd.DatetimeIndex,
+    start=WF_START,
+    freq: str = WF_FREQ,
+    window: str = WF_WINDOW,
+    train_years: float = WF_TRAIN_YEARS,
+    embargo_days: int = HOLD_DAYS + 1,
+) -> list[Fold]:
+    """Split the date range into consecutive test periods with their train windows.
+
+    Training stops embargo_days business days before each test period,
+    because a label looks HOLD_DAYS + 1 bars ahead and would otherwise
+    leak test-period prices into training.
+
+    Args:
+        dates:        All dates in the panel.
+        start:        First test period start.
+        freq:         Pandas offset alias for the test period length.
+        window:       "expanding" (train from the first date) or "rolling".
+        train_years:  Rolling window length in years.
+        embargo_days: Business days dropped between train and test.
+
+    Returns:
+        Folds in chronological order; periods without test data are skipped.
+    """
+    if window not in ("expanding", "rolling"):
+        raise ValueError(f"window must be 'expanding' or 'rolling', got '{window}'")
+    first, last = dates.min(), dates.max()
+    bounds = pd.date_range(pd.Timestamp(start), last, freq=freq)
+    if len(bounds) == 0 or bounds[0] != pd.Timestamp(start):
+        bounds = pd.DatetimeIndex([pd.Timestamp(start)]).append(bounds)
+    edges = list(bounds) + [last + pd.Timedelta(days=1)]
+
+    folds = []
+    for test_start, test_end in zip(edges[:-1], edges[1:]):
+        if not ((dates >= test_start) & (dates < test_end)).any():
+            continue
+        train_end = test_start - pd.tseries.offsets.BDay(embargo_days)
+        train_start = first if window == "expanding" else test_start - pd.DateOffset(years=train_years)
+        folds.append(Fold(max(first, train_start), train_end, test_start, test_end))
+    return folds
+
+
+def _fit(X: np.ndarray, y: np.ndarray, params: dict, prev_booster=None) -> XGBClassifier:
+    model = XGBClassifier(**params)
+    model.fit(X, y, xgb_model=prev_booster)
+    return model
+
+
+def _fit_and_predict(X_train, y_train, X_test, params) -> np.ndarray:
+    """Cold fold body, module-level so it can run in a worker process."""
+    return _fit(X_train, y_train, params).predict_proba(X_test)[:, 1]
+
+
+def walk_forward(
+    panel: pd.DataFrame,
+    folds: list[Fold],
+    warm_start: bool = True,
+    workers: int = 1,
+    params: dict = MODEL_PARAMS,
+    warm_trees: int = WF_WARM_TREES,
+) -> pd.DataFrame:
+    """Train per fold and return stitched out-of-sample predictions.
+
+    Args:
+        panel:      prepare_data() output: date index, FEATURE_COLS, label, symbol.
+        folds:      Output of make_folds().
+        warm_start: Continue each fold from the previous booster.
+        workers:    Process count for cold (independent) folds.
+        params:     XGBClassifier parameters for a full fit.
+        warm_trees: Trees added per warm-started fold.
+
+    Returns:
+        DataFrame indexed by date with columns symbol, label, prob, fold.
+    """
+    dates = panel.index
+    X_all = panel[FEATURE_COLS].to_numpy(dtype=np.float32)
+    y_all = panel["label"].to_numpy()
+
+    def rows(lo, hi):
+        return np.flatnonzero((dates >= lo) & (dates < hi))
+
+    tasks = []
+    for k, fold in enumerate(folds):
+        tr, te = rows(fold.train_start, fold.train_end), rows(fold.test_start, fold.test_end)
+        if len(tr) == 0 or len(te) == 0 or len(np.unique(y_all[tr])) < 2:
+            logger.warning("Skipping fold %d (%s): not enough training data", k, fold.test_start.date())
+            continue
+        tasks.append((k, tr, te))
+
+    probs = {}
+    if warm_start:
+        booster = None
+        for k, tr, te in tasks:
+            fold_params = params if booster is None else {**params, "n_estimators": warm_trees}
+            model = _fit(X_all[tr], y_all[tr], fold_params, booster)
+            booster = model.get_booster()
+            probs[k] = model.predict_proba(X_all[te])[:, 1]
+            logger.info("Fold %d: %d train / %d test rows, %d trees",
+                        k, len(tr), len(te), booster.num_boosted_rounds())
+    else:
+        # Cap per-fold threads so workers × threads does not oversubscribe the CPU
+        fold_params = {**params, "n_jobs": max(1, (os.cpu_count() or 1) // max(1, workers))}
+        with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=worker_context()) as pool:
+            futures = {
+                k: pool.submit(_fit_and_predict, X_all[tr], y_all[tr], X_all[te], fold_params)
+                for k, tr, te in tasks
+            }
+            probs = {k: f.result() for k, f in futures.items()}
+
+    parts = []
+    for k, _, te in tasks:
+        part = panel.iloc[te][["symbol", "label"]].copy()
+        part["prob"] = probs[k]
+        part["fold"] = k
+        parts.append(part)
+    if not parts:
+        return pd.DataFrame(columns=["symbol", "label", "prob", "fold"])
+    return pd.concat(parts)
+
+
+def backtest_predictions(
+    panel: pd.DataFrame,
+    predictions: pd.DataFrame,
+    threshold: float = SIGNAL_THRESHOLD,
+) -> BacktestResult:
+    """Backtest stitched out-of-sample predictions with backtest_engine."""
+    frames, probs = {}, {}
+    for symbol, preds in predictions.groupby("symbol", sort=False):
+        df = panel[panel["symbol"] == symbol].loc[preds.index]
+        frames[symbol] = df
+        probs[symbol] = preds["prob"].to_numpy()
+    return backtest_frames(frames, probs, threshold)
+
+
+def main():
+    from train_model import prepare_data
+
+    parser = argparse.ArgumentParser(description="Walk-forward training with stitched OOS predictions")
+    parser.add_argument("--window", choices=["expanding", "rolling"], default=WF_WINDOW)
+    parser.add_argument("--freq", default=WF_FREQ, help="Test period length (pandas offset alias)")
+    parser.add_argument("--start", default=WF_START, help="First out-of-sample date")
+    parser.add_argument("--cold", action="store_true", help="Retrain each fold from scratch, in parallel")
+    parser.add_argument("--workers", type=int, default=CPU_WORKERS, help="Processes for --cold folds")
+    parser.add_argument("--out", default=WF_PREDICTIONS_PATH)
+    metrics.add_profile_argument(parser)
+    args = parser.parse_args()
+
+    panel = prepare_data().sort_index(kind="stable")
+    folds = make_folds(panel.index, args.start, args.freq, args.window)
+    logger.info("Walk-forward: %d folds (%s, %s)", len(folds), args.window, "cold" if args.cold else "warm")
+
+    with metrics.timer("walk_forward"):
+        preds = walk_forward(panel, folds, warm_start=not args.cold, workers=args.workers)
+    preds.to_csv(args.out, index_label="date")
+    logger.info("Saved %d out-of-sample predictions to %s", len(preds), args.out)
+
+    summary = backtest_predictions(panel, preds).summary
+    logger.info("─── Out-of-sample Backtest ─────────────────────")
+    logger.info("Trades      : %d", summary.trades)
+    logger.info("Win Rate    : %.2f%%", summary.win_rate * 100)
+    logger.info("Total Return: %.2f%%", summary.total_return * 100)
+    logger.info("Max Drawdown: %.2f%%", summary.max_drawdown * 100)
+    if args.profile:
+        metrics.dump_profile(args.profile)
+
+
+if __name__ == "__main__":
+    main()